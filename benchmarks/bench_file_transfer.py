@@ -0,0 +1,84 @@
+"""Benchmark the file transfers used to put exported files in the export directory
+
+Creates a set of test files in a temporary directory then times moving or copying them
+to the destination with each file transfer in photoscript.filetransfer.  Use --dest to
+benchmark a destination on a different volume than the temporary directory.
+
+    python benchmarks/bench_file_transfer.py --count 200 --size 4
+"""
+
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+
+from photoscript.filetransfer import FILE_TRANSFERS
+
+
+def make_files(path, count, size):
+    """Create count files of size bytes in path"""
+    data = os.urandom(size)
+    files = []
+    for i in range(count):
+        filename = path / f"IMG_{i:04d}.jpeg"
+        filename.write_bytes(data)
+        files.append(filename)
+    return files
+
+
+def bench_transfer(name, count, size, dest):
+    """Time the transfer of count files of size bytes to dest; returns elapsed seconds"""
+    transfer = FILE_TRANSFERS[name]
+    with (
+        tempfile.TemporaryDirectory(prefix="photoscript_bench_src_") as srcdir,
+        tempfile.TemporaryDirectory(
+            prefix="photoscript_bench_dest_", dir=dest
+        ) as destdir,
+    ):
+        files = make_files(pathlib.Path(srcdir), count, size)
+        start = time.perf_counter()
+        for src in files:
+            transfer(str(src), os.path.join(destdir, src.name))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark photoscript file transfers for exported files"
+    )
+    parser.add_argument(
+        "--count", type=int, default=100, help="number of files to transfer"
+    )
+    parser.add_argument("--size", type=float, default=4.0, help="file size in MB")
+    parser.add_argument(
+        "--dest",
+        type=str,
+        default=None,
+        help="directory to transfer files to; default is the temporary directory",
+    )
+    parser.add_argument(
+        "--transfer",
+        choices=list(FILE_TRANSFERS),
+        action="append",
+        help="file transfer to benchmark; may be repeated; default is all",
+    )
+    args = parser.parse_args()
+
+    size = int(args.size * 1024 * 1024)
+    for name in args.transfer or FILE_TRANSFERS:
+        try:
+            elapsed = bench_transfer(name, args.count, size, args.dest)
+        except FileNotFoundError as e:
+            # ditto is only available on macOS
+            print(f"{name:>6}: skipped ({e})")
+            continue
+        print(
+            f"{name:>6}: {args.count / elapsed:10.1f} files/s "
+            f"{args.count * size / elapsed / 1024 / 1024:10.1f} MB/s "
+            f"{elapsed / args.count * 1000:8.3f} ms/file"
+        )
+
+
+if __name__ == "__main__":
+    main()
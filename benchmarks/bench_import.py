@@ -0,0 +1,77 @@
+"""Benchmark the time it takes to import photoscript
+
+Imports photoscript in a fresh interpreter a number of times and reports the time each import
+took.  Importing photoscript must not compile photoscript.applescript or detect the macOS
+version (both are done on first use); the benchmark checks this and, with --max-ms, fails if
+the median import takes longer so it can be used to guard against import time regressions.
+
+    python benchmarks/bench_import.py --count 10 --max-ms 250
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# run in a fresh interpreter: import photoscript and report the time and what was initialized
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import photoscript
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "script_compiled": photoscript.script_loader.SCRIPT_OBJ is not None,
+    "os_detected": photoscript._macos_version.cache_info().currsize > 0,
+}))
+"""
+
+
+def bench_import():
+    """Import photoscript in a new interpreter; returns dict with the results of IMPORT_SCRIPT"""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark importing photoscript")
+    parser.add_argument(
+        "--count", type=int, default=10, help="number of times to import photoscript"
+    )
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=None,
+        help="fail if the median import time is more than this many milliseconds",
+    )
+    args = parser.parse_args()
+
+    results = [bench_import() for _ in range(args.count)]
+    times = [result["seconds"] * 1000 for result in results]
+    median = statistics.median(times)
+    print(
+        f"import photoscript: median {median:8.1f} ms "
+        f"min {min(times):8.1f} ms max {max(times):8.1f} ms"
+    )
+
+    failed = False
+    if any(result["script_compiled"] for result in results):
+        print("FAIL: importing photoscript compiled the AppleScript")
+        failed = True
+    if any(result["os_detected"] for result in results):
+        print("FAIL: importing photoscript detected the macOS version")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"FAIL: median import time is more than {args.max_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
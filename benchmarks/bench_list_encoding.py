@@ -0,0 +1,114 @@
+"""Benchmark returning large lists of ids from AppleScript as a list and as a joined string
+
+py-applescript converts a list returned by a handler into Python one element at a time which
+is slow for the lists of 100k ids a large library returns.  With bulk_strings set (see
+photoscript.script_loader.configure_run_script) the list handlers return their list joined
+into one string by the joined dispatcher and it is split in Python instead.
+
+By default the lists are built by a stand-in for photosLibraryGetPhotoByRange so the
+benchmark doesn't need a large library; the stand-in is compiled with the same joined
+dispatcher as photoscript.applescript.  With --photos the real handler is timed against
+Photos, which needs a library with at least as many photos as the largest size.
+
+    python benchmarks/bench_list_encoding.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import statistics
+import time
+
+from photoscript.script_loader import (
+    JOINED_HANDLER,
+    generate_joined_dispatcher,
+    split_joined_list,
+)
+
+# stand-in for photosLibraryGetPhotoByRange that returns stopNumber - startNumber + 1 ids
+RANGE_SCRIPT = """
+on photosLibraryGetPhotoByRange(startNumber, stopNumber)
+	set theIDs to {}
+	set theIDsRef to a reference to theIDs
+	repeat with i from startNumber to stopNumber
+		set end of theIDsRef to "00000000-0000-4000-8000-" & i & "/L0/001"
+	end repeat
+	return theIDs
+end photosLibraryGetPhotoByRange
+"""
+
+
+def list_call(script, size):
+    """Return size ids as converted from an AppleScript list"""
+    return list(script.call("photosLibraryGetPhotoByRange", 1, size))
+
+
+def joined_call(script, size):
+    """Return size ids as split from a string joined by the joined dispatcher"""
+    return split_joined_list(
+        script.call(JOINED_HANDLER, "photosLibraryGetPhotoByRange", [1, size])
+    )
+
+
+def bench(func, script, size, repeat):
+    """Call func(script, size) repeat times; returns median seconds per call"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ids = func(script, size)
+        times.append(time.perf_counter() - start)
+        if len(ids) != size:
+            raise RuntimeError(f"{func.__name__} returned {len(ids)} ids, not {size}")
+    return statistics.median(times)
+
+
+def photos_script():
+    """Return object calling the photoscript handlers in Photos"""
+    from photoscript.script_loader import get_script
+
+    script = get_script()
+    script.call("photosLibraryWaitForPhotos", 300)
+    return script
+
+
+def range_script():
+    """Return the stand-in for photosLibraryGetPhotoByRange compiled with the joined dispatcher"""
+    from applescript import AppleScript
+
+    return AppleScript(
+        RANGE_SCRIPT + generate_joined_dispatcher({"photosLibraryGetPhotoByRange": 2})
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark AppleScript list results as lists and as joined strings"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="number of ids to return",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of times to time each call"
+    )
+    parser.add_argument(
+        "--photos",
+        action="store_true",
+        help="time photosLibraryGetPhotoByRange in Photos instead of a stand-in",
+    )
+    args = parser.parse_args()
+
+    script = photos_script() if args.photos else range_script()
+    for size in args.sizes:
+        list_seconds = bench(list_call, script, size, args.repeat)
+        joined_seconds = bench(joined_call, script, size, args.repeat)
+        print(
+            f"{size:>8} ids: list {list_seconds * 1000:10.1f} ms "
+            f"joined {joined_seconds * 1000:10.1f} ms "
+            f"speedup {list_seconds / joined_seconds:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
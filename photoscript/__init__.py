@@ -2,24 +2,55 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import contextvars
 import datetime
+import functools
 import glob
 import os
 import pathlib
 import random
+import re
 import string
+import sys
 import tempfile
+import time
 from subprocess import run
 
-from applescript import AppleScript, kMissingValue
+from .cache import MetadataCache, cached, disable_cache, enable_cache, invalidates
+from .exceptions import AppleScriptError, ExportError
+from .metrics import ScriptStats
+from .export import ExportManifest, ExportPipeline, ExportSession, metadata_fingerprint
+from .recovery import RecoveryChain
+from .script_loader import (
+    RECOVERY,
+    SESSION_IDLE_TIMEOUT,
+    STATS,
+    RetryPolicy,
+    ScriptBatch,
+    ScriptSession,
+    configure_run_script,
+    kMissingValue,
+    run_script,
+    run_script_batch,
+    set_handler_retry_policy,
+    use_retry_policy,
+)
+from .utils import get_os_version, photos_library_path
+
+
+@functools.cache
+def _macos_version() -> tuple[int, int, int]:
+    """Return version of macOS; detected on first use instead of when photoscript is imported"""
+    return get_os_version()
+
+
+def __getattr__(name):
+    # MACOS_VERSION is computed lazily by _macos_version()
+    if name == "MACOS_VERSION":
+        return _macos_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-from photoscript.utils import ditto, findfiles
-
-from .exceptions import AppleScriptError
-from .script_loader import run_script
-from .utils import get_os_version
-
-MACOS_VERSION = get_os_version()
 
 """ In Catalina / Photos 5+, UUIDs in AppleScript have suffix that doesn't
     appear in actual database value.  These need to be dropped to be compatible
@@ -28,6 +59,57 @@ UUID_SUFFIX_PHOTO = "/L0/001"
 UUID_SUFFIX_ALBUM = "/L0/040"
 UUID_SUFFIX_FOLDER = "/L0/020"
 
+# matches the id of the folder an idstring is for, e.g. folder id("E0CD...") of folder id(...)
+_IDSTRING_ID_RE = re.compile(r'^folder id\("([^"]+)"\)')
+
+# default number of photo ids fetched per Apple Event when iterating the whole library
+PHOTOS_CHUNK_SIZE = 500
+
+# fields that can be requested from PhotosLibrary.fetch_metadata()
+METADATA_FIELDS = (
+    "name",
+    "description",
+    "keywords",
+    "favorite",
+    "date",
+    "width",
+    "height",
+    "location",
+    "altitude",
+    "filename",
+)
+
+# convert raw AppleScript values to the same values returned by the Photo properties
+_METADATA_CONVERTERS = {
+    "name": lambda value: value if value not in [kMissingValue, ""] else "",
+    "description": lambda value: value if value != kMissingValue else "",
+    "keywords": lambda value: (
+        value if isinstance(value, list) else [value] if value != kMissingValue else []
+    ),
+    "altitude": lambda value: value if value != kMissingValue else None,
+    "location": lambda value: tuple(
+        None if coord == kMissingValue else coord for coord in value
+    ),
+}
+
+# default number of photos added to an album per Apple Event by Album.add()
+ALBUM_ADD_CHUNK_SIZE = 1000
+
+# default number of photos exported per Apple Event by PhotosLibrary.export_photos()
+EXPORT_CHUNK_SIZE = 100
+
+# default number of threads putting exported files in place by PhotosLibrary.export_photos()
+EXPORT_WORKERS = 2
+
+# seconds the index built by PhotosLibrary.album_membership_index() is used before it is
+# rebuilt; albums changed outside of photoscript aren't reflected in the index until then
+ALBUM_INDEX_TTL = 300
+
+# photo id -> album ids index built by PhotosLibrary.album_membership_index(); used by Photo.albums
+_album_membership_index: dict[str, list[str]] | None = None
+# time.monotonic() when _album_membership_index was built
+_album_membership_built = 0.0
+
 
 def uuid_to_id(uuid: str, suffix: str) -> tuple[str, str]:
     """Converts UUID betweens formats used by osxphotos and Photos app
@@ -40,7 +122,8 @@ def uuid_to_id(uuid: str, suffix: str) -> tuple[str, str]:
         tuple of (uuid, id)
     """
     id_ = uuid
-    if MACOS_VERSION >= (10, 15, 0):
+    # off macOS ids are only read from libraries with PhotosDB, which reads Photos 5+ libraries
+    if sys.platform != "darwin" or _macos_version() >= (10, 15, 0):
         # In Photos 5+ (Catalina/10.15), UUIDs in AppleScript have suffix that doesn't
         # appear in actual database value. Suffix needs to be added to be compatible
         # with AppleScript (id_) and dropped for osxphotos (uuid)
@@ -52,19 +135,128 @@ def uuid_to_id(uuid: str, suffix: str) -> tuple[str, str]:
     return uuid, id_
 
 
+def stats() -> ScriptStats:
+    """Return the statistics of AppleScript handler calls made by photoscript
+
+    Recording is off by default; call stats().enable() to start it.  See photoscript.metrics.
+    """
+    return STATS
+
+
+def recovery_chain() -> RecoveryChain:
+    """Return the recovery run when an AppleScript call to Photos times out
+
+    Photos is probed, then quit and only killed as a last resort as timeouts continue; change
+    its steps or add hooks to observe it.  See photoscript.recovery.
+    """
+    return RECOVERY
+
+
+def _album_index() -> dict[str, list[str]] | None:
+    """Return the album membership index or None if it hasn't been built or is older than
+    ALBUM_INDEX_TTL"""
+    global _album_membership_index
+    if (
+        _album_membership_index is not None
+        and time.monotonic() - _album_membership_built > ALBUM_INDEX_TTL
+    ):
+        _album_membership_index = None
+    return _album_membership_index
+
+
+def _album_index_add(album_id: str, photo_ids: list[str]):
+    """Record photo_ids as members of album_id in the album membership index, if built"""
+    if (index := _album_index()) is None:
+        return
+    for photo_id in photo_ids:
+        album_ids = index.setdefault(photo_id, [])
+        if album_id not in album_ids:
+            album_ids.append(album_id)
+
+
+def _album_index_remove_album(album_id: str):
+    """Remove album_id from the album membership index, if built"""
+    if (index := _album_index()) is None:
+        return
+    for album_ids in index.values():
+        if album_id in album_ids:
+            album_ids.remove(album_id)
+
+
+def _album_index_replace_album(
+    album_id: str, new_album_id: str, removed_photo_ids: set[str] = frozenset()
+):
+    """Replace album_id with new_album_id in the album membership index, if built,
+    dropping removed_photo_ids from the new album"""
+    if (index := _album_index()) is None:
+        return
+    for photo_id, album_ids in index.items():
+        if album_id in album_ids:
+            album_ids.remove(album_id)
+            if photo_id not in removed_photo_ids:
+                album_ids.append(new_album_id)
+
+
+def _metadata_fingerprint(metadata: dict[str, list], i: int) -> str:
+    """Return fingerprint of the photo at index i of columns returned by fetch_metadata()"""
+    return metadata_fingerprint(
+        {field: values[i] for field, values in metadata.items() if field != "uuid"}
+    )
+
+
+def _export_batches(
+    photo_ids: list[str], filenames: list[str], chunk_size: int
+) -> list[list[tuple[str, str]]]:
+    """Split photos into batches of at most chunk_size photos with no duplicate filename stems
+
+    Returns:
+        list of batches where each batch is a list of (photo id, lower case filename stem)
+    """
+    # each photo goes in the first batch that isn't full and doesn't have its stem; batches
+    # before first_open are full and batches before next_batch[stem] are full or have stem
+    batches = []
+    first_open = 0
+    next_batch = {}
+    for photo_id, filename in zip(photo_ids, filenames):
+        stem = pathlib.Path(filename).stem.lower()
+        i = max(first_open, next_batch.get(stem, 0))
+        while i < len(batches) and len(batches[i]) >= chunk_size:
+            i += 1
+        if i == len(batches):
+            batches.append([])
+        batches[i].append((photo_id, stem))
+        next_batch[stem] = i + 1
+        while first_open < len(batches) and len(batches[first_open]) >= chunk_size:
+            first_open += 1
+    return batches
+
+
 class PhotosLibrary:
-    def __init__(self):
-        """create new PhotosLibrary object and launch Photos"""
-        run_script("photosLibraryWaitForPhotos", 300)
-        self._version = str(run_script("photosLibraryVersion"))
+    def __init__(self, retry_policy: RetryPolicy | None = None):
+        """create new PhotosLibrary object and launch Photos
+
+        Args:
+            retry_policy: RetryPolicy for AppleScript calls made by this object; if None,
+                the global policy set with configure_run_script() is used
+        """
+        self.retry_policy = retry_policy
+        self._run_script("photosLibraryWaitForPhotos", 300)
+        self._version = str(self._run_script("photosLibraryVersion"))
+
+    def _run_script(self, name, *args):
+        """run_script() with this library's retry policy"""
+        if self.retry_policy is None:
+            return run_script(name, *args)
+        with use_retry_policy(self.retry_policy):
+            return run_script(name, *args)
 
     def activate(self):
         """activate Photos.app"""
-        run_script("photosLibraryActivate")
+        self._run_script("photosLibraryActivate")
 
     def quit(self):
         """quit Photos.app"""
-        run_script("photosLibraryQuit")
+        self._run_script("photosLibraryQuit")
 
     def open(self, library_path, delay=10):
         """open a library and wait for delay for user to acknowledge in Photos"""
@@ -75,6 +267,8 @@ class PhotosLibrary:
         if not pathlib.Path(library_path).is_dir():
             raise ValueError(f"{library_path} does not appear to be a Photos library")
         self.activate()
+        from applescript import AppleScript
+
         script = AppleScript(
             f"""
             set tries to 0
@@ -99,24 +293,67 @@ class PhotosLibrary:
                 f"Photos failed to open {library_path} after {tries} tries"
             )
 
+    def batch(self, max_size=None):
+        """Return a ScriptBatch context manager that queues AppleScript handler calls
+        and runs them in a single Apple Event when flushed (or when the with block exits).
+
+        Args:
+            max_size: if set, queued calls are flushed automatically every max_size calls
+
+        Returns:
+            ScriptBatch object; ScriptBatch.call(handler_name, *args) returns a BatchResult
+            whose result() is available once the batch has been flushed
+
+        Example:
+            with photoslib.batch() as batch:
+                names = [batch.call("photoName", photo.id) for photo in photos]
+            names = [name.result() for name in names]
+        """
+        return ScriptBatch(max_size=max_size)
+
+    def session(self, idle_timeout=SESSION_IDLE_TIMEOUT):
+        """Return a ScriptSession context manager in which AppleScript handlers skip the
+        check that Photos is running and ready that each normally does first.
+
+        Photos is checked once when the first handler is called in the session and again
+        only after a handler fails or the session has been idle for idle_timeout seconds.
+
+        Args:
+            idle_timeout: seconds the session can be idle before checking Photos again;
+                default is SESSION_IDLE_TIMEOUT
+
+        Returns:
+            ScriptSession object
+
+        Example:
+            with photoslib.session():
+                names = [photo.name for photo in photos]
+        """
+        return ScriptSession(idle_timeout=idle_timeout)
+
     @property
     def running(self):
         """True if Photos is running, otherwise False"""
-        return run_script("photosLibraryIsRunning")
+        return self._run_script("photosLibraryIsRunning")
 
     def hide(self):
         """Tell Photos to hide its window"""
-        run_script("photosLibraryHide")
+        self._run_script("photosLibraryHide")
 
     @property
     def hidden(self):
         """True if Photos is hidden (or not running), False if Photos is visible"""
-        return run_script("photosLibraryIsHidden")
+        return self._run_script("photosLibraryIsHidden")
 
     @property
     def name(self):
         """name of Photos.app"""
-        return run_script("photosLibraryName")
+        return self._run_script("photosLibraryName")
+
+    @property
+    def library_path(self) -> pathlib.Path | None:
+        """path to the library open in Photos or None if it can't be determined"""
+        return photos_library_path()
 
     @property
     def version(self):
@@ -126,40 +363,51 @@ class PhotosLibrary:
     @property
     def frontmost(self):
         """True if Photos.app is front most app otherwise False"""
-        return run_script("photosLibraryIsFrontMost")
+        return self._run_script("photosLibraryIsFrontMost")
 
     @property
     def selection(self):
         """List of Photo objects for currently selected photos or [] if no selection"""
-        uuids = run_script("photosLibraryGetSelection")
-        return [Photo(uuid) for uuid in uuids]
+        uuids = self._run_script("photosLibraryGetSelection")
+        return [Photo._from_id(uuid) for uuid in uuids]
 
     @property
     def favorites(self):
         """Album object for the Favorites album"""
-        fav_id = run_script("photosLibraryFavorites")
-        return Album(fav_id)
+        fav_id = self._run_script("photosLibraryFavorites")
+        return Album._from_id(fav_id)
 
     # doesn't seem to be a way to do anything with the recently deleted album except count items
     # @property
     # def recently_deleted(self):
     #     """ Album object for the Recently Deleted album """
-    #     del_id = run_script("photosLibraryRecentlyDeleted")
+    #     del_id = self._run_script("photosLibraryRecentlyDeleted")
     #     return Album(del_id)
 
-    def photos(self, search=None, uuid=None, range_=None):
+    def photos(
+        self,
+        search=None,
+        uuid=None,
+        range_=None,
+        chunk_size=PHOTOS_CHUNK_SIZE,
+        prefetch=False,
+    ):
         """Returns a generator that yields Photo objects for media items in the library.
 
         Args:
             search: optional text string to search for (returns matching items)
             uuid: optional list of UUIDs to get
             range: optional list of [start, stop] sequence of photos to get
+            chunk_size: when iterating the whole library (no search, uuid, or range_),
+                number of photo ids to fetch from Photos at a time; default is PHOTOS_CHUNK_SIZE
+            prefetch: when iterating the whole library, if True, fetch the next chunk of ids
+                in a background thread while the current chunk is being processed; default is False
 
         Returns:
             Generator that yields Photo objects
 
         Raises:
-            ValueError if more than one of search, uuid, range passed or invalid range
+            ValueError if more than one of search, uuid, range passed, invalid range, or chunk_size < 1
             TypeError if list not passed for range
 
         Note: photos() returns a generator instead of a list because retrieving all the photos
@@ -174,16 +422,22 @@ class PhotosLibrary:
         stop in range 1 to len(PhotosLibrary()).  You may be able to optimize the speed by which
         photos are return by chunking up requests in batches of photos using range,
         e.g. request 10 photos at a time.
+
+        When iterating the whole library, ids are fetched chunk_size at a time so at most
+        one chunk (two if prefetch=True) of ids is held in memory.
         """
         if len([x for x in [search, uuid, range_] if x]) > 1:
             raise ValueError("Cannot pass more than one of search, uuid, range_")
 
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+
         if not any([search, uuid, range_]):
-            return self._iterphotos()
+            return self._iterphotos(chunk_size=chunk_size, prefetch=prefetch)
 
         if search is not None:
             # search for text
-            photo_ids = run_script("photosLibrarySearchPhotos", search)
+            photo_ids = self._run_script("photosLibrarySearchPhotos", search)
         elif uuid:
             # search by uuid
             photo_ids = uuid
@@ -210,21 +464,116 @@ class PhotosLibrary:
                     f"invalid range: valid range is start: 0 to {count-1}, stop: 1 to {count}"
                 )
 
-            photo_ids = run_script("photosLibraryGetPhotoByRange", start + 1, stop)
+            photo_ids = self._run_script(
+                "photosLibraryGetPhotoByRange", start + 1, stop
+            )
 
-        return self._iterphotos(uuids=photo_ids) if photo_ids else []
+        # ids passed by the caller must be validated; ids returned by Photos are trusted
+        return (
+            self._iterphotos(uuids=photo_ids, validate=bool(uuid)) if photo_ids else []
+        )
 
-    def _iterphotos(self, uuids=None):
+    def _iterphotos(
+        self, uuids=None, validate=False, chunk_size=PHOTOS_CHUNK_SIZE, prefetch=False
+    ):
         if uuids:
             for uuid in uuids:
-                yield Photo(uuid)
+                yield Photo(uuid) if validate else Photo._from_id(uuid)
         else:
             # return all photos via generator
-            count = len(self)
-            for x in range(1, count + 1):
-                # AppleScript list indexes start at 1
-                photo_id = run_script("photosLibraryGetPhotoByRange", x, x)[0]
-                yield Photo(photo_id)
+            for photo_ids in self._iterphoto_chunks(chunk_size, prefetch):
+                for photo_id in photo_ids:
+                    yield Photo._from_id(photo_id)
+
+    def _iterphoto_chunks(self, chunk_size, prefetch=False):
+        """Generator that yields lists of up to chunk_size photo ids for all photos in the library
+
+        Args:
+            chunk_size: number of ids to fetch per call to Photos
+            prefetch: if True, fetch the next chunk in a background thread while the
+                caller processes the current one
+        """
+        count = len(self)
+        # AppleScript list indexes start at 1 and ranges are inclusive
+        ranges = (
+            (start, min(start + chunk_size - 1, count))
+            for start in range(1, count + 1, chunk_size)
+        )
+        if not prefetch:
+            for start, stop in ranges:
+                yield self._run_script("photosLibraryGetPhotoByRange", start, stop)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+
+            def submit_next():
+                next_range = next(ranges, None)
+                if next_range is None:
+                    return None
+                # calls to the script are serialized by script_loader.SCRIPT_LOCK; the
+                # worker runs in the caller's context so it uses the caller's ScriptSession
+                # and retry policy
+                return executor.submit(
+                    contextvars.copy_context().run,
+                    self._run_script,
+                    "photosLibraryGetPhotoByRange",
+                    *next_range,
+                )
+
+            future = submit_next()
+            while future is not None:
+                photo_ids = future.result()
+                future = submit_next()
+                yield photo_ids
+
+    def fetch_metadata(
+        self, photos, fields=METADATA_FIELDS, chunk_size=PHOTOS_CHUNK_SIZE
+    ):
+        """Fetch metadata for many photos at once, returned as columns
+
+        Args:
+            photos: list of Photo objects or photo ids
+            fields: list of fields to fetch, any of METADATA_FIELDS; default is all fields
+            chunk_size: number of photos to fetch per call to Photos; default is PHOTOS_CHUNK_SIZE
+
+        Returns:
+            dict of field name: list of values with one value per photo in the same order as photos;
+            the "uuid" key holds the photo UUIDs.  Values match those returned by the
+            corresponding Photo properties.  The dict can be passed directly to
+            pandas.DataFrame() or turned into rows with zip(*columns.values()).
+
+        Raises:
+            ValueError if fields is empty or contains an unknown field
+
+        Note: this requires one call to Photos per chunk_size photos instead of one call
+        per photo per field.
+        """
+        fields = list(fields)
+        if not fields:
+            raise ValueError("fields must not be empty")
+        if unknown := [field for field in fields if field not in METADATA_FIELDS]:
+            raise ValueError(f"unknown metadata fields: {unknown}")
+
+        uuids, photo_ids = [], []
+        for photo in photos:
+            uuid, id_ = uuid_to_id(
+                photo.id if isinstance(photo, Photo) else photo, UUID_SUFFIX_PHOTO
+            )
+            uuids.append(uuid)
+            photo_ids.append(id_)
+
+        columns = {"uuid": uuids}
+        columns.update({field: [] for field in fields})
+        for start in range(0, len(photo_ids), chunk_size):
+            chunk_ids = photo_ids[start : start + chunk_size]
+            chunk_columns = self._run_script(
+                "photosLibraryGetMetadata", chunk_ids, fields
+            )
+            for field, values in zip(fields, chunk_columns):
+                if converter := _METADATA_CONVERTERS.get(field):
+                    values = [converter(value) for value in values]
+                columns[field].extend(values)
+        return columns
 
     def import_photos(self, photo_paths, album=None, skip_duplicate_check=False):
         """import photos
@@ -243,18 +592,19 @@ class PhotosLibrary:
         # stringify paths in case pathlib.Path paths are passed
         photo_paths = [str(photo_path) for photo_path in photo_paths]
         if album is not None:
-            photo_ids = run_script(
+            photo_ids = self._run_script(
                 "photosLibraryImportToAlbum",
                 photo_paths,
                 album.id,
                 skip_duplicate_check,
             )
+            _album_index_add(album.id, photo_ids)
         else:
-            photo_ids = run_script(
+            photo_ids = self._run_script(
                 "photosLibraryImport", photo_paths, skip_duplicate_check
             )
 
-        return [Photo(photo) for photo in photo_ids]
+        return [Photo._from_id(photo) for photo in photo_ids]
 
     def album_names(self, top_level=False):
         """List of album names in the Photos library
@@ -262,7 +612,36 @@ class PhotosLibrary:
         Args:
             top_level: if True, returns only top-level albums otherwise also returns albums in sub-folders; default is False
         """
-        return run_script("photosLibraryAlbumNames", top_level)
+        return self._run_script("photosLibraryAlbumNames", top_level)
+
+    def album_membership_index(self, refresh=False) -> dict[str, list[str]]:
+        """Index of the albums each photo in the library is contained in
+
+        The index is built with a single pass over every album in the library and is kept
+        for use by Photo.albums, which otherwise has to search every album for each photo.
+        Albums changed through photoscript are kept up to date in the index but changes made
+        outside of photoscript, e.g. in Photos, are not: the index is rebuilt once it is older
+        than ALBUM_INDEX_TTL seconds and refresh=True is needed to see such changes sooner.
+
+        Args:
+            refresh: if True, rebuild the index even if it has already been built
+
+        Returns:
+            dict of photo id: list of ids of albums containing the photo;
+            photos not contained in any album are not included
+        """
+        global _album_membership_index, _album_membership_built
+        if _album_index() is None or refresh:
+            album_ids, album_photo_ids = self._run_script(
+                "photosLibraryAlbumMembership"
+            )
+            index = {}
+            for album_id, photo_ids in zip(album_ids, album_photo_ids):
+                for photo_id in photo_ids:
+                    index.setdefault(photo_id, []).append(album_id)
+            _album_membership_index = index
+            _album_membership_built = time.monotonic()
+        return _album_membership_index
 
     def folder_names(self, top_level=False):
         """List of folder names in the Photos library
@@ -270,7 +649,7 @@ class PhotosLibrary:
         Args:
             top_level: if True, returns only top-level folders otherwise also returns sub-folders; default is False
         """
-        return run_script("photosLibraryFolderNames", top_level)
+        return self._run_script("photosLibraryFolderNames", top_level)
 
     def album(self, *name, uuid=None, top_level=False):
         """Album instance by name or id
@@ -293,9 +672,9 @@ class PhotosLibrary:
             raise ValueError("Must pass only name or uuid but not both")
 
         if name:
-            uuid = run_script("albumByName", name[0], top_level)
+            uuid = self._run_script("albumByName", name[0], top_level)
             if uuid != 0:
-                return Album(uuid)
+                return Album._from_id(uuid)
             else:
                 return None
         else:
@@ -303,8 +682,8 @@ class PhotosLibrary:
 
     def albums(self, top_level=False):
         """list of Album objects for all albums"""
-        album_ids = run_script("photosLibraryAlbumIDs", top_level)
-        return [Album(uuid) for uuid in album_ids]
+        album_ids = self._run_script("photosLibraryAlbumIDs", top_level)
+        return [Album._from_id(uuid) for uuid in album_ids]
 
     def create_album(self, name, folder: "Folder" = None) -> "Album":
         """creates an album
@@ -321,14 +700,14 @@ class PhotosLibrary:
             AppleScriptError if error creating the album
         """
         if folder is None:
-            album_id = run_script("photosLibraryCreateAlbum", name)
+            album_id = self._run_script("photosLibraryCreateAlbum", name)
         else:
-            album_id = run_script(
+            album_id = self._run_script(
                 "photosLibraryCreateAlbumAtFolder", name, folder.idstring
             )
 
         if album_id != kMissingValue:
-            return Album(album_id)
+            return Album._from_id(album_id)
         else:
             raise AppleScriptError(f"Could not create album {name}")
 
@@ -338,7 +717,8 @@ class PhotosLibrary:
         Args:
             album: an Album object for album to delete
         """
-        return run_script("photosLibraryDeleteAlbum", album.id)
+        _album_index_remove_album(album.id)
+        return self._run_script("photosLibraryDeleteAlbum", album.id)
 
     def folder(
         self, name: str = None, path: list[str] = None, uuid: str = None, top_level=True
@@ -367,20 +747,39 @@ class PhotosLibrary:
             )
 
         if path:
-            idstring = run_script("folderGetIDStringFromPath", path)
-            return Folder(idstring=idstring) if idstring != kMissingValue else None
+            idstring = self._run_script("folderGetIDStringFromPath", path)
+            return (
+                Folder._from_idstring(idstring) if idstring != kMissingValue else None
+            )
 
         if name:
-            idstring = run_script(
+            idstring = self._run_script(
                 "photosLibraryGetFolderIDStringForName", name, top_level
             )
-            return Folder(idstring=idstring) if idstring != kMissingValue else None
+            return (
+                Folder._from_idstring(idstring) if idstring != kMissingValue else None
+            )
 
         if uuid:
-            idstring = run_script(
+            idstring = self._run_script(
                 "photosLibraryGetFolderIDStringForID", uuid, top_level
             )
-            return Folder(idstring=idstring) if idstring != kMissingValue else None
+            return (
+                Folder._from_idstring(idstring) if idstring != kMissingValue else None
+            )
+
+    def tree(self) -> "LibraryTree":
+        """Snapshot of every folder and album in the library read with a single AppleScript call
+
+        Returns:
+            LibraryTree object with the folders and albums in the library; lookups by name or
+            path, path_str(), and parent resolution on the snapshot don't use AppleScript
+        """
+        # imported here as photoscript.tree subclasses Folder and Album
+        from .tree import LibraryTree
+
+        folders, albums = self._run_script("photosLibraryTree")
+        return LibraryTree(folders, albums)
 
     def folder_by_path(self, folder_path):
         """Return folder in the library by path
@@ -391,13 +790,13 @@ class PhotosLibrary:
         Returns:
             Folder object for folder at folder_path or None if not found
         """
-        folder_id = run_script("folderIDByPath", folder_path)
-        return Folder(folder_id) if folder_id != kMissingValue else None
+        idstring = self._run_script("folderGetIDStringFromPath", folder_path)
+        return Folder._from_idstring(idstring) if idstring != kMissingValue else None
 
     def folders(self, top_level=True):
         """list of Folder objects for all folders"""
-        folder_ids = run_script("photosLibraryFolderIDs", top_level)
-        return [Folder(uuid) for uuid in folder_ids]
+        idstrings = self._run_script("photosLibraryFolderIDStrings", top_level)
+        return [Folder._from_idstring(idstring) for idstring in idstrings]
 
     def create_folder(self, name: str, folder: "Folder" = None) -> "Folder":
         """creates a folder
@@ -414,14 +813,14 @@ class PhotosLibrary:
             AppleScriptError if folder cannot be created
         """
         if folder is None:
-            folder_id = run_script("photosLibraryCreateFolder", name)
+            folder_id = self._run_script("photosLibraryCreateFolder", name)
         else:
-            folder_id = run_script(
+            folder_id = self._run_script(
                 "photosLibraryCreateFolderAtFolder", name, folder.idstring
             )
 
         if folder_id != kMissingValue:
-            return Folder(idstring=folder_id)
+            return Folder._from_idstring(folder_id)
         else:
             raise AppleScriptError(f"Could not create folder {name}")
 
@@ -446,14 +845,19 @@ class PhotosLibrary:
         if not folder_path:
             raise ValueError("no values in folder_path")
 
-        folder = self.folder(folder_path[0], top_level=True)
-        if folder is None:
-            folder = self.create_folder(folder_path[0])
-        for subfolder_name in folder_path[1:]:
-            subfolder = folder.folder(subfolder_name)
-            if subfolder is None:
-                subfolder = folder.create_folder(subfolder_name)
-            folder = subfolder
+        return self._make_folders(folder_path, self.tree())
+
+    def _make_folders(self, folder_path, tree):
+        """Make folders in folder_path that are not already in tree; returns final Folder"""
+        folder = None
+        for depth, folder_name in enumerate(folder_path, 1):
+            existing = tree.folder(path=folder_path[:depth])
+            if existing is not None:
+                folder = Folder._from_idstring(existing.idstring)
+            elif folder is None:
+                folder = self.create_folder(folder_name)
+            else:
+                folder = folder.create_folder(folder_name)
         return folder
 
     def make_album_folders(self, album_name, folder_path):
@@ -480,11 +884,12 @@ class PhotosLibrary:
         if not folder_path:
             raise ValueError("no values in folder_path")
 
-        folder = self.make_folders(folder_path)
-        album = folder.album(album_name)
-        if album is None:
-            album = folder.create_album(album_name)
-        return album
+        tree = self.tree()
+        folder = self._make_folders(folder_path, tree)
+        album = tree.album(path=[*folder_path, album_name])
+        if album is not None:
+            return Album._from_id(album.id)
+        return folder.create_album(album_name)
 
     def delete_folder(self, folder: "Folder"):
         """Deletes folder (and all its sub-folders and albums)
@@ -497,10 +902,13 @@ class PhotosLibrary:
             Sub-folders cannot be deleted due to a bug in Photos' AppleScript
             implementation.
         """
-        return run_script("photosLibraryDeleteFolder", folder.idstring)
+        global _album_membership_index
+        # albums in the folder are deleted too; rebuild the index when next requested
+        _album_membership_index = None
+        return self._run_script("photosLibraryDeleteFolder", folder.idstring)
 
     def __len__(self):
-        return run_script("photosLibraryCount")
+        return self._run_script("photosLibraryCount")
 
     # TODO: add a temp_album() method that creates a temporary album
     def _temp_album_name(self):
@@ -526,6 +934,9 @@ class PhotosLibrary:
         overwrite=False,
         timeout=120,
         reveal_in_finder=False,
+        transfer="move",
+        session=None,
+        replace_paths=None,
     ):
         """Export photo to export_path
 
@@ -536,6 +947,10 @@ class PhotosLibrary:
             overwrite: if True, export will overwrite a file of same name as photo in export_path; default = False
             timeout: number of seconds to wait for Photos to complete export before timing out; default = 120
             reveal_in_finder: if True, will open Finder with exported items selected when done; default = False
+            transfer: how exported files are put in export_path, one of "move", "copy", "ditto",
+                or a callable taking (src, dest); see photoscript.filetransfer; default = "move"
+            session: ExportSession to use for export_path; if None, a new session is created
+            replace_paths: paths of files from a previous export of photo to replace, if any
 
         Returns:
             List of full paths of exported photos.  There may be more than one photo exported due
@@ -551,16 +966,15 @@ class PhotosLibrary:
         live image will not be exported, only the JPEG component.
         """
 
-        dest = pathlib.Path(export_path)
-        if not dest.is_dir():
-            raise ValueError(f"export_path {export_path} must be a directory")
+        if session is None:
+            session = ExportSession(export_path, overwrite=overwrite, transfer=transfer)
 
         edited = not original
 
         tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_")
 
         # export original
-        filename = run_script(
+        filename = self._run_script(
             "photoExport", photo.id, tmpdir.name, original, edited, timeout
         )
 
@@ -570,42 +984,278 @@ class PhotosLibrary:
             # may be more than one file exported (e.g. if Live Photo, Photos exports both .jpeg and .mov)
             # TemporaryDirectory will cleanup on return
             files = glob.glob(os.path.join(tmpdir.name, "*"))
-            seen_files = {}
-            for fname in files:
-                path = pathlib.Path(fname)
-                dest_new = dest / path.name
-                if not overwrite:
-                    # ensure there are no name collisions on export
-                    try:
-                        dest_update = seen_files[path.stem]
-                    except KeyError:
-                        count = 1
-                        dest_files = findfiles(
-                            f"{dest_new.stem}*", str(dest_new.parent)
-                        )
-                        dest_files = [pathlib.Path(f).stem.lower() for f in dest_files]
-                        dest_update = dest_new.stem
-                        while dest_update.lower() in dest_files:
-                            dest_update = f"{dest_new.stem} ({count})"
-                            count += 1
-                        seen_files[path.stem] = dest_update
-                    dest_new = dest_new.parent / f"{dest_update}{dest_new.suffix}"
-                ditto(str(path), str(dest_new))
-                exported_paths.append(str(dest_new))
+            exported_paths = session.place_files(files, replace_paths)
             if reveal_in_finder:
-                run_script("revealInFinder", exported_paths)
+                self._run_script("revealInFinder", exported_paths)
         return exported_paths
 
+    def export_photos(
+        self,
+        photos,
+        export_path,
+        original=False,
+        overwrite=False,
+        timeout=120,
+        chunk_size=EXPORT_CHUNK_SIZE,
+        reveal_in_finder=False,
+        transfer="move",
+        workers=EXPORT_WORKERS,
+        verify=False,
+        incremental=False,
+    ):
+        """Export many photos to export_path using one export command per chunk of photos
+
+        Args:
+            photos: list of Photo objects or photo ids to export
+            export_path: path to export to
+            original: if True, export original image, otherwise export current image; default = False
+            overwrite: if True, export will overwrite a file of same name as photo in export_path; default = False
+            timeout: number of seconds to wait for Photos to complete export (for each photo) before timing out; default = 120
+            chunk_size: maximum number of photos to export per call to Photos; default is EXPORT_CHUNK_SIZE
+            reveal_in_finder: if True, will open Finder with exported items selected when done; default = False
+            transfer: how exported files are put in export_path, one of "move", "copy", "ditto",
+                or a callable taking (src, dest); see photoscript.filetransfer; default = "move"
+            workers: number of threads putting exported files in export_path while Photos exports
+                the next chunk; if 0, each chunk is finished before the next is exported;
+                default is EXPORT_WORKERS
+            verify: if True, verify the checksum of each file put in export_path; default = False
+            incremental: if True, skip photos already exported to export_path that haven't
+                changed since, as recorded in a manifest database in export_path; default = False
+
+        Returns:
+            dict of photo id: list of full paths of the files exported for that photo, in the
+            same order as photos.  There may be more than one file exported per photo due to
+            live images and burst images.  The list is empty for a photo that failed to export
+            because Photos exported no file for it.
+
+        Raises:
+            ValueError if export_path is not a valid directory or chunk_size < 1
+            ExportError if verify is True and an exported file does not match its checksum
+
+        Note: exported files are matched to their photos by filename so photos with the same
+        filename are never exported by the same export command.  If a chunk produces a file
+        that can't be matched to a photo (e.g. extra images of a burst when original=True),
+        the photos in that chunk are exported one at a time instead.
+
+        With incremental=True, a photo is exported again if any of its metadata in
+        METADATA_FIELDS has changed (exported images include the metadata) or any of the
+        files from its last export are missing or have changed size.  Files from the last
+        export of a photo that is exported again are replaced, each one only once its new
+        file is in place, and the manifest is updated as each chunk is finished so an export
+        that fails part way loses neither the old files nor the record of the new ones.
+
+        Limitation: Photos' AppleScript interface doesn't expose when a photo's image was
+        last edited or whether it has adjustments, so with incremental=True an edit that
+        leaves the metadata, including width and height, unchanged (e.g. an exposure change)
+        is not detected and the edited image is not exported again.  Delete the manifest
+        (MANIFEST_FILENAME in export_path) or the exported files to export it again.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        photo_ids = list(
+            dict.fromkeys(
+                uuid_to_id(
+                    photo.id if isinstance(photo, Photo) else photo, UUID_SUFFIX_PHOTO
+                )[1]
+                for photo in photos
+            )
+        )
+        fields = METADATA_FIELDS if incremental else ["filename"]
+        metadata = self.fetch_metadata(photo_ids, fields=fields)
+        exported = {photo_id: [] for photo_id in photo_ids}
+
+        manifest = ExportManifest(export_path) if incremental else None
+        variant = "original" if original else "edited"
+        try:
+            to_export, previous = self._export_photos_needed(
+                photo_ids, metadata, manifest, original, exported
+            )
+
+            def placed(photo_ids):
+                """Record photo_ids whose files have been put in export_path"""
+                if manifest is None:
+                    return
+                for photo_id in photo_ids:
+                    paths = exported[photo_id]
+                    if not paths:
+                        # Photos exported nothing: keep the last export and don't record
+                        # the photo so the next incremental export tries it again
+                        continue
+                    # files from the last export that weren't replaced by a new file
+                    for path in previous.get(photo_id, []):
+                        if path not in paths:
+                            pathlib.Path(path).unlink(missing_ok=True)
+                    i = to_export[photo_id]
+                    manifest.record(
+                        metadata["uuid"][i],
+                        variant,
+                        paths,
+                        _metadata_fingerprint(metadata, i),
+                    )
+                manifest.commit()
+
+            # scan export_path once and resolve name collisions for every photo in memory
+            session = ExportSession(
+                export_path, overwrite=overwrite, transfer=transfer, verify=verify
+            )
+            self._export_photos_batches(
+                to_export,
+                [metadata["filename"][i] for i in to_export.values()],
+                export_path,
+                session,
+                exported,
+                original=original,
+                timeout=timeout,
+                chunk_size=chunk_size,
+                workers=workers,
+                previous=previous,
+                placed=placed,
+            )
+        finally:
+            if manifest is not None:
+                manifest.close()
+
+        if reveal_in_finder:
+            exported_paths = [path for paths in exported.values() for path in paths]
+            if exported_paths:
+                self._run_script("revealInFinder", exported_paths)
+        return exported
+
+    def _export_photos_needed(self, photo_ids, metadata, manifest, original, exported):
+        """Return photos that need to be exported
+
+        If manifest is not None, photos whose last export is still current are skipped and
+        their paths stored in exported.
+
+        Returns:
+            tuple of (dict of photo id: index in metadata for photos that need to be exported,
+            dict of photo id: paths of the files from the last export of the photo)
+        """
+        if manifest is None:
+            return {photo_id: i for i, photo_id in enumerate(photo_ids)}, {}
+        variant = "original" if original else "edited"
+        to_export = {}
+        previous = {}
+        for i, photo_id in enumerate(photo_ids):
+            uuid = metadata["uuid"][i]
+            fingerprint = _metadata_fingerprint(metadata, i)
+            paths = manifest.current_paths(uuid, variant, fingerprint)
+            if paths is not None:
+                exported[photo_id] = paths
+                continue
+            # the previous export is replaced by the new files as they are put in place
+            if paths := manifest.exported_paths(uuid, variant):
+                previous[photo_id] = paths
+            to_export[photo_id] = i
+        return to_export, previous
+
+    def _export_photos_batches(
+        self,
+        photo_ids,
+        filenames,
+        export_path,
+        session,
+        exported,
+        original,
+        timeout,
+        chunk_size,
+        workers,
+        previous=None,
+        placed=None,
+    ):
+        """Export photo_ids in chunks, storing the exported paths for each photo in exported
+
+        Args:
+            previous: dict of photo id: paths from the last export of the photo to replace
+            placed: called with a list of photo ids once their files are in export_path
+        """
+        previous = previous or {}
+        placed = placed or (lambda photo_ids: None)
+
+        def placed_by(pipeline):
+            photo_ids = pipeline.pop_completed()
+            for photo_id in photo_ids:
+                exported[photo_id] = pipeline.results[photo_id]
+            if photo_ids:
+                placed(photo_ids)
+
+        # Photos exports the next chunk while workers put the files of earlier chunks in place
+        pipeline = ExportPipeline(session, workers=workers)
+        try:
+            with pipeline:
+                for batch in _export_batches(list(photo_ids), filenames, chunk_size):
+                    tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_")
+                    try:
+                        self._run_script(
+                            "photosLibraryExport",
+                            [photo_id for photo_id, _ in batch],
+                            tmpdir.name,
+                            original,
+                            not original,
+                            timeout * len(batch),
+                        )
+                    except Exception:
+                        tmpdir.cleanup()
+                        raise
+                    files_by_stem = {}
+                    for fname in glob.glob(os.path.join(tmpdir.name, "*")):
+                        stem = pathlib.Path(fname).stem.lower()
+                        files_by_stem.setdefault(stem, []).append(fname)
+                    if set(files_by_stem) - {stem for _, stem in batch}:
+                        # can't tell which photo the unmatched files belong to
+                        tmpdir.cleanup()
+                        for photo_id, _ in batch:
+                            exported[photo_id] = self._export_photo(
+                                Photo._from_id(photo_id),
+                                export_path,
+                                original=original,
+                                timeout=timeout,
+                                session=session,
+                                replace_paths=previous.get(photo_id),
+                            )
+                            placed([photo_id])
+                        continue
+                    pipeline.submit(
+                        tmpdir,
+                        [
+                            (photo_id, files_by_stem.get(stem, []))
+                            for photo_id, stem in batch
+                        ],
+                        {
+                            photo_id: previous[photo_id]
+                            for photo_id, _ in batch
+                            if photo_id in previous
+                        },
+                    )
+                    placed_by(pipeline)
+        finally:
+            # record the photos placed before any error too
+            placed_by(pipeline)
+        exported.update(pipeline.results)
+
 
 class Album:
-    def __init__(self, uuid):
+    def __init__(self, uuid, validate=True):
+        """Create an Album object
+
+        Args:
+            uuid: uuid of album
+            validate: if True (default), raise ValueError if album does not exist in Photos
+
+        Raises:
+            ValueError if validate is True and album does not exist
+        """
         # check to see if we need to add UUID suffix
         uuid, id_ = uuid_to_id(uuid, UUID_SUFFIX_ALBUM)
-        if valuuidalbum := run_script("albumExists", id_):
-            self.id = id_
-            self._uuid = uuid
-        else:
+        if validate and not run_script("albumExists", id_):
             raise ValueError(f"Invalid album id: {uuid}")
+        self.id = id_
+        self._uuid = uuid
+
+    @classmethod
+    def _from_id(cls, uuid):
+        """Create Album for an id returned by Photos without the round-trip to check it exists"""
+        return cls(uuid, validate=False)
 
     @property
     def uuid(self):
@@ -613,12 +1263,14 @@ class Album:
         return self._uuid
 
     @property
+    @cached
     def name(self):
         """name of album (read/write)"""
         name = run_script("albumName", self.id)
         return name if name != kMissingValue else ""
 
     @name.setter
+    @invalidates("Album.name")
     def name(self, name):
         """set name of album"""
         name = "" if name is None else name
@@ -630,12 +1282,14 @@ class Album:
         return self.name
 
     @title.setter
+    @invalidates("Album.name")
     def title(self, title):
         """set title of album (alias for name)"""
         name = "" if title is None else title
         return run_script("albumSetName", self.id, name)
 
     @property
+    @cached
     def parent_id(self):
         """parent container id"""
         return run_script("albumParent", self.id)
@@ -646,7 +1300,7 @@ class Album:
         """Return parent Folder object"""
         parent_id = self.parent_id
         if parent_id != 0:
-            return Folder(parent_id)
+            return Folder(parent_id, validate=False)
         else:
             return None
 
@@ -668,20 +1322,50 @@ class Album:
     def photos(self):
         """list of Photo objects for photos contained in album"""
         photo_ids = run_script("albumPhotes", self.id)
-        return [Photo(uuid) for uuid in photo_ids]
+        return [Photo._from_id(uuid) for uuid in photo_ids]
 
-    def add(self, photos):
+    def add(self, photos, chunk_size=ALBUM_ADD_CHUNK_SIZE):
         """add photos from the library to album
 
         Args:
             photos: list of Photo objects to add to album
+            chunk_size: maximum number of photos to add per call to Photos; default is ALBUM_ADD_CHUNK_SIZE
 
         Returns:
             list of Photo objects for added photos
+
+        Raises:
+            ValueError if chunk_size < 1
+            AppleScriptError if Photos did not add all the photos to the album
         """
-        uuids = [p.id for p in photos]
-        added_ids = run_script("albumAdd", self.id, uuids)
-        return [Photo(uuid) for uuid in added_ids]
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        photo_ids = list(dict.fromkeys(photo.id for photo in photos))
+        if not photo_ids:
+            return []
+
+        # photos already in the album don't change its count so aren't sent to Photos
+        album_photo_ids = set(run_script("albumPhotes", self.id))
+        new_photo_ids = [
+            photo_id for photo_id in photo_ids if photo_id not in album_photo_ids
+        ]
+        expected_count = len(album_photo_ids)
+        for i in range(0, len(new_photo_ids), chunk_size):
+            chunk = new_photo_ids[i : i + chunk_size]
+            expected_count += len(chunk)
+            album_count = run_script("albumAdd", self.id, chunk, expected_count)
+            if album_count < expected_count:
+                # verify with a set difference as the count could be off if the album changed
+                added_ids = set(new_photo_ids[: i + chunk_size])
+                missing = added_ids - set(run_script("albumPhotes", self.id))
+                if missing:
+                    raise AppleScriptError(
+                        f"Could not add {len(missing)} photos to album {self.id}: {sorted(missing)}"
+                    )
+            expected_count = album_count
+
+        _album_index_add(self.id, photo_ids)
+        return [Photo._from_id(photo_id) for photo_id in photo_ids]
 
     def import_photos(self, photo_paths, skip_duplicate_check=False):
         """import photos
@@ -705,6 +1389,8 @@ class Album:
         overwrite=False,
         timeout=120,
         reveal_in_finder=False,
+        transfer="move",
+        incremental=False,
     ):
         """Export photos in album to path
 
@@ -715,6 +1401,10 @@ class Album:
             overwrite: if True, export will overwrite a file of same name as photo in export_path; default = False
             timeout: number of seconds to wait for Photos to complete export (for each photo) before timing out; default = 120
             reveal_in_finder: if True, will open Finder with exported items selected when done; default = False
+            transfer: how exported files are put in export_path, one of "move", "copy", "ditto",
+                or a callable taking (src, dest); see photoscript.filetransfer; default = "move"
+            incremental: if True, skip photos already exported to export_path that haven't
+                changed since; see PhotosLibrary.export_photos(); default = False
 
         Returns:
             List of full paths of exported photos.  There may be more than one photo exported due
@@ -729,16 +1419,16 @@ class Album:
         burst set will be exported for burst photos and the live movie component of a
         live image will not be exported, only the JPEG component.
         """
-        exported_photos = []
-        for photo in self.photos():
-            exported_photos.extend(
-                photo.export(
-                    export_path=export_path,
-                    original=original,
-                    overwrite=overwrite,
-                    timeout=timeout,
-                )
-            )
+        exported = PhotosLibrary().export_photos(
+            self.photos(),
+            export_path=export_path,
+            original=original,
+            overwrite=overwrite,
+            timeout=timeout,
+            transfer=transfer,
+            incremental=incremental,
+        )
+        exported_photos = [path for paths in exported.values() for path in paths]
         if reveal_in_finder and exported_photos:
             run_script("revealInFinder", exported_photos)
         return exported_photos
@@ -755,24 +1445,17 @@ class Album:
 
         Returns:
             new Album object for the new album with photos removed.
+
+        Raises:
+            AppleScriptError if error creating the new album
         """
-        photoslib = PhotosLibrary()
-        new_album = photoslib.create_album(
-            photoslib._temp_album_name(), folder=self.parent
-        )
-        old_photos = self.photos()
-        new_photo_uuids = [
-            photo.id for photo in old_photos if photo.id not in photo_ids
+        photo_ids = set(photo_ids)
+        new_photo_ids = [
+            photo_id
+            for photo_id in run_script("albumPhotes", self.id)
+            if photo_id not in photo_ids
         ]
-        new_photos = [Photo(uuid) for uuid in new_photo_uuids]
-        if new_photos:
-            new_album.add(new_photos)
-        name = self.name
-        photoslib.delete_album(self)
-        new_album.name = name
-        self.id = new_album.id
-        self._uuid = new_album.uuid
-        return new_album
+        return self._rebuild(new_photo_ids, self.parent, removed_photo_ids=photo_ids)
 
     def remove(self, photos):
         """Remove photos from album.
@@ -802,9 +1485,10 @@ class Album:
 
         Returns:
             new Album: object for the new album moved to the folder.
-        """
-        photoslib = PhotosLibrary()
 
+        Raises:
+            AppleScriptError if error creating the new album
+        """
         if folder is not None and self.parent_id == folder.id:
             # already in the right folder
             return self
@@ -812,13 +1496,33 @@ class Album:
             # already at top level
             return self
 
-        new_album = photoslib.create_album(photoslib._temp_album_name(), folder=folder)
-        new_album.add(self.photos())
+        return self._rebuild(None, folder)
+
+    def _rebuild(self, photo_ids, folder, removed_photo_ids=frozenset()):
+        """Replace album with a new album of the same name in folder with one AppleScript call
 
-        name = self.name
-        photoslib.delete_album(self)
+        Args:
+            photo_ids: list of photo ids for the new album or None for all photos in the album
+            folder: Folder object to create the new album in or None for top level
+            removed_photo_ids: set of photo ids in the album that aren't in the new album
+
+        Returns:
+            new Album object; this object is also updated to refer to the new album
 
-        new_album.name = name
+        Raises:
+            AppleScriptError if error creating the new album; the old album is not deleted
+        """
+        # None is sent to AppleScript as a null descriptor, not missing value
+        new_id = run_script(
+            "albumRebuild",
+            self.id,
+            photo_ids if photo_ids is not None else kMissingValue,
+            folder.idstring if folder is not None else kMissingValue,
+        )
+        if new_id == kMissingValue:
+            raise AppleScriptError(f"Could not rebuild album {self.id}")
+        _album_index_replace_album(self.id, new_id, removed_photo_ids)
+        new_album = Album._from_id(new_id)
         self.id = new_album.id
         self._uuid = new_album.uuid
         return new_album
@@ -837,6 +1541,7 @@ class Folder:
         uuid: str | None = None,
         path: list[str] | None = None,
         idstring: str | None = None,
+        validate: bool = True,
     ):
         """Create a Folder object; only one of path, uuid, or idstring should be specified
 
@@ -849,6 +1554,8 @@ class Folder:
             uuid: uuid of folder: "E0CD4B6C-CB43-46A6-B8A3-67D1FB4D0F3D/L0/020" or "E0CD4B6C-CB43-46A6-B8A3-67D1FB4D0F3D"
             idstring: idstring of folder:
                 "folder id(\"E0CD4B6C-CB43-46A6-B8A3-67D1FB4D0F3D/L0/020\") of folder id(\"CB051A4C-2CB7-4B90-B59B-08CC4D0C2823/L0/020\")"
+            validate: if True (default), raise ValueError if folder does not exist in Photos;
+                a folder specified by path or uuid is always looked up in Photos
         """
         if sum(bool(x) for x in (path, uuid, idstring)) != 1:
             raise ValueError(
@@ -876,9 +1583,18 @@ class Folder:
             if self._idstring == kMissingValue:
                 raise ValueError(f"Folder id {self._id} does not exist")
 
-        if not run_script("folderExists", self._idstring):
+        if validate and not run_script("folderExists", self._idstring):
             raise ValueError(f"Folder {self._idstring} does not exist")
 
+    @classmethod
+    def _from_idstring(cls, idstring):
+        """Create Folder for an idstring returned by Photos without the round-trip to check it exists"""
+        folder = cls(idstring=idstring, validate=False)
+        if match := _IDSTRING_ID_RE.match(idstring):
+            # the id is in the idstring so uuid and id don't need a round-trip either
+            folder._uuid, folder._id = uuid_to_id(match.group(1), UUID_SUFFIX_FOLDER)
+        return folder
+
     @property
     def idstring(self) -> str:
         """idstring of folder"""
@@ -905,12 +1621,14 @@ class Folder:
         return self._id
 
     @property
+    @cached
     def name(self):
         """name of folder (read/write)"""
         name = run_script("folderName", self._idstring)
         return name if name != kMissingValue else ""
 
     @name.setter
+    @invalidates("Folder.name")
     def name(self, name):
         """set name of photo"""
         name = "" if name is None else name
@@ -922,6 +1640,7 @@ class Folder:
         return self.name
 
     @title.setter
+    @invalidates("Folder.name")
     def title(self, title):
         """set title of folder (alias for name)"""
         name = "" if title is None else title
@@ -938,7 +1657,11 @@ class Folder:
     def parent(self):
         """Return parent Folder object"""
         parent_idstring = self.parent_id
-        return Folder(idstring=parent_idstring) if parent_idstring is not None else None
+        return (
+            Folder._from_idstring(parent_idstring)
+            if parent_idstring is not None
+            else None
+        )
 
     def path_str(self, delim="/"):
         """Return internal library path to folder as string.
@@ -962,25 +1685,27 @@ class Folder:
         list if folder is not contained in another folders.
         """
         folder_path = run_script("folderGetPathFolderIDScript", self._idstring)
-        return [Folder(idstring=folder) for folder in folder_path]
+        return [Folder._from_idstring(folder) for folder in folder_path]
 
     @property
     def albums(self):
         """list of Album objects for albums contained in folder"""
         album_ids = run_script("folderAlbums", self._idstring)
-        return [Album(uuid) for uuid in album_ids]
+        return [Album._from_id(uuid) for uuid in album_ids]
 
     def album(self, name):
         """Return Album object contained in this folder for album named name
         or None if no matching album
         """
-        return next((album for album in self.albums if album.name == name), None)
+        folder = self._tree_folder()
+        album = folder.album(name) if folder is not None else None
+        return Album._from_id(album.id) if album is not None else None
 
     @property
     def subfolders(self):
         """list of Folder objects for immediate sub-folders contained in folder"""
         folder_idstrings = run_script("folderFolders", self._idstring)
-        return [Folder(idstring=ids) for ids in folder_idstrings]
+        return [Folder._from_idstring(ids) for ids in folder_idstrings]
 
     def folder(self, name):
         """Folder object for first subfolder folder named name.
@@ -991,7 +1716,20 @@ class Folder:
         Returns:
             Folder object for first subfolder who's name matches name or None if not found
         """
-        return next((folder for folder in self.subfolders if folder.name == name), None)
+        folder = self._tree_folder()
+        subfolder = folder.folder(name) if folder is not None else None
+        return (
+            Folder._from_idstring(subfolder.idstring) if subfolder is not None else None
+        )
+
+    def _tree_folder(self):
+        """Return this folder's TreeFolder from a snapshot of the library or None if not found;
+        names of children are read with one call instead of one call per child"""
+        # imported here as photoscript.tree subclasses Folder and Album
+        from .tree import LibraryTree
+
+        folders, albums = run_script("photosLibraryTree")
+        return LibraryTree(folders, albums).folder(uuid=self.id, top_level=False)
 
     def create_album(self, name: str) -> "Album":
         """Creates an album in this folder
@@ -1021,14 +1759,27 @@ class Folder:
 
 
 class Photo:
-    def __init__(self, uuid):
+    def __init__(self, uuid, validate=True):
+        """Create a Photo object
+
+        Args:
+            uuid: uuid of photo
+            validate: if True (default), raise ValueError if photo does not exist in Photos
+
+        Raises:
+            ValueError if validate is True and photo does not exist
+        """
         # check to see if we need to add UUID suffix
         uuid, id_ = uuid_to_id(uuid, UUID_SUFFIX_PHOTO)
-        if valid := run_script("photoExists", uuid):
-            self.id = id_
-            self._uuid = uuid
-        else:
+        if validate and not run_script("photoExists", uuid):
             raise ValueError(f"Invalid photo id: {uuid}")
+        self.id = id_
+        self._uuid = uuid
+
+    @classmethod
+    def _from_id(cls, uuid):
+        """Create Photo for an id returned by Photos without the round-trip to check it exists"""
+        return cls(uuid, validate=False)
 
     @property
     def uuid(self):
@@ -1036,12 +1787,14 @@ class Photo:
         return self._uuid
 
     @property
+    @cached
     def name(self):
         """name of photo (read/write)"""
         name = run_script("photoName", self.id)
         return name if name not in [kMissingValue, ""] else ""
 
     @name.setter
+    @invalidates("Photo.name")
     def name(self, name):
         """set name of photo"""
         name = "" if name is None else name
@@ -1053,24 +1806,28 @@ class Photo:
         return self.name
 
     @title.setter
+    @invalidates("Photo.name")
     def title(self, title):
         """set title of photo (alias for name)"""
         name = "" if title is None else title
         return run_script("photoSetName", self.id, name)
 
     @property
+    @cached
     def description(self):
         """description of photo"""
         descr = run_script("photoDescription", self.id)
         return descr if descr != kMissingValue else ""
 
     @description.setter
+    @invalidates("Photo.description")
     def description(self, descr):
         """set description of photo"""
         descr = "" if descr is None else descr
         return run_script("photoSetDescription", self.id, descr)
 
     @property
+    @cached
     def keywords(self):
         """list of keywords for photo"""
         keywords = run_script("photoKeywords", self.id)
@@ -1079,39 +1836,46 @@ class Photo:
         return keywords
 
     @keywords.setter
+    @invalidates("Photo.keywords")
     def keywords(self, keywords):
         """set keywords to list"""
         keywords = [] if keywords is None else keywords
         return run_script("photoSetKeywords", self.id, keywords)
 
     @property
+    @cached
     def favorite(self):
         """return favorite status (boolean)"""
         return run_script("photoFavorite", self.id)
 
     @favorite.setter
+    @invalidates("Photo.favorite")
     def favorite(self, favorite):
         """set favorite status (boolean)"""
         favorite = bool(favorite)
         return run_script("photoSetFavorite", self.id, favorite)
 
     @property
+    @cached
     def height(self):
         """height of photo in pixels"""
         return run_script("photoHeight", self.id)
 
     @property
+    @cached
     def width(self):
         """width of photo in pixels"""
         return run_script("photoWidth", self.id)
 
     @property
+    @cached
     def altitude(self):
         """GPS altitude of photo in meters"""
         altitude = run_script("photoAltitude", self.id)
         return altitude if altitude != kMissingValue else None
 
     @property
+    @cached
     def location(self):
         """The GPS latitude and longitude, in a tuple of 2 numbers or None.
         Latitude in range -90.0 to 90.0, longitude in range -180.0 to 180.0.
@@ -1122,6 +1886,7 @@ class Photo:
         return tuple(location)
 
     @location.setter
+    @invalidates("Photo.location")
     def location(self, location):
         """Set GPS latitude and longitude, in a tuple of 2 numbers or None.
         Latitude in range -90.0 to 90.0, longitude in range -180.0 to 180.0.
@@ -1146,11 +1911,13 @@ class Photo:
         return run_script("photoSetLocation", self.id, location)
 
     @property
+    @cached
     def date(self):
         """date of photo as timezone-naive datetime.datetime object"""
         return run_script("photoDate", self.id)
 
     @date.setter
+    @invalidates("Photo.date")
     def date(self, date):
         """Set date of photo as timezone-naive datetime.datetime object
 
@@ -1160,15 +1927,23 @@ class Photo:
         return run_script("photoSetDate", self.id, date)
 
     @property
+    @cached
     def filename(self):
         """filename of photo"""
         return run_script("photoFilename", self.id)
 
     @property
     def albums(self):
-        """list of Album objects for albums photo is contained in"""
-        albums = run_script("photoAlbums", self.id)
-        return [Album(album) for album in albums]
+        """list of Album objects for albums photo is contained in
+
+        Uses the index built by PhotosLibrary.album_membership_index() if available
+        instead of searching every album in the library; see there for when it is refreshed.
+        """
+        if (index := _album_index()) is not None:
+            albums = index.get(self.id, [])
+        else:
+            albums = run_script("photoAlbums", self.id)
+        return [Album._from_id(album) for album in albums]
 
     def export(
         self,
@@ -1177,6 +1952,7 @@ class Photo:
         overwrite=False,
         timeout=120,
         reveal_in_finder=False,
+        transfer="move",
     ):
         """Export photo
 
@@ -1187,6 +1963,8 @@ class Photo:
             overwrite: if True, export will overwrite a file of same name as photo in export_path; default = False
             timeout: number of seconds to wait for Photos to complete export before timing out; default = 120
             reveal_in_finder: if True, will open Finder with exported items selected when done; default = False
+            transfer: how exported files are put in export_path, one of "move", "copy", "ditto",
+                or a callable taking (src, dest); see photoscript.filetransfer; default = "move"
 
         Returns:
             List of full paths of exported photos.  There may be more than one photo exported due
@@ -1208,12 +1986,13 @@ class Photo:
             overwrite=overwrite,
             timeout=timeout,
             reveal_in_finder=reveal_in_finder,
+            transfer=transfer,
         )
 
     def duplicate(self):
         """duplicates the photo and returns Photo object for the duplicate"""
         dup_id = run_script("photoDuplicate", self.id)
-        return Photo(dup_id)
+        return Photo._from_id(dup_id)
 
     def spotlight(self):
         """spotlight the photo in Photos"""
@@ -0,0 +1,313 @@
+"""Persistent on-disk cache for Photo, Album, and Folder metadata
+
+When enabled with enable_cache(), values returned by the metadata properties of Photo,
+Album, and Folder are stored in a local SQLite database keyed by the item's id so that
+later reads, including reads from a new process, do not need to send an Apple Event.
+
+Values are stored as JSON, not pickled, so opening a cache database doesn't run code from it;
+values that can't be stored as JSON are not cached.
+
+Cached values are invalidated when they are changed through photoscript (e.g. by setting
+Photo.name) and the whole cache is cleared when the library changes. Changes to the library
+are detected by comparing the number of photos in the library, the id of the last photo
+added, and the path and modification time of the library's database; this check is done at
+most once every check_interval seconds.  If library_path isn't passed to enable_cache(), the
+library open in Photos is used (see utils.photos_library_path).  If that can't be found, a
+warning is logged: changes made outside of photoscript that don't add or remove photos
+(e.g. editing a title in Photos) are then not detected.
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from .script_loader import run_script
+from .utils import photos_library_path, user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# name of the cache database in the photoscript cache directory
+CACHE_FILENAME = "metadata_cache.db"
+
+# default number of seconds between checks for changes to the library
+CACHE_CHECK_INTERVAL = 60
+
+# format of the values in the cache database; a cache in another format is cleared when opened
+CACHE_FORMAT = "json"
+
+# returned by MetadataCache.get() if a value is not in the cache
+MISSING = object()
+
+# the active cache, if any; set with enable_cache()
+_cache: MetadataCache | None = None
+
+
+class MetadataCache:
+    """Persistent cache of metadata values keyed by item id and field name"""
+
+    def __init__(
+        self,
+        cache_path: str | os.PathLike | None = None,
+        library_path: str | os.PathLike | None = None,
+        check_interval: float = CACHE_CHECK_INTERVAL,
+    ):
+        """Open (or create) a metadata cache
+
+        Args:
+            cache_path: path to the cache database; default is metadata_cache.db in the
+                photoscript cache directory
+            library_path: path to the Photos library being used; the modification time of the
+                library's database is used to detect changes to the library; default is the
+                library open in Photos
+            check_interval: minimum number of seconds between checks for changes to the library
+        """
+        self.cache_path = (
+            pathlib.Path(cache_path)
+            if cache_path is not None
+            else user_cache_dir() / CACHE_FILENAME
+        )
+        self.library_path = (
+            pathlib.Path(library_path).expanduser()
+            if library_path is not None
+            else None
+        )
+        self.check_interval = check_interval
+        self._last_check = None
+        self._warned = False
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.cache_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS metadata "
+            "(id TEXT, field TEXT, value BLOB, PRIMARY KEY (id, field))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS about (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        row = self._conn.execute(
+            "SELECT value FROM about WHERE key = 'format'"
+        ).fetchone()
+        if row is None or row[0] != CACHE_FORMAT:
+            # values written by earlier versions of photoscript were pickled
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM metadata")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO about (key, value) VALUES ('format', ?)",
+                (CACHE_FORMAT,),
+            )
+            self._conn.execute("COMMIT")
+
+    def get(self, id_: str, field: str):
+        """Return cached value of field for item id_ or MISSING if not cached"""
+        self._check_library()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM metadata WHERE id = ? AND field = ?", (id_, field)
+            ).fetchone()
+        return _decode(json.loads(row[0])) if row is not None else MISSING
+
+    def set(self, id_: str, field: str, value):
+        """Store value of field for item id_; values that can't be stored as JSON are ignored"""
+        try:
+            data = json.dumps(_encode(value))
+        except TypeError:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata (id, field, value) VALUES (?, ?, ?)",
+                (id_, field, data),
+            )
+
+    def invalidate(self, id_: str, fields: list[str] | tuple[str, ...] | None = None):
+        """Remove cached values for item id_
+
+        Args:
+            id_: id of the item
+            fields: fields to remove; if None, all fields for the item are removed
+        """
+        with self._lock:
+            if fields is None:
+                self._conn.execute("DELETE FROM metadata WHERE id = ?", (id_,))
+            else:
+                self._conn.executemany(
+                    "DELETE FROM metadata WHERE id = ? AND field = ?",
+                    [(id_, field) for field in fields],
+                )
+
+    def clear(self):
+        """Remove all cached values"""
+        with self._lock:
+            self._conn.execute("DELETE FROM metadata")
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0]
+
+    def _check_library(self):
+        """Clear the cache if the library has changed since the values were cached"""
+        now = time.monotonic()
+        if (
+            self._last_check is not None
+            and now - self._last_check < self.check_interval
+        ):
+            return
+        self._last_check = now
+        token = self._library_token()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM about WHERE key = 'library_token'"
+            ).fetchone()
+            if row is not None and row[0] == token:
+                return
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM metadata")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO about (key, value) VALUES ('library_token', ?)",
+                (token,),
+            )
+            self._conn.execute("COMMIT")
+
+    def _library_token(self) -> str:
+        """Return a string that changes whenever the library changes"""
+        count = run_script("photosLibraryCount")
+        token = [str(count)]
+        # photos are numbered in the order they were added so this changes when a photo is
+        # added even if another was deleted
+        token.append(
+            str(run_script("photosLibraryGetPhotoByNumber", count)) if count else ""
+        )
+        library_path = self.library_path or photos_library_path()
+        if library_path is None:
+            if not self._warned:
+                logger.warning(
+                    "Could not find the Photos library; changes made to cached metadata "
+                    "outside of photoscript won't be detected.  Pass library_path to "
+                    "enable_cache() to detect them."
+                )
+                self._warned = True
+        else:
+            db_path = library_path / "database" / "Photos.sqlite"
+            token.append(str(library_path))
+            for path in (db_path, db_path.with_name(f"{db_path.name}-wal")):
+                try:
+                    token.append(str(path.stat().st_mtime_ns))
+                except FileNotFoundError:
+                    token.append("")
+        return ":".join(token)
+
+
+def _encode(value):
+    """Encode a cached property value as JSON-compatible data
+
+    Raises:
+        TypeError if value can't be stored in the cache
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"$tuple": [_encode(item) for item in value]}
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"can't cache value of type {type(value).__name__}")
+
+
+def _decode(value):
+    """Decode value encoded by _encode()"""
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "$tuple" in value:
+        return tuple(_decode(item) for item in value["$tuple"])
+    return datetime.datetime.fromisoformat(value["$datetime"])
+
+
+def enable_cache(
+    cache_path: str | os.PathLike | None = None,
+    library_path: str | os.PathLike | None = None,
+    check_interval: float = CACHE_CHECK_INTERVAL,
+) -> MetadataCache:
+    """Enable the persistent metadata cache for Photo, Album, and Folder properties
+
+    Args:
+        cache_path: path to the cache database; default is metadata_cache.db in the
+            photoscript cache directory
+        library_path: path to the Photos library being used; the modification time of the
+            library's database is used to detect changes to the library; default is the
+            library open in Photos.  If neither is known only photos being added or removed
+            are detected.
+        check_interval: minimum number of seconds between checks for changes to the library
+
+    Returns:
+        MetadataCache: the active cache
+    """
+    global _cache
+    disable_cache()
+    _cache = MetadataCache(cache_path, library_path, check_interval)
+    return _cache
+
+
+def disable_cache():
+    """Disable the persistent metadata cache; the cache database is left on disk"""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def _cache_key(obj) -> str:
+    """Return the key used to cache values for a Photo, Album, or Folder"""
+    # Folder objects are referenced by idstring and may not know their id
+    return getattr(obj, "_idstring", None) or obj.id
+
+
+def cached(fget):
+    """Decorator for property getters whose value should be stored in the metadata cache"""
+    field = fget.__qualname__
+
+    @functools.wraps(fget)
+    def wrapper(self):
+        if _cache is None:
+            return fget(self)
+        key = _cache_key(self)
+        value = _cache.get(key, field)
+        if value is MISSING:
+            value = fget(self)
+            _cache.set(key, field, value)
+        return value
+
+    return wrapper
+
+
+def invalidates(*fields: str):
+    """Decorator for methods that change the value of the cached fields, e.g. "Photo.name" """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                if _cache is not None:
+                    _cache.invalidate(_cache_key(self), fields)
+
+        return wrapper
+
+    return decorator
@@ -4,3 +4,8 @@
 class AppleScriptError(Exception):
     def __init__(self, *message):
         super().__init__(*message)
+
+
+class ExportError(Exception):
+    def __init__(self, *message):
+        super().__init__(*message)
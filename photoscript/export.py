@@ -0,0 +1,482 @@
+"""Helpers for exporting photos from Photos to a destination directory"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .exceptions import ExportError
+from .filetransfer import FileTransfer, get_file_transfer
+
+# number of bytes read at a time when computing checksums
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# name of the manifest database written to the export directory for incremental exports
+MANIFEST_FILENAME = ".photoscript_export.db"
+
+
+def file_checksum(path: str | os.PathLike) -> str:
+    """Return the SHA-256 checksum of the file at path as a hex string"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fd:
+        while chunk := fd.read(CHECKSUM_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def metadata_fingerprint(metadata: dict) -> str:
+    """Return a fingerprint of a photo's metadata as a hex string
+
+    Args:
+        metadata: dict of field: value as returned by PhotosLibrary.fetch_metadata() for a photo
+    """
+    values = repr(sorted(metadata.items()))
+    return hashlib.sha256(values.encode()).hexdigest()
+
+
+class ExportManifest:
+    """Record of the photos exported to a directory used for incremental exports
+
+    The manifest is a SQLite database in the export directory holding, for each exported
+    photo and variant ("original" or "edited"), the exported files, their sizes, and a
+    fingerprint of the photo.  A photo doesn't need to be exported again if its fingerprint
+    is unchanged and its exported files are still present with the recorded sizes.
+    """
+
+    def __init__(self, export_path: str | os.PathLike):
+        """Open (or create) the manifest for export_path
+
+        Raises:
+            ValueError if export_path is not a valid directory
+        """
+        self.dest = pathlib.Path(export_path)
+        if not self.dest.is_dir():
+            raise ValueError(f"export_path {export_path} must be a directory")
+        self._conn = sqlite3.connect(str(self.dest / MANIFEST_FILENAME))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS export ("
+            "uuid TEXT, variant TEXT, paths TEXT, sizes TEXT, fingerprint TEXT, "
+            "exported REAL, PRIMARY KEY (uuid, variant))"
+        )
+        self._conn.commit()
+
+    def current_paths(
+        self, uuid: str, variant: str, fingerprint: str
+    ) -> list[str] | None:
+        """Return the paths exported for a photo if they are still valid, otherwise None
+
+        Args:
+            uuid: UUID of the photo
+            variant: "original" or "edited"
+            fingerprint: current fingerprint of the photo
+        """
+        row = self._conn.execute(
+            "SELECT paths, sizes, fingerprint FROM export WHERE uuid = ? AND variant = ?",
+            (uuid, variant),
+        ).fetchone()
+        if row is None or row[2] != fingerprint:
+            return None
+        paths = [str(self.dest / name) for name in json.loads(row[0])]
+        if not paths:
+            # nothing was exported, e.g. recorded by an earlier version of photoscript
+            return None
+        for path, size in zip(paths, json.loads(row[1])):
+            try:
+                if os.stat(path).st_size != size:
+                    return None
+            except FileNotFoundError:
+                return None
+        return paths
+
+    def exported_paths(self, uuid: str, variant: str) -> list[str]:
+        """Return the paths recorded for a photo, whether or not they are still valid"""
+        row = self._conn.execute(
+            "SELECT paths FROM export WHERE uuid = ? AND variant = ?", (uuid, variant)
+        ).fetchone()
+        return [str(self.dest / name) for name in json.loads(row[0])] if row else []
+
+    def record(self, uuid: str, variant: str, paths: list[str], fingerprint: str):
+        """Record the files exported for a photo
+
+        Args:
+            uuid: UUID of the photo
+            variant: "original" or "edited"
+            paths: full paths of the exported files which must be in the export directory
+            fingerprint: fingerprint of the photo when it was exported
+        """
+        names = [os.path.relpath(path, self.dest) for path in paths]
+        sizes = [os.stat(path).st_size for path in paths]
+        self._conn.execute(
+            "INSERT OR REPLACE INTO export "
+            "(uuid, variant, paths, sizes, fingerprint, exported) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                uuid,
+                variant,
+                json.dumps(names),
+                json.dumps(sizes),
+                fingerprint,
+                time.time(),
+            ),
+        )
+
+    def commit(self):
+        """Commit recorded exports to the database"""
+        self._conn.commit()
+
+    def close(self):
+        """Commit and close the manifest"""
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ExportSession:
+    """Puts exported files in a destination directory, resolving name collisions
+
+    The destination is scanned once when the session is created and the names of files
+    placed by the session are added to an in-memory index so collisions are resolved without
+    listing the directory again for every file.  If overwrite is False, a file whose name
+    is already used in the destination gets a counter appended, e.g. "IMG_1234 (1).jpeg".
+    Names are reserved by creating the destination files exclusively so files created by
+    other writers after the scan are never overwritten.  A session may be shared by threads.
+
+    Files from a previous export of a photo can be passed to place_files() or reserve_files()
+    as replace_paths; the new files then take their names and each old file is kept until the
+    new file is in place.
+    """
+
+    def __init__(
+        self,
+        export_path: str | os.PathLike,
+        overwrite: bool = False,
+        transfer: str | FileTransfer = "move",
+        verify: bool = False,
+    ):
+        """Create an export session for export_path
+
+        Args:
+            export_path: directory to put exported files in
+            overwrite: if True, replace existing files with the same name
+            transfer: how files are put in export_path, one of "move", "copy", "ditto",
+                or a callable taking (src, dest); see photoscript.filetransfer
+            verify: if True, compare the checksum of each file before and after it is put
+                in export_path and raise ExportError if they don't match
+
+        Raises:
+            ValueError if export_path is not a valid directory
+        """
+        self.dest = pathlib.Path(export_path)
+        if not self.dest.is_dir():
+            raise ValueError(f"export_path {export_path} must be a directory")
+        self.overwrite = overwrite
+        self.transfer = get_file_transfer(transfer)
+        self.verify = verify
+        self._lock = threading.Lock()
+        # destination paths that replace a file from a previous export
+        self._replacing: set[str] = set()
+        # lower case stems of every name in dest and next counter to try for each stem
+        self._stems: set[str] = set()
+        self._counters: dict[str, int] = {}
+        if not overwrite:
+            with os.scandir(self.dest) as entries:
+                self._stems.update(
+                    os.path.splitext(entry.name)[0].lower() for entry in entries
+                )
+
+    def place_files(
+        self, files: list[str], replace_paths: list[str] | None = None
+    ) -> list[str]:
+        """Put the files exported for a single photo in the destination
+
+        Files with the same stem (e.g. the .jpeg and .mov of a live photo) are kept together
+        with the same destination stem.
+
+        Args:
+            files: list of paths of the files exported for the photo
+            replace_paths: paths of the files from a previous export of the photo, if any
+
+        Returns:
+            list of full destination paths in the same order as files
+        """
+        dest_paths = self.reserve_files(files, replace_paths)
+        self.transfer_files(files, dest_paths)
+        return dest_paths
+
+    def reserve_files(
+        self, files: list[str], replace_paths: list[str] | None = None
+    ) -> list[str]:
+        """Choose and reserve the destination paths for the files exported for a single photo
+
+        Reserving is fast and is done in export order so names are assigned the same way
+        regardless of the order in which files are later transferred.
+
+        Args:
+            files: list of paths of the files exported for the photo
+            replace_paths: paths of the files from a previous export of the photo, if any;
+                files with the same stem as one of these replace it
+
+        Returns:
+            list of full destination paths in the same order as files
+        """
+        groups: dict[str, list[pathlib.Path]] = {}
+        for fname in files:
+            path = pathlib.Path(fname)
+            groups.setdefault(path.stem, []).append(path)
+
+        dest_paths = {}
+        for stem, paths in groups.items():
+            dest_stem = stem if self.overwrite else None
+            if replace_paths and not self.overwrite:
+                dest_stem = self._replace_stem(stem, paths, replace_paths)
+            if dest_stem is None:
+                dest_stem = self._reserve(stem, paths)
+            for path in paths:
+                dest_paths[path] = str(self.dest / f"{dest_stem}{path.suffix}")
+        return [dest_paths[pathlib.Path(fname)] for fname in files]
+
+    def is_replacing(self, dest_path: str) -> bool:
+        """Return True if dest_path replaces a file from a previous export"""
+        return dest_path in self._replacing
+
+    def transfer_files(self, files: list[str], dest_paths: list[str]):
+        """Put files at dest_paths as returned by reserve_files()
+
+        Raises:
+            ExportError if verify is True and a file's checksum changed
+        """
+        for i, (src, dest_path) in enumerate(zip(files, dest_paths)):
+            # a file from a previous export is only replaced once the new file is complete
+            replacing = self.is_replacing(dest_path)
+            transfer_path = (
+                f"{dest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                if replacing
+                else dest_path
+            )
+            try:
+                checksum = file_checksum(src) if self.verify else None
+                self.transfer(src, transfer_path)
+                if checksum is not None and file_checksum(transfer_path) != checksum:
+                    raise ExportError(
+                        f"checksum mismatch exporting {src} to {dest_path}"
+                    )
+                if replacing:
+                    os.replace(transfer_path, dest_path)
+            except Exception:
+                if replacing:
+                    pathlib.Path(transfer_path).unlink(missing_ok=True)
+                if not self.overwrite:
+                    # remove the partially written file and the files reserving names
+                    self.discard(dest_paths[i:])
+                raise
+
+    def discard(self, dest_paths: list[str]):
+        """Remove the files reserving dest_paths, keeping files from a previous export"""
+        for dest_path in dest_paths:
+            if not self.is_replacing(dest_path):
+                pathlib.Path(dest_path).unlink(missing_ok=True)
+
+    def _replace_stem(
+        self, stem: str, paths: list[pathlib.Path], replace_paths: list[str]
+    ) -> str | None:
+        """Return stem of the files in replace_paths that paths replace or None if there isn't one
+
+        A file replaces one with the same name or the same name with a counter appended,
+        e.g. "IMG_1234 (1).jpeg" for "IMG_1234.jpeg", as given by _reserve().
+        """
+        stem_re = re.compile(rf"{re.escape(stem)}( \(\d+\))?", re.IGNORECASE)
+        old_paths = {os.path.normcase(path) for path in replace_paths}
+        for replace_path in replace_paths:
+            old_stem = pathlib.Path(replace_path).stem
+            if not stem_re.fullmatch(old_stem):
+                continue
+            new_paths = [str(self.dest / f"{old_stem}{path.suffix}") for path in paths]
+            if any(
+                os.path.normcase(path) not in old_paths and os.path.lexists(path)
+                for path in new_paths
+            ):
+                # would overwrite a file that isn't from the previous export
+                continue
+            with self._lock:
+                self._stems.add(old_stem.lower())
+                self._replacing.update(
+                    path for path in new_paths if os.path.normcase(path) in old_paths
+                )
+            return old_stem
+        return None
+
+    def _reserve(self, stem: str, paths: list[pathlib.Path]) -> str:
+        """Reserve a stem not used in the destination for paths; returns the stem"""
+        key = stem.lower()
+        with self._lock:
+            count = self._counters.get(key, 0)
+            while True:
+                dest_stem = f"{stem} ({count})" if count else stem
+                count += 1
+                if dest_stem.lower() in self._stems:
+                    continue
+                # record the stem as used even if the reservation fails as that
+                # means another writer has created a file with this stem
+                self._stems.add(dest_stem.lower())
+                if self._create_exclusive(dest_stem, paths):
+                    break
+            self._counters[key] = count
+        return dest_stem
+
+    def _create_exclusive(self, dest_stem: str, paths: list[pathlib.Path]) -> bool:
+        """Create an empty file for each of paths with dest_stem; False if any exist"""
+        created = []
+        for path in paths:
+            dest_path = self.dest / f"{dest_stem}{path.suffix}"
+            try:
+                fd = os.open(dest_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                for created_path in created:
+                    created_path.unlink(missing_ok=True)
+                return False
+            os.close(fd)
+            created.append(dest_path)
+        return True
+
+
+class ExportPipeline:
+    """Puts exported files in the destination on worker threads while Photos exports
+
+    The thread driving Photos submits each exported chunk with its temporary directory and
+    continues with the next export while worker threads transfer (and optionally verify)
+    the files of earlier chunks.  At most max_pending chunks wait to be processed; submit()
+    blocks when the queue is full so exports never get too far ahead of the workers.
+    Temporary directories are cleaned up by the workers once their files are placed and the
+    keys of the placed files can be collected with pop_completed(), e.g. to record them.
+    """
+
+    def __init__(self, session: ExportSession, workers: int = 2, max_pending: int = 2):
+        """Create an export pipeline
+
+        Args:
+            session: ExportSession used to place files
+            workers: number of worker threads; if 0, files are placed in submit()
+            max_pending: maximum number of chunks waiting for a worker
+        """
+        self.session = session
+        self.results: dict[str, list[str]] = {}
+        self._completed: queue.SimpleQueue = queue.SimpleQueue()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_pending, 1))
+        self._error: BaseException | None = None
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"photoscript-export-{i}")
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def submit(
+        self,
+        tmpdir: tempfile.TemporaryDirectory,
+        placements: list[tuple[str, list[str]]],
+        replace_paths: dict[str, list[str]] | None = None,
+    ):
+        """Queue the files exported for a chunk to be placed in the destination
+
+        Args:
+            tmpdir: temporary directory the chunk was exported to; cleaned up when done
+            placements: list of (key, list of exported files) for each photo in the chunk;
+                the destination paths for each key are stored in results
+            replace_paths: dict of key: paths of the files from a previous export to replace
+
+        Raises:
+            the first error raised by a worker, if any
+        """
+        self._raise_error()
+        replace_paths = replace_paths or {}
+        # reserve names here so they are assigned in export order
+        reserved = []
+        for key, files in placements:
+            dest_paths = self.session.reserve_files(files, replace_paths.get(key))
+            self.results[key] = dest_paths
+            reserved.append((key, files, dest_paths))
+        if self._threads:
+            self._queue.put((tmpdir, reserved))
+        else:
+            self._process(tmpdir, reserved)
+
+    def pop_completed(self) -> list[str]:
+        """Return keys of the placements whose files have been placed since the last call"""
+        completed = []
+        while not self._completed.empty():
+            completed.append(self._completed.get())
+        return completed
+
+    def close(self):
+        """Wait for all queued chunks to be placed
+
+        Raises:
+            the first error raised by a worker, if any
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.close()
+        except Exception:
+            # don't hide the exception that ended the with block
+            if exc_type is None:
+                raise
+
+    def _worker(self):
+        while (item := self._queue.get()) is not None:
+            tmpdir, reserved = item
+            if self._error is not None:
+                # don't place any more files after an error but still clean up
+                self._discard(reserved)
+                tmpdir.cleanup()
+                continue
+            try:
+                self._process(tmpdir, reserved)
+            except BaseException as error:
+                self._error = error
+
+    def _process(self, tmpdir, reserved):
+        try:
+            for i, (key, files, dest_paths) in enumerate(reserved):
+                try:
+                    self.session.transfer_files(files, dest_paths)
+                except BaseException:
+                    self._discard(reserved[i + 1 :])
+                    raise
+                self._completed.put(key)
+        finally:
+            tmpdir.cleanup()
+
+    def _discard(self, reserved):
+        """Remove the files reserving names for placements that won't be transferred"""
+        if self.session.overwrite:
+            return
+        for _, _, dest_paths in reserved:
+            self.session.discard(dest_paths)
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
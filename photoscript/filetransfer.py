@@ -0,0 +1,163 @@
+"""Move or copy exported files to their destination without spawning a process per file
+
+A file transfer is a function taking (src, dest) that puts the file at src at dest, replacing
+dest if it exists.  Export methods accept the name of one of the transfers in FILE_TRANSFERS or
+any callable with the same signature:
+
+    - "move": rename the file if src and dest are on the same filesystem, otherwise copy the
+      file in the kernel then remove src (default for exports as exported files are temporary)
+    - "copy": copy the file in the kernel, leaving src in place
+    - "ditto": copy the file with /usr/bin/ditto which preserves resource forks and extended
+      attributes; this starts a new process for each file so is much slower
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import platform
+import shutil
+from typing import Callable
+
+from .utils import ditto
+
+FileTransfer = Callable[[str, str], None]
+
+# number of bytes to copy per system call when the kernel copies the file
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# errors that mean a fast copy method isn't supported for these files so fall back to the next
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSOCK,
+}
+
+
+def _load_clonefile():
+    """Return libc clonefile() on macOS or None if not available"""
+    if platform.system() != "Darwin":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        clonefile = libc.clonefile
+    except (OSError, AttributeError):
+        return None
+    clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    clonefile.restype = ctypes.c_int
+    return clonefile
+
+
+_clonefile = _load_clonefile()
+
+
+def _clone(src: str, dest: str) -> bool:
+    """Clone src to dest with clonefile() (APFS copy-on-write); returns False if not possible"""
+    if _clonefile is None:
+        return False
+    if os.path.lexists(dest):
+        # clonefile() won't replace an existing file
+        os.unlink(dest)
+    if _clonefile(os.fsencode(src), os.fsencode(dest), 0) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in _UNSUPPORTED_ERRNOS:
+        return False
+    raise OSError(err, os.strerror(err), src)
+
+
+def _kernel_copy(src: str, dest: str):
+    """Copy contents of src to dest with copy_file_range() or sendfile() if available"""
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        size = os.fstat(fsrc.fileno()).st_size
+        for name in ("copy_file_range", "sendfile"):
+            copy_func = getattr(os, name, None)
+            if copy_func is None:
+                continue
+            offset = 0
+            try:
+                while offset < size:
+                    if name == "copy_file_range":
+                        copied = copy_func(
+                            fsrc.fileno(),
+                            fdest.fileno(),
+                            COPY_CHUNK_SIZE,
+                            offset_src=offset,
+                            offset_dst=offset,
+                        )
+                    else:
+                        copied = copy_func(
+                            fdest.fileno(), fsrc.fileno(), offset, COPY_CHUNK_SIZE
+                        )
+                    if copied == 0:
+                        break
+                    offset += copied
+            except OSError as error:
+                if offset or error.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                continue
+            return
+        # no in-kernel copy available (e.g. sendfile() on macOS only sends to sockets)
+        shutil.copyfileobj(fsrc, fdest, COPY_CHUNK_SIZE)
+
+
+def copy_file(src: str, dest: str):
+    """Copy src to dest without starting a new process, replacing dest if it exists
+
+    Uses a copy-on-write clone if the filesystem supports it, otherwise copies the file
+    contents in the kernel.  File permissions and timestamps are copied to dest.
+    """
+    if not _clone(src, dest):
+        _kernel_copy(src, dest)
+        shutil.copystat(src, dest)
+
+
+def move_file(src: str, dest: str):
+    """Move src to dest, replacing dest if it exists
+
+    Renames the file if src and dest are on the same filesystem, otherwise copies the file
+    with copy_file() then removes src.
+    """
+    try:
+        os.replace(src, dest)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        copy_file(src, dest)
+        os.unlink(src)
+
+
+def ditto_file(src: str, dest: str):
+    """Copy src to dest with /usr/bin/ditto, preserving resource forks and extended attributes"""
+    ditto(src, dest)
+
+
+FILE_TRANSFERS: dict[str, FileTransfer] = {
+    "move": move_file,
+    "copy": copy_file,
+    "ditto": ditto_file,
+}
+
+
+def get_file_transfer(transfer: str | FileTransfer) -> FileTransfer:
+    """Return the file transfer function for transfer
+
+    Args:
+        transfer: name of a file transfer in FILE_TRANSFERS or a callable taking (src, dest)
+
+    Raises:
+        ValueError if transfer is not a known file transfer or a callable
+    """
+    if callable(transfer):
+        return transfer
+    try:
+        return FILE_TRANSFERS[transfer]
+    except KeyError as e:
+        raise ValueError(
+            f"unknown file transfer {transfer!r}, must be one of {list(FILE_TRANSFERS)} or a callable"
+        ) from e
@@ -0,0 +1,205 @@
+"""Per-handler call statistics for run_script
+
+Instrumentation is off by default.  When enabled with stats().enable(), run_script records for
+each AppleScript handler the number of calls, errors and retries, and the latency of each call
+in a histogram with fixed, logarithmically spaced buckets so recording a call is O(log buckets)
+and needs no memory per call.  Percentiles are estimated from the histogram to within one bucket
+(LATENCY_BUCKET_FACTOR).
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# smallest latency bucket upper bound in seconds
+LATENCY_BUCKET_MIN = 0.0001
+
+# ratio between upper bounds of adjacent latency buckets
+LATENCY_BUCKET_FACTOR = 2**0.25
+
+# number of latency buckets; the last bucket is for latencies over about 16 minutes
+LATENCY_BUCKET_COUNT = 81
+
+LATENCY_BUCKETS = tuple(
+    LATENCY_BUCKET_MIN * LATENCY_BUCKET_FACTOR**i for i in range(LATENCY_BUCKET_COUNT)
+)
+
+# percentiles included in snapshots and the OpenMetrics dump
+PERCENTILES = (50, 95, 99)
+
+StatsHook = Callable[[str, float, bool, int], None]
+
+
+class HandlerStats:
+    """Call statistics for one AppleScript handler"""
+
+    __slots__ = (
+        "calls",
+        "errors",
+        "retries",
+        "total_seconds",
+        "max_seconds",
+        "buckets",
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        # one more bucket than LATENCY_BUCKETS for latencies above the last bound
+        self.buckets = [0] * (LATENCY_BUCKET_COUNT + 1)
+
+    def record(self, seconds: float, error: bool, retries: int):
+        """Record a call that took seconds, including any retries"""
+        self.calls += 1
+        self.errors += error
+        self.retries += retries
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """Return estimated latency in seconds below which percent of calls fall"""
+        if not self.calls:
+            return 0.0
+        rank = max(1, math.ceil(self.calls * percent / 100))
+        count = 0
+        for i, bucket in enumerate(self.buckets):
+            count += bucket
+            if count >= rank:
+                break
+        upper = LATENCY_BUCKETS[i] if i < LATENCY_BUCKET_COUNT else self.max_seconds
+        return min(upper, self.max_seconds)
+
+    def snapshot(self) -> dict:
+        """Return the statistics as a dict"""
+        snapshot = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "total": self.total_seconds,
+            "mean": self.total_seconds / self.calls if self.calls else 0.0,
+        }
+        for percent in PERCENTILES:
+            snapshot[f"p{percent}"] = self.percentile(percent)
+        return snapshot
+
+
+class ScriptStats:
+    """Statistics for the AppleScript handlers called by run_script, returned by photoscript.stats()
+
+    Example:
+        stats = photoscript.stats()
+        stats.enable()
+        ...
+        for handler, handler_stats in stats.snapshot().items():
+            print(handler, handler_stats["calls"], handler_stats["p95"])
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.hook: StatsHook | None = None
+        self._handlers: dict[str, HandlerStats] = {}
+        self._lock = threading.Lock()
+
+    def enable(self, hook: StatsHook | None = None):
+        """Start recording handler calls
+
+        Args:
+            hook: optional callable called after each handler call with
+                (handler name, seconds, error, retries)
+        """
+        self.hook = hook
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording handler calls; statistics recorded so far are kept"""
+        self.enabled = False
+        self.hook = None
+
+    def record(self, name: str, seconds: float, error: bool, retries: int):
+        """Record a call to handler name; called by run_script"""
+        with self._lock:
+            handler_stats = self._handlers.get(name)
+            if handler_stats is None:
+                handler_stats = self._handlers[name] = HandlerStats()
+            handler_stats.record(seconds, error, retries)
+        if self.hook is not None:
+            try:
+                self.hook(name, seconds, error, retries)
+            except Exception as e:
+                logger.warning("stats hook failed for %s: %s", name, e)
+
+    def snapshot(self, reset: bool = False) -> dict[str, dict]:
+        """Return dict of handler name: statistics for that handler
+
+        Statistics for each handler are a dict with keys calls, errors, retries, total and
+        mean (seconds), and p50, p95, p99 (estimated latency percentiles in seconds).
+
+        Args:
+            reset: if True, reset the statistics after taking the snapshot
+        """
+        with self._lock:
+            snapshot = {
+                name: handler_stats.snapshot()
+                for name, handler_stats in sorted(self._handlers.items())
+            }
+            if reset:
+                self._handlers = {}
+        return snapshot
+
+    def reset(self):
+        """Discard all recorded statistics"""
+        with self._lock:
+            self._handlers = {}
+
+    def openmetrics(self) -> str:
+        """Return the statistics in OpenMetrics text format"""
+        snapshot = self.snapshot()
+        lines = []
+        for metric, help_ in (
+            ("calls", "Number of calls to the AppleScript handler"),
+            ("errors", "Number of calls to the AppleScript handler that failed"),
+            ("retries", "Number of retries of the AppleScript handler"),
+        ):
+            lines.append(f"# TYPE photoscript_handler_{metric} counter")
+            lines.append(f"# HELP photoscript_handler_{metric} {help_}.")
+            lines.extend(
+                f"photoscript_handler_{metric}_total{{handler={_label(name)}}} {stats[metric]}"
+                for name, stats in snapshot.items()
+            )
+        lines.append("# TYPE photoscript_handler_latency_seconds summary")
+        lines.append("# UNIT photoscript_handler_latency_seconds seconds")
+        lines.append(
+            "# HELP photoscript_handler_latency_seconds "
+            "Latency of calls to the AppleScript handler including retries."
+        )
+        for name, stats in snapshot.items():
+            label = _label(name)
+            for percent in PERCENTILES:
+                lines.append(
+                    f"photoscript_handler_latency_seconds"
+                    f'{{handler={label},quantile="{percent / 100}"}} {stats[f"p{percent}"]}'
+                )
+            lines.append(
+                f"photoscript_handler_latency_seconds_sum{{handler={label}}} {stats['total']}"
+            )
+            lines.append(
+                f"photoscript_handler_latency_seconds_count{{handler={label}}} {stats['calls']}"
+            )
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    """Return value as a quoted OpenMetrics label value"""
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{value}"'
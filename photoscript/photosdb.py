@@ -0,0 +1,570 @@
+"""Read-only access to Photos library metadata directly from the library's Photos.sqlite database
+
+Reading from the database is much faster than going through AppleScript but only supports
+reading metadata.  Objects returned by PhotosDB have the same API as Photo, Album, and Folder;
+properties are read from the database when the object is created while methods that change
+the library (e.g. setting a name or adding photos to an album) still go through Photos via
+AppleScript.
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import os
+import pathlib
+import shutil
+import sqlite3
+import tempfile
+import urllib.parse
+
+from photoscript import (
+    UUID_SUFFIX_ALBUM,
+    UUID_SUFFIX_FOLDER,
+    UUID_SUFFIX_PHOTO,
+    Album,
+    Folder,
+    Photo,
+    uuid_to_id,
+)
+
+# Photos stores dates as seconds since 2001-01-01 00:00:00 UTC
+MAC_EPOCH_OFFSET = 978307200
+
+# ZKIND values in ZGENERICALBUM
+ALBUM_KIND_USER = 2
+ALBUM_KIND_ROOT_FOLDER = 3999
+ALBUM_KIND_FOLDER = 4000
+
+# Photos uses -180.0 for latitude/longitude of photos with no location
+NO_LOCATION = -180.0
+
+
+class PhotosDB:
+    """Read-only view of a Photos library's metadata read from database/Photos.sqlite"""
+
+    def __init__(self, library_path, snapshot=False):
+        """Open the Photos library database
+
+        Args:
+            library_path: path to the Photos library, e.g. "~/Pictures/Photos Library.photoslibrary"
+            snapshot: if True, copy the database to a temporary directory and read from the copy;
+                use this if Photos is running and has the database locked.  Default is False.
+
+        Raises:
+            ValueError if library_path does not contain a Photos database
+        """
+        self.library_path = pathlib.Path(library_path).expanduser()
+        db_path = self.library_path / "database" / "Photos.sqlite"
+        if not db_path.is_file():
+            raise ValueError(f"{library_path} does not appear to be a Photos library")
+
+        self._tmpdir = None
+        if snapshot:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_")
+            for suffix in ("", "-wal", "-shm"):
+                src = db_path.parent / f"{db_path.name}{suffix}"
+                if src.is_file():
+                    shutil.copy2(src, os.path.join(self._tmpdir.name, src.name))
+            db_path = pathlib.Path(self._tmpdir.name) / db_path.name
+
+        uri = f"file:{urllib.parse.quote(str(db_path))}?mode=ro"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        """Find the table and column names, which vary between versions of Photos"""
+        entities = {
+            row["Z_NAME"]: row["Z_ENT"]
+            for row in self._conn.execute("SELECT Z_NAME, Z_ENT FROM Z_PRIMARYKEY")
+        }
+        tables = {
+            row["name"]
+            for row in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        # Photos 5 (Catalina) uses ZGENERICASSET, later versions ZASSET
+        self._asset_table = "ZASSET" if "ZASSET" in tables else "ZGENERICASSET"
+        album_ent = entities["Album"]
+        keyword_ent = entities["Keyword"]
+        attributes_ent = entities["AdditionalAssetAttributes"]
+        # join tables between albums/assets and keywords/asset attributes
+        self._album_assets_table = f"Z_{album_ent}ASSETS"
+        album_assets_columns = self._columns(self._album_assets_table)
+        self._album_assets_album = f"Z_{album_ent}ALBUMS"
+        # the asset column is named for the asset entity which differs between versions
+        self._album_assets_asset = next(
+            column
+            for column in album_assets_columns
+            if column.endswith("ASSETS") and not column.startswith("Z_FOK")
+        )
+        self._keywords_table = f"Z_{attributes_ent}KEYWORDS"
+        self._keywords_attributes = f"Z_{attributes_ent}ASSETATTRIBUTES"
+        self._keywords_keyword = f"Z_{keyword_ent}KEYWORDS"
+        self._root_folder_pk = self._conn.execute(
+            "SELECT Z_PK FROM ZGENERICALBUM WHERE ZKIND = ?", (ALBUM_KIND_ROOT_FOLDER,)
+        ).fetchone()["Z_PK"]
+
+    def _columns(self, table):
+        return [
+            row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")
+        ]
+
+    def close(self):
+        """Close the database (and remove the snapshot, if any)"""
+        self._conn.close()
+        if self._tmpdir is not None:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    ########## PhotosLibrary API ##########
+
+    def photos(self, uuid=None):
+        """List of DBPhoto objects for media items in the library
+
+        Args:
+            uuid: optional list of UUIDs to get; UUIDs not in the library are skipped
+        """
+        if uuid is None:
+            return self._photos()
+        uuids = [uuid_to_id(id_, UUID_SUFFIX_PHOTO)[0] for id_ in uuid]
+        placeholders = ", ".join("?" * len(uuids))
+        return self._photos(f"AND asset.ZUUID IN ({placeholders})", uuids)
+
+    def album_names(self, top_level=False):
+        """List of album names in the Photos library
+
+        Args:
+            top_level: if True, returns only top-level albums otherwise also returns albums in sub-folders; default is False
+        """
+        return [album.name for album in self.albums(top_level=top_level)]
+
+    def folder_names(self, top_level=False):
+        """List of folder names in the Photos library
+
+        Args:
+            top_level: if True, returns only top-level folders otherwise also returns sub-folders; default is False
+        """
+        return [folder.name for folder in self.folders(top_level=top_level)]
+
+    def album(self, *name, uuid=None, top_level=False):
+        """DBAlbum instance by name or id or None if album could not be found
+
+        Raises:
+            ValueError if both name and id passed or neither passed.
+        """
+        if (not name and uuid is None) or (name and uuid is not None):
+            raise ValueError("Must pass only name or uuid but not both")
+        index = self._container_index
+        if name:
+            rows = index.by_name.get((ALBUM_KIND_USER, name[0]), [])
+        else:
+            uuid = uuid_to_id(uuid, UUID_SUFFIX_ALBUM)[0]
+            rows = index.by_uuid.get((ALBUM_KIND_USER, uuid), [])
+        row = self._first_row(rows, top_level)
+        return DBAlbum(self, row) if row is not None else None
+
+    def albums(self, top_level=False):
+        """list of DBAlbum objects for all albums"""
+        return [
+            DBAlbum(self, row)
+            for row in self._container_index.by_kind.get(ALBUM_KIND_USER, [])
+            if not top_level or row["ZPARENTFOLDER"] == self._root_folder_pk
+        ]
+
+    def folder(self, name=None, path=None, uuid=None, top_level=True):
+        """DBFolder instance by name, path, or uuid or None if folder could not be found
+
+        Raises:
+            ValueError not one of name, path, or uuid is passed
+        """
+        if sum(bool(x) for x in [name, path, uuid]) != 1:
+            raise ValueError(
+                "Must pass one of name, path, or uuid but not more than one"
+            )
+        index = self._container_index
+        if path:
+            row = self._first_row(index.folders_by_path.get(tuple(path), []), False)
+        elif name:
+            rows = index.by_name.get((ALBUM_KIND_FOLDER, name), [])
+            row = self._first_row(rows, top_level)
+        else:
+            uuid = uuid_to_id(uuid, UUID_SUFFIX_FOLDER)[0]
+            rows = index.by_uuid.get((ALBUM_KIND_FOLDER, uuid), [])
+            row = self._first_row(rows, False)
+        return DBFolder(self, row) if row is not None else None
+
+    def folders(self, top_level=True):
+        """list of DBFolder objects for all folders"""
+        return [
+            DBFolder(self, row)
+            for row in self._container_index.by_kind.get(ALBUM_KIND_FOLDER, [])
+            if not top_level or row["ZPARENTFOLDER"] == self._root_folder_pk
+        ]
+
+    def __len__(self):
+        return self._conn.execute(
+            f"SELECT COUNT(*) FROM {self._asset_table} "
+            "WHERE ZTRASHEDSTATE = 0 AND ZVISIBILITYSTATE = 0"
+        ).fetchone()[0]
+
+    ########## queries ##########
+
+    def _photos(self, where="", params=()):
+        rows = self._conn.execute(
+            f"""
+            SELECT asset.Z_PK, asset.ZUUID, asset.ZDATECREATED, asset.ZFAVORITE,
+                asset.ZWIDTH, asset.ZHEIGHT, asset.ZLATITUDE, asset.ZLONGITUDE,
+                attributes.Z_PK AS ATTRIBUTES_PK, attributes.ZTITLE,
+                attributes.ZORIGINALFILENAME, description.ZLONGDESCRIPTION
+            FROM {self._asset_table} AS asset
+            JOIN ZADDITIONALASSETATTRIBUTES AS attributes
+                ON attributes.ZASSET = asset.Z_PK
+            LEFT JOIN ZASSETDESCRIPTION AS description
+                ON description.ZASSETATTRIBUTES = attributes.Z_PK
+            WHERE asset.ZTRASHEDSTATE = 0 AND asset.ZVISIBILITYSTATE = 0 {where}
+            ORDER BY asset.Z_PK
+            """,
+            params,
+        )
+        return [DBPhoto(self, row) for row in rows]
+
+    @functools.cached_property
+    def _container_index(self):
+        """_ContainerIndex of the albums and folders in ZGENERICALBUM, read once per
+        connection so walking the folder tree doesn't query the table for every container"""
+        rows = self._conn.execute(
+            """
+            SELECT Z_PK, ZUUID, ZTITLE, ZPARENTFOLDER, ZKIND, ZTRASHEDSTATE
+            FROM ZGENERICALBUM
+            ORDER BY Z_PK
+            """
+        ).fetchall()
+        return _ContainerIndex(rows, self._root_folder_pk)
+
+    def _first_row(self, rows, top_level):
+        """Return the first of rows, or the first top-level row if top_level, or None"""
+        return next(
+            (
+                row
+                for row in rows
+                if not top_level or row["ZPARENTFOLDER"] == self._root_folder_pk
+            ),
+            None,
+        )
+
+    def _children(self, parent_pk, kind):
+        return self._container_index.children.get((parent_pk, kind), [])
+
+    def _parent_rows(self, row):
+        """Return list of rows of the folders containing row, top-level folder first"""
+        return self._container_index.parent_rows(row)
+
+    def _album_photos(self, album_pk):
+        return self._photos(
+            f"""AND asset.Z_PK IN (
+                SELECT {self._album_assets_asset} FROM {self._album_assets_table}
+                WHERE {self._album_assets_album} = ?
+            )""",
+            (album_pk,),
+        )
+
+    def _album_photo_count(self, album_pk):
+        return self._conn.execute(
+            f"""
+            SELECT COUNT(*) FROM {self._album_assets_table}
+            JOIN {self._asset_table} AS asset
+                ON asset.Z_PK = {self._album_assets_asset}
+            WHERE {self._album_assets_album} = ?
+                AND asset.ZTRASHEDSTATE = 0 AND asset.ZVISIBILITYSTATE = 0
+            """,
+            (album_pk,),
+        ).fetchone()[0]
+
+    def _photo_albums(self, asset_pk):
+        return [
+            DBAlbum(self, row)
+            for row in self._conn.execute(
+                f"""
+                SELECT album.Z_PK, album.ZUUID, album.ZTITLE, album.ZPARENTFOLDER
+                FROM ZGENERICALBUM AS album
+                JOIN {self._album_assets_table} AS album_assets
+                    ON album_assets.{self._album_assets_album} = album.Z_PK
+                WHERE album_assets.{self._album_assets_asset} = ?
+                    AND album.ZKIND = ? AND album.ZTRASHEDSTATE = 0
+                ORDER BY album.Z_PK
+                """,
+                (asset_pk, ALBUM_KIND_USER),
+            )
+        ]
+
+    def _photo_keywords(self, attributes_pk):
+        return [
+            row["ZTITLE"]
+            for row in self._conn.execute(
+                f"""
+                SELECT keyword.ZTITLE FROM ZKEYWORD AS keyword
+                JOIN {self._keywords_table} AS asset_keywords
+                    ON asset_keywords.{self._keywords_keyword} = keyword.Z_PK
+                WHERE asset_keywords.{self._keywords_attributes} = ?
+                ORDER BY keyword.ZTITLE
+                """,
+                (attributes_pk,),
+            )
+        ]
+
+
+class _ContainerIndex:
+    """Albums and folders from ZGENERICALBUM indexed by primary key, parent, name, and path"""
+
+    def __init__(self, rows, root_folder_pk):
+        self.root_folder_pk = root_folder_pk
+        # includes trashed containers and the root folder for walking up the tree
+        self.by_pk = {row["Z_PK"]: row for row in rows}
+        self.by_kind = {}
+        self.by_uuid = {}
+        self.by_name = {}
+        self.children = {}
+        for row in rows:
+            kind = row["ZKIND"]
+            if kind not in (ALBUM_KIND_USER, ALBUM_KIND_FOLDER) or row["ZTRASHEDSTATE"]:
+                continue
+            self.by_kind.setdefault(kind, []).append(row)
+            self.by_uuid.setdefault((kind, row["ZUUID"]), []).append(row)
+            self.by_name.setdefault((kind, row["ZTITLE"] or ""), []).append(row)
+            self.children.setdefault((row["ZPARENTFOLDER"], kind), []).append(row)
+        self.folders_by_path = {}
+        for row in self.by_kind.get(ALBUM_KIND_FOLDER, []):
+            path = tuple(_path_names(self.parent_rows(row) + [row]))
+            self.folders_by_path.setdefault(path, []).append(row)
+
+    def parent_rows(self, row):
+        """Return list of rows of the folders containing row, top-level folder first"""
+        parents = []
+        parent_pk = row["ZPARENTFOLDER"]
+        while parent_pk is not None and parent_pk != self.root_folder_pk:
+            parent = self.by_pk.get(parent_pk)
+            if parent is None:
+                break
+            parents.insert(0, parent)
+            parent_pk = parent["ZPARENTFOLDER"]
+        return parents
+
+
+def _path_names(rows):
+    """Return names of the containers in rows"""
+    return [row["ZTITLE"] or "" for row in rows]
+
+
+class DBPhoto(Photo):
+    """Photo whose metadata is read from the Photos database"""
+
+    def __init__(self, db: PhotosDB, row: sqlite3.Row):
+        self._db = db
+        self._row = row
+        self._uuid, self.id = uuid_to_id(row["ZUUID"], UUID_SUFFIX_PHOTO)
+
+    @Photo.name.getter
+    def name(self):
+        """name of photo"""
+        return self._row["ZTITLE"] or ""
+
+    @Photo.title.getter
+    def title(self):
+        """title of photo (alias for name)"""
+        return self.name
+
+    @Photo.description.getter
+    def description(self):
+        """description of photo"""
+        return self._row["ZLONGDESCRIPTION"] or ""
+
+    @Photo.keywords.getter
+    def keywords(self):
+        """list of keywords for photo"""
+        return self._db._photo_keywords(self._row["ATTRIBUTES_PK"])
+
+    @Photo.favorite.getter
+    def favorite(self):
+        """return favorite status (boolean)"""
+        return bool(self._row["ZFAVORITE"])
+
+    @Photo.height.getter
+    def height(self):
+        """height of photo in pixels"""
+        return self._row["ZHEIGHT"]
+
+    @Photo.width.getter
+    def width(self):
+        """width of photo in pixels"""
+        return self._row["ZWIDTH"]
+
+    @Photo.location.getter
+    def location(self):
+        """The GPS latitude and longitude, in a tuple of 2 numbers or None."""
+        latitude, longitude = self._row["ZLATITUDE"], self._row["ZLONGITUDE"]
+        if latitude == NO_LOCATION and longitude == NO_LOCATION:
+            return (None, None)
+        return (latitude, longitude)
+
+    @Photo.date.getter
+    def date(self):
+        """date of photo as timezone-naive datetime.datetime object in local time or None
+        if the photo has no date"""
+        if self._row["ZDATECREATED"] is None:
+            return None
+        # AppleScript dates have a resolution of one second
+        return datetime.datetime.fromtimestamp(
+            int(self._row["ZDATECREATED"] + MAC_EPOCH_OFFSET)
+        )
+
+    @Photo.filename.getter
+    def filename(self):
+        """filename of photo"""
+        return self._row["ZORIGINALFILENAME"]
+
+    @Photo.albums.getter
+    def albums(self):
+        """list of DBAlbum objects for albums photo is contained in"""
+        return self._db._photo_albums(self._row["Z_PK"])
+
+
+class DBAlbum(Album):
+    """Album whose metadata is read from the Photos database"""
+
+    def __init__(self, db: PhotosDB, row: sqlite3.Row):
+        self._db = db
+        self._row = row
+        self._uuid, self.id = uuid_to_id(row["ZUUID"], UUID_SUFFIX_ALBUM)
+
+    @Album.name.getter
+    def name(self):
+        """name of album"""
+        return self._row["ZTITLE"] or ""
+
+    @Album.title.getter
+    def title(self):
+        """title of album (alias for Album.name)"""
+        return self.name
+
+    @Album.parent_id.getter
+    def parent_id(self):
+        """parent container id or 0 if album is at the top level"""
+        parents = self._db._parent_rows(self._row)
+        return uuid_to_id(parents[-1]["ZUUID"], UUID_SUFFIX_FOLDER)[1] if parents else 0
+
+    @Album.parent.getter
+    def parent(self):
+        """Return parent DBFolder object"""
+        parents = self._db._parent_rows(self._row)
+        return DBFolder(self._db, parents[-1]) if parents else None
+
+    def path_str(self, delim="/"):
+        """Return internal library path to album as string.
+            e.g. "Folder/SubFolder/AlbumName"
+
+        Raises:
+            ValueError if delim is not a single character
+        """
+        if len(delim) > 1:
+            raise ValueError("delim must be single character")
+        return delim.join(_path_names(self._db._parent_rows(self._row) + [self._row]))
+
+    def photos(self):
+        """list of DBPhoto objects for photos contained in album"""
+        return self._db._album_photos(self._row["Z_PK"])
+
+    def __len__(self):
+        return self._db._album_photo_count(self._row["Z_PK"])
+
+
+class DBFolder(Folder):
+    """Folder whose metadata is read from the Photos database"""
+
+    def __init__(self, db: PhotosDB, row: sqlite3.Row):
+        self._db = db
+        self._row = row
+        self._path = None
+        self._uuid, self._id = uuid_to_id(row["ZUUID"], UUID_SUFFIX_FOLDER)
+        self._idstring = " of ".join(
+            f'folder id("{uuid_to_id(folder["ZUUID"], UUID_SUFFIX_FOLDER)[1]}")'
+            for folder in reversed(self._db._parent_rows(row) + [row])
+        )
+
+    @Folder.name.getter
+    def name(self):
+        """name of folder"""
+        return self._row["ZTITLE"] or ""
+
+    @Folder.title.getter
+    def title(self):
+        """title of folder (alias for Folder.name)"""
+        return self.name
+
+    @Folder.parent_id.getter
+    def parent_id(self):
+        """parent container id string or None if folder is at the top level"""
+        parent = self.parent
+        return parent.idstring if parent is not None else None
+
+    @Folder.parent.getter
+    def parent(self):
+        """Return parent DBFolder object"""
+        parents = self._db._parent_rows(self._row)
+        return DBFolder(self._db, parents[-1]) if parents else None
+
+    def _path_names(self):
+        return _path_names(self._db._parent_rows(self._row) + [self._row])
+
+    def path_str(self, delim="/"):
+        """Return internal library path to folder as string.
+            e.g. "Folder/SubFolder"
+
+        Raises:
+            ValueError if delim is not a single character
+        """
+        if len(delim) > 1:
+            raise ValueError("delim must be single character")
+        return delim.join(self._path_names())
+
+    def path(self):
+        """Return list of DBFolder objects this folder is contained in."""
+        return [DBFolder(self._db, row) for row in self._db._parent_rows(self._row)]
+
+    @Folder.albums.getter
+    def albums(self):
+        """list of DBAlbum objects for albums contained in folder"""
+        return [
+            DBAlbum(self._db, row)
+            for row in self._db._children(self._row["Z_PK"], ALBUM_KIND_USER)
+        ]
+
+    def album(self, name):
+        """Return DBAlbum object contained in this folder for album named name
+        or None if no matching album
+        """
+        return next((album for album in self.albums if album.name == name), None)
+
+    @Folder.subfolders.getter
+    def subfolders(self):
+        """list of DBFolder objects for immediate sub-folders contained in folder"""
+        return [
+            DBFolder(self._db, row)
+            for row in self._db._children(self._row["Z_PK"], ALBUM_KIND_FOLDER)
+        ]
+
+    def folder(self, name):
+        """DBFolder object for first subfolder named name or None if not found"""
+        return next((folder for folder in self.subfolders if folder.name == name), None)
+
+    def __len__(self):
+        return len(self.albums) + len(self.subfolders)
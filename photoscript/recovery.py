@@ -0,0 +1,289 @@
+"""Recovery of Photos when AppleScript calls time out
+
+Before run_script retries a call that timed out it runs the RecoveryChain returned by
+photoscript.recovery_chain().  Relaunching Photos and reopening a large library can take
+minutes so the chain escalates with the number of consecutive timeouts instead of killing
+Photos on the first one:
+
+1. probe: check Photos is still running (photosLibraryIsRunning doesn't wait on Photos)
+2. backoff: wait a little longer before the call is retried
+3. quit: ask Photos to quit so it closes the library cleanly
+4. kill: killall Photos, at most once every min_interval seconds
+
+Each step runs once the number of consecutive timeouts reaches its min_timeouts; the count is
+reset by a successful call (see RecoveryChain.record_success) or when there has been no
+timeout for reset_seconds.  Steps can be replaced or added by changing RecoveryChain.steps
+and each recovery is reported to the hooks in RecoveryChain.hooks.
+Processes are controlled with a ProcessController; a stand-in with the same methods can be
+passed instead, e.g. to test recovery without Photos.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# called after each recovery with (step name, consecutive timeouts, True if the step acted)
+RecoveryHook = Callable[[str, int, bool], None]
+
+
+class ProcessController:
+    """Check, quit and kill the Photos app"""
+
+    def is_running(self) -> bool:
+        """Return True if Photos is running"""
+        from .script_loader import SCRIPT_LOCK, get_script
+
+        with SCRIPT_LOCK:
+            return bool(get_script().call("photosLibraryIsRunning"))
+
+    def quit(self, timeout: float) -> bool:
+        """Ask Photos to quit, waiting at most timeout seconds; returns True if it quit"""
+        try:
+            result = subprocess.run(
+                [
+                    "osascript",
+                    "-e",
+                    f"with timeout of {int(timeout)} seconds",
+                    "-e",
+                    'tell application "Photos" to quit',
+                    "-e",
+                    "end timeout",
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=timeout + 5,
+                check=False,
+            )
+        except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+            logger.warning("⚠️  Could not quit Photos: %s", e)
+            return False
+        if result.returncode != 0:
+            logger.warning("⚠️  Could not quit Photos:\n %s", result.stderr)
+            return False
+        return True
+
+    def kill(self) -> bool:
+        """Run 'killall Photos'; returns True if Photos was terminated"""
+        try:
+            result = subprocess.run(
+                ["killall", "Photos"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=False,
+            )
+        except FileNotFoundError:
+            logger.warning("❌  'killall' command not found. Are you running on macOS?")
+            return False
+
+        # Exit code 0 means success (process found and killed)
+        if result.returncode == 0:
+            logger.warning("✅  Photos app was terminated successfully.")
+            return True
+        # Exit code 1 usually means "no matching process"
+        if "No matching processes" in result.stderr:
+            logger.warning("ℹ️  Photos app was not running.")
+            return False
+
+        logger.warning("⚠️  Unknown issue:\n %s", result.stderr)
+        return False
+
+
+class RecoveryStep:
+    """A step of a RecoveryChain, run once there have been min_timeouts consecutive timeouts"""
+
+    name = "step"
+
+    # seconds the chain waits after running the step, without blocking other threads' recovery
+    wait_seconds = 0
+
+    def __init__(self, min_timeouts: int):
+        if min_timeouts < 1:
+            raise ValueError("min_timeouts must be >= 1")
+        self.min_timeouts = min_timeouts
+
+    def run(self, chain: "RecoveryChain") -> bool | None:
+        """Recover using chain.controller
+
+        Returns:
+            True if the step acted, False if it tried to but failed, or None if it didn't
+            apply; the chain then runs the previous step instead
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(min_timeouts={self.min_timeouts})"
+
+
+class ProbeStep(RecoveryStep):
+    """Check Photos is running; if it isn't, the retried call launches it"""
+
+    name = "probe"
+
+    def __init__(self, min_timeouts: int = 1):
+        super().__init__(min_timeouts)
+
+    def run(self, chain):
+        try:
+            running = chain.controller.is_running()
+        except Exception as e:
+            logger.warning("⚠️  Could not check if Photos is running: %s", e)
+            return False
+        if not running:
+            # nothing is hung so there is nothing to escalate
+            logger.warning("ℹ️  Photos app is not running.")
+            chain.reset()
+        return True
+
+
+class BackoffStep(RecoveryStep):
+    """Wait seconds before the call is retried, in addition to the RetryPolicy wait"""
+
+    name = "backoff"
+
+    def __init__(self, min_timeouts: int = 2, seconds: float = 5):
+        super().__init__(min_timeouts)
+        self.wait_seconds = seconds
+
+    def run(self, chain):
+        # the chain waits wait_seconds once it has released its lock
+        return True
+
+
+class QuitStep(RecoveryStep):
+    """Ask Photos to quit, waiting at most timeout seconds"""
+
+    name = "quit"
+
+    def __init__(self, min_timeouts: int = 3, timeout: float = 30):
+        super().__init__(min_timeouts)
+        self.timeout = timeout
+
+    def run(self, chain):
+        logger.warning("⚠️  Asking Photos app to quit.")
+        return chain.controller.quit(self.timeout)
+
+
+class KillStep(RecoveryStep):
+    """killall Photos, at most once every min_interval seconds"""
+
+    name = "kill"
+
+    def __init__(self, min_timeouts: int = 4, min_interval: float = 300):
+        super().__init__(min_timeouts)
+        self.min_interval = min_interval
+        self.last_kill = None
+
+    def run(self, chain):
+        now = chain.clock()
+        if self.last_kill is not None and now - self.last_kill < self.min_interval:
+            return None
+        self.last_kill = now
+        return chain.controller.kill()
+
+
+def default_steps() -> list[RecoveryStep]:
+    """Return the steps of the default RecoveryChain"""
+    return [ProbeStep(), BackoffStep(), QuitStep(), KillStep()]
+
+
+class RecoveryChain:
+    """Escalating recovery of Photos after AppleScript calls time out
+
+    Example:
+        chain = photoscript.recovery_chain()
+        chain.hooks.append(lambda step, timeouts, acted: print(step, timeouts, acted))
+        chain.steps[-1].min_interval = 600
+    """
+
+    def __init__(
+        self,
+        steps: list[RecoveryStep] | None = None,
+        controller: ProcessController | None = None,
+        reset_seconds: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Args:
+            steps: steps of the chain; default is default_steps()
+            controller: ProcessController used by the steps
+            reset_seconds: consecutive timeouts are counted from zero again when there has
+                been no timeout for this many seconds
+            clock: returns the current time in seconds
+            sleep: sleeps for the given number of seconds
+        """
+        self.steps = steps if steps is not None else default_steps()
+        self.controller = controller or ProcessController()
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self.hooks: list[RecoveryHook] = []
+        self.timeouts = 0
+        self._last_timeout = None
+        self._lock = threading.Lock()
+
+    def recover(self, retry_state=None) -> str | None:
+        """Record a timeout and run the step for the number of consecutive timeouts
+
+        Used as the Tenacity before_sleep callback by run_script.
+
+        Returns:
+            name of the step that was run or None if no step applied
+        """
+        with self._lock:
+            now = self.clock()
+            if (
+                self._last_timeout is not None
+                and now - self._last_timeout > self.reset_seconds
+            ):
+                self.timeouts = 0
+            self._last_timeout = now
+            self.timeouts += 1
+            timeouts = self.timeouts
+            steps = sorted(
+                (step for step in self.steps if step.min_timeouts <= timeouts),
+                key=lambda step: step.min_timeouts,
+                reverse=True,
+            )
+            for step in steps:
+                acted = step.run(self)
+                if acted is not None:
+                    break
+            else:
+                return None
+        if acted and step.wait_seconds:
+            self.sleep(step.wait_seconds)
+        logger.warning(
+            "⚠️  run_script: AppleScript timed out %d time(s): ran recovery step %s",
+            timeouts,
+            step.name,
+        )
+        for hook in list(self.hooks):
+            try:
+                hook(step.name, timeouts, bool(acted))
+            except Exception as e:
+                logger.warning("recovery hook failed for %s: %s", step.name, e)
+        return step.name
+
+    def record_success(self):
+        """Record a call that succeeded; consecutive timeouts are counted from zero again
+
+        Called by run_script after each successful call so that only timeouts with no
+        successful call in between escalate to quitting or killing Photos.
+        """
+        if self.timeouts:
+            with self._lock:
+                self.reset()
+
+    def reset(self):
+        """Count consecutive timeouts from zero again"""
+        self.timeouts = 0
+        self._last_timeout = None
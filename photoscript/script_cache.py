@@ -0,0 +1,251 @@
+"""Caches of compiled AppleScript
+
+CompiledScriptCache stores compiled scripts in the photoscript cache directory so a new process
+can load photoscript.applescript already compiled instead of compiling it from source.  Compiled
+scripts are keyed by a hash of the script text and the macOS version; a script compiled for
+other text or another version of macOS is never loaded and is removed when the script is next
+compiled.
+
+SnippetCache is an in-memory LRU cache of the small scripts run on a folder (e.g. to get its
+name), keyed by the folder's idstring and the operation, so each one is only compiled once.
+
+Both caches compile with a ScriptCompiler; a stand-in with the same methods can be passed
+instead, e.g. to test the caches without AppleScript.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import hashlib
+import logging
+import os
+import pathlib
+import platform
+import re
+import subprocess
+import tempfile
+import threading
+
+from .utils import user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# name of the directory in the photoscript cache directory where compiled scripts are stored
+SCRIPT_CACHE_DIRNAME = "scripts"
+
+# suffix of compiled script files
+COMPILED_SCRIPT_SUFFIX = ".scpt"
+
+# matches the cache key in the name of a compiled script
+_KEY_RE = re.compile(r"[0-9a-f]{64}")
+
+# default number of compiled folder snippets kept by SnippetCache
+SNIPPET_CACHE_SIZE = 256
+
+
+class ScriptCompiler:
+    """Compile AppleScript source and load compiled scripts"""
+
+    def compile(self, source: str):
+        """Return source compiled to an applescript.AppleScript"""
+        from applescript import AppleScript
+
+        return AppleScript(source=source)
+
+    def compile_to_file(self, source: str, path: str | os.PathLike):
+        """Compile source and write the compiled script to path
+
+        Raises:
+            RuntimeError if source could not be compiled
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".applescript", encoding="utf-8", delete=False
+        ) as fd:
+            fd.write(source)
+        try:
+            result = subprocess.run(
+                ["osacompile", "-o", str(path), fd.name],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                check=False,
+            )
+        finally:
+            os.unlink(fd.name)
+        if result.returncode != 0:
+            raise RuntimeError(f"osacompile failed: {result.stderr.strip()}")
+
+    def load(self, path: str | os.PathLike):
+        """Return the compiled script at path as an applescript.AppleScript"""
+        from applescript import AppleScript
+
+        return AppleScript(path=str(path))
+
+
+class CompiledScriptCache:
+    """On-disk cache of compiled scripts keyed by a hash of the script text and macOS version"""
+
+    def __init__(
+        self,
+        cache_dir: str | os.PathLike | None = None,
+        compiler: ScriptCompiler | None = None,
+        os_version: str | None = None,
+    ):
+        """
+        Args:
+            cache_dir: directory to store compiled scripts in; default is the scripts directory
+                in the photoscript cache directory
+            compiler: ScriptCompiler used to compile and load scripts
+            os_version: macOS version the scripts are compiled for; default is the running version
+        """
+        self._cache_dir = pathlib.Path(cache_dir) if cache_dir is not None else None
+        self.compiler = compiler or ScriptCompiler()
+        self._os_version = os_version
+
+    @property
+    def os_version(self) -> str:
+        """macOS version the scripts are compiled for"""
+        if self._os_version is None:
+            self._os_version = platform.mac_ver()[0]
+        return self._os_version
+
+    @property
+    def cache_dir(self) -> pathlib.Path:
+        """Directory compiled scripts are stored in"""
+        if self._cache_dir is None:
+            self._cache_dir = user_cache_dir() / SCRIPT_CACHE_DIRNAME
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        return self._cache_dir
+
+    def key(self, source: str) -> str:
+        """Return the cache key for source"""
+        return hashlib.sha256(
+            f"{self.os_version}\0{source}".encode("utf-8")
+        ).hexdigest()
+
+    def path(self, name: str, source: str) -> pathlib.Path:
+        """Return path of the compiled script for source named name"""
+        return self.cache_dir / f"{name}-{self.key(source)}{COMPILED_SCRIPT_SUFFIX}"
+
+    def load(self, name: str, source: str):
+        """Return source compiled, loading it from the cache if it was compiled before
+
+        Args:
+            name: name of the script, e.g. "photoscript"; only one compiled script is kept per name
+            source: AppleScript source of the script
+
+        If the script can't be cached, e.g. because the cache directory isn't writable,
+        source is compiled without caching it.
+        """
+        try:
+            path = self.path(name, source)
+        except OSError as e:
+            logger.warning("could not use compiled script cache: %s", e)
+            return self.compiler.compile(source)
+
+        if path.is_file():
+            try:
+                return self.compiler.load(path)
+            except Exception as e:
+                # corrupt or unreadable; compile it again
+                logger.warning("could not load compiled script %s: %s", path, e)
+                path.unlink(missing_ok=True)
+
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+        try:
+            self.compiler.compile_to_file(source, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("could not cache compiled script %s: %s", name, e)
+            with contextlib.suppress(OSError):
+                tmp_path.unlink(missing_ok=True)
+            return self.compiler.compile(source)
+        self._remove_stale(name, path)
+        return self.compiler.load(path)
+
+    def _remove_stale(self, name, path):
+        """Remove compiled scripts named name other than path"""
+        for stale_path in path.parent.glob(f"{name}-*{COMPILED_SCRIPT_SUFFIX}"):
+            # skip scripts with names starting with name, e.g. "photoscript-core"
+            key = stale_path.name[len(name) + 1 : -len(COMPILED_SCRIPT_SUFFIX)]
+            if stale_path != path and _KEY_RE.fullmatch(key):
+                with contextlib.suppress(OSError):
+                    stale_path.unlink()
+
+    def clear(self):
+        """Remove all compiled scripts from the cache"""
+        for path in self.cache_dir.glob(f"*{COMPILED_SCRIPT_SUFFIX}"):
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+class SnippetCache:
+    """In-memory LRU cache of compiled scripts that run an operation on a folder
+
+    Each snippet runs operation inside a tell block for Photos with theFolder set to the
+    folder identified by idstring, the same as _folderRunScript in photoscript.applescript.
+    """
+
+    def __init__(
+        self, maxsize: int = SNIPPET_CACHE_SIZE, compiler: ScriptCompiler | None = None
+    ):
+        """
+        Args:
+            maxsize: maximum number of compiled snippets to keep
+            compiler: ScriptCompiler used to compile snippets
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.compiler = compiler or ScriptCompiler()
+        self.hits = 0
+        self.misses = 0
+        self._snippets = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, idstring: str, operation: str):
+        """Return compiled snippet running operation on the folder identified by idstring"""
+        key = (idstring, operation)
+        with self._lock:
+            snippet = self._snippets.get(key)
+            if snippet is not None:
+                self._snippets.move_to_end(key)
+                self.hits += 1
+                return snippet
+            self.misses += 1
+        # compile outside the lock; if two threads compile the same snippet, one is kept
+        snippet = self.compiler.compile(snippet_source(idstring, operation))
+        with self._lock:
+            self._snippets[key] = snippet
+            self._snippets.move_to_end(key)
+            while len(self._snippets) > self.maxsize:
+                self._snippets.popitem(last=False)
+        return snippet
+
+    def invalidate(self, idstring: str):
+        """Discard snippets for the folder identified by idstring and its subfolders"""
+        with self._lock:
+            for key in list(self._snippets):
+                if key[0] == idstring or key[0].endswith(f" of {idstring}"):
+                    del self._snippets[key]
+
+    def clear(self):
+        """Discard all snippets"""
+        with self._lock:
+            self._snippets.clear()
+
+    def __len__(self):
+        return len(self._snippets)
+
+
+def snippet_source(idstring: str, operation: str) -> str:
+    """Return AppleScript source for a script that runs operation on folder idstring"""
+    return (
+        "on run\n"
+        '\ttell application "Photos"\n'
+        f"\t\tset theFolder to {idstring}\n"
+        f"\t\t{operation}\n"
+        "\tend tell\n"
+        "end run\n"
+    )
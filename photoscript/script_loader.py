@@ -1,22 +1,36 @@
 """Module to load and run AppleScript scripts for photo management."""
 
+import contextlib
+import contextvars
 import pathlib
-import subprocess
+import re
 import logging
+import threading
+import time
 from tenacity import (
     RetryCallState,
     retry,
     stop_after_attempt,
-    wait_fixed,
+    wait_exponential,
+    wait_random,
     retry_if_exception,
 )
 
-from applescript import AppleScript
 from .exceptions import AppleScriptError
+from .metrics import ScriptStats
+from .script_cache import CompiledScriptCache, SnippetCache
+from .recovery import ProcessController, RecoveryChain
 
 
 logger = logging.getLogger(__name__)
 
+try:
+    from applescript import kMissingValue
+except ImportError:
+    # py-applescript only installs on macOS; without it photoscript can still be imported,
+    # e.g. to read a library with PhotosDB or to run against the simulator
+    kMissingValue = object()
+
 
 class RunScriptError(Exception):
     pass
@@ -27,17 +41,61 @@ RUNSCRIPT_CONFIG = {
     "retry_enabled": True,
     "retries": 2,
     "wait_seconds": 5,
+    "max_wait_seconds": 60,
+    "backoff": 2,
+    "jitter": 1,
+    # if True, handlers in JOINED_LIST_HANDLERS return their list as a single string
+    "bulk_strings": False,
 }
 
 
-def configure_run_script(retry_enabled=None, retries=None, wait_seconds=None):
-    """Change global retry behavior for run_script."""
+def configure_run_script(
+    retry_enabled=None,
+    retries=None,
+    wait_seconds=None,
+    max_wait_seconds=None,
+    backoff=None,
+    jitter=None,
+    policy=None,
+    bulk_strings=None,
+):
+    """Change global retry behavior for run_script.
+
+    Args:
+        retry_enabled: if False, handlers that time out are not retried
+        retries: maximum number of attempts per handler call
+        wait_seconds: seconds to wait before the first retry
+        max_wait_seconds: maximum seconds to wait between attempts
+        backoff: the wait is multiplied by backoff after each attempt
+        jitter: maximum random seconds added to each wait
+        policy: RetryPolicy to use for all of the above; other arguments override it
+        bulk_strings: if True, the handlers in JOINED_LIST_HANDLERS return their list joined
+            into a single string which is split in Python; this is much faster than converting
+            a large list element by element
+    """
+    if policy is not None:
+        RUNSCRIPT_CONFIG.update(
+            retry_enabled=policy.enabled,
+            retries=policy.retries,
+            wait_seconds=policy.wait_seconds,
+            max_wait_seconds=policy.max_wait_seconds,
+            backoff=policy.backoff,
+            jitter=policy.jitter,
+        )
     if retry_enabled is not None:
         RUNSCRIPT_CONFIG["retry_enabled"] = retry_enabled
     if retries is not None:
         RUNSCRIPT_CONFIG["retries"] = retries
     if wait_seconds is not None:
         RUNSCRIPT_CONFIG["wait_seconds"] = wait_seconds
+    if max_wait_seconds is not None:
+        RUNSCRIPT_CONFIG["max_wait_seconds"] = max_wait_seconds
+    if backoff is not None:
+        RUNSCRIPT_CONFIG["backoff"] = backoff
+    if jitter is not None:
+        RUNSCRIPT_CONFIG["jitter"] = jitter
+    if bulk_strings is not None:
+        RUNSCRIPT_CONFIG["bulk_strings"] = bulk_strings
 
 
 # Check for errot "AppleScript timed out" to allow retry
@@ -49,84 +107,880 @@ def is_applescript_timed_out(exception) -> bool:
 def kill_photos_app(retry_state: RetryCallState) -> None:
     """Run 'killall Photos'. Used to reset unstable / timed out connection to Photos.
 
+    run_script no longer kills Photos on every timeout; see recover_photos_app.
+    """
+    ProcessController().kill()
+
+
+# recovery run before a call that timed out is retried, see photoscript.recovery_chain()
+RECOVERY = RecoveryChain()
+
+
+def recover_photos_app(retry_state: RetryCallState) -> None:
+    """Run RECOVERY before retrying a call that timed out"""
+    RECOVERY.recover(retry_state)
+
+
+SCRIPT_PATH = pathlib.Path(__file__).parent
+
+# name of the dispatcher handler generated for every loaded script; used by run_script_batch
+BATCH_HANDLER = "_photoscriptBatchDispatch"
+
+# name of the dispatcher handler generated for every loaded script; used by ScriptSession
+SESSION_HANDLER = "_photoscriptSessionDispatch"
+
+# name of the dispatcher handler generated for every loaded script that calls a handler
+# returning a list of text and returns the list joined with LIST_SEPARATOR
+JOINED_HANDLER = "_photoscriptJoinedDispatch"
+
+# separator of the items in a list joined by JOINED_HANDLER; ASCII record separator
+# (character id 30 in AppleScript) which can't be in an id
+LIST_SEPARATOR = "\x1e"
+
+# handlers returning a list of ids that are called with JOINED_HANDLER if bulk_strings is set
+JOINED_LIST_HANDLERS = frozenset(
+    [
+        "photosLibraryGetAllPhotos",
+        "photosLibraryGetPhotoByRange",
+        "photosLibrarySearchPhotos",
+        "photosLibraryAlbumIDs",
+        "photosLibraryFolderIDs",
+        "photosLibraryFolderIDStrings",
+        "albumPhotes",
+    ]
+)
+
+# seconds a ScriptSession can be idle before it checks again that Photos is ready
+SESSION_IDLE_TIMEOUT = 30
+
+# max time in seconds a ScriptSession waits for Photos; same as WAIT_FOR_PHOTOS in photoscript.applescript
+WAIT_FOR_PHOTOS = 600
+
+# matches top-level handler definitions, e.g. "on photoName(_id)"
+_HANDLER_RE = re.compile(r"^on\s+(\w+)\s*\(([^)]*)\)", re.MULTILINE)
+_COMMENT_RE = re.compile(r"\(\*.*?\*\)", re.DOTALL)
+# matches a whole top-level handler, from "on photoName(_id)" to "end photoName"
+_HANDLER_BLOCK_RE = re.compile(
+    r"^on\s+(\w+)\s*\([^)]*\).*?^end\s+\1\b[^\n]*", re.MULTILINE | re.DOTALL
+)
+# matches calls in a handler body, e.g. "photosLibraryWaitForPhotos(WAIT_FOR_PHOTOS)"
+_CALL_RE = re.compile(r"\b(\w+)\s*\(")
+
+# modules photoscript.applescript is split into; each is compiled the first time one of its
+# handlers is called.  A handler is in the first module with a prefix matching its name.
+SCRIPT_MODULES = {
+    "export": ("photosLibraryExport", "photoExport", "revealInFinder"),
+    "core": ("photosLibrary", "_photosLibrary"),
+    "album": ("album",),
+    "folder": ("folder", "_folder"),
+    "photo": ("photo",),
+}
+
+# module for handlers that don't match any of the prefixes in SCRIPT_MODULES
+DEFAULT_SCRIPT_MODULE = "core"
+
+
+def parse_handlers(script: str) -> dict[str, int]:
+    """Return dict of handler name: number of arguments for top-level handlers in script"""
+    handlers = {}
+    for match in _HANDLER_RE.finditer(_COMMENT_RE.sub("", script)):
+        name, params = match.groups()
+        if name in (BATCH_HANDLER, SESSION_HANDLER, JOINED_HANDLER) or name in handlers:
+            continue
+        handlers[name] = len([p for p in params.split(",") if p.strip()])
+    return handlers
+
+
+def generate_batch_dispatcher(handlers: dict[str, int]) -> str:
+    """Generate AppleScript source for a handler that dispatches a list of calls in one Apple Event
+
+    Args:
+        handlers: dict of handler name: number of arguments as returned by parse_handlers()
+
     Returns:
-        True if Photos app was terminated
-        False if Photos app was not running or could not be terminated.
+        AppleScript source for BATCH_HANDLER which takes a list of {handlerName, argList}
+        and returns a list of {true, result} or {false, errorMessage, errorNumber}, in order
     """
-    try:
-        logger.warning(
-            "⚠️  run_script: AppleScript timed out: retrying killall + run_script"
+    branches = _generate_dispatch_branches(handlers, "\t\t\t")
+    return (
+        f"\n\non {BATCH_HANDLER}(theCalls)\n"
+        "\t(* run each {handlerName, argList} in theCalls, returning results in order *)\n"
+        "\tset theResults to {}\n"
+        "\trepeat with theCall in theCalls\n"
+        "\t\tset theName to (item 1 of theCall) as text\n"
+        "\t\tset theArgs to item 2 of theCall\n"
+        "\t\ttry\n"
+        "\t\t\tset theResult to missing value\n"
+        f"{branches}"
+        "\t\t\ttry\n"
+        "\t\t\t\t-- handlers that return nothing leave theResult undefined\n"
+        "\t\t\t\tset theResult to theResult\n"
+        "\t\t\ton error\n"
+        "\t\t\t\tset theResult to missing value\n"
+        "\t\t\tend try\n"
+        "\t\t\tcopy {true, theResult} to end of theResults\n"
+        "\t\ton error errMsg number errNum\n"
+        "\t\t\tcopy {false, errMsg, errNum} to end of theResults\n"
+        "\t\tend try\n"
+        "\tend repeat\n"
+        "\treturn theResults\n"
+        f"end {BATCH_HANDLER}\n"
+    )
+
+
+def generate_session_dispatcher(handlers: dict[str, int]) -> str:
+    """Generate AppleScript source for a handler that calls another handler without waiting for Photos
+
+    Args:
+        handlers: dict of handler name: number of arguments as returned by parse_handlers()
+
+    Returns:
+        AppleScript source for SESSION_HANDLER which takes a handler name and argument list
+        and calls the handler with SKIP_WAIT_FOR_PHOTOS set so photosLibraryWaitForPhotos
+        returns immediately; the batch and joined dispatchers can also be called this way
+    """
+    branches = _generate_dispatch_branches(
+        {**handlers, BATCH_HANDLER: 1, JOINED_HANDLER: 2}, "\t\t"
+    )
+    return (
+        f"\n\non {SESSION_HANDLER}(theName, theArgs)\n"
+        "\t(* call handler theName with theArgs without waiting for Photos *)\n"
+        "\tset SKIP_WAIT_FOR_PHOTOS to true\n"
+        "\ttry\n"
+        "\t\tset theResult to missing value\n"
+        f"{branches}"
+        "\ton error errMsg number errNum\n"
+        "\t\tset SKIP_WAIT_FOR_PHOTOS to false\n"
+        "\t\terror errMsg number errNum\n"
+        "\tend try\n"
+        "\tset SKIP_WAIT_FOR_PHOTOS to false\n"
+        "\ttry\n"
+        "\t\t-- handlers that return nothing leave theResult undefined\n"
+        "\t\treturn theResult\n"
+        "\ton error\n"
+        "\t\treturn missing value\n"
+        "\tend try\n"
+        f"end {SESSION_HANDLER}\n"
+    )
+
+
+def generate_joined_dispatcher(handlers: dict[str, int]) -> str:
+    """Generate AppleScript source for a handler that returns the list returned by another
+    handler joined into a single string
+
+    Args:
+        handlers: dict of handler name: number of arguments as returned by parse_handlers();
+            only the handlers in JOINED_LIST_HANDLERS can be called by the dispatcher
+
+    Returns:
+        AppleScript source for JOINED_HANDLER which takes a handler name and argument list
+        and returns the list returned by the handler joined with LIST_SEPARATOR; one string
+        is converted to Python much faster than a list of many strings
+    """
+    list_handlers = {
+        name: arity for name, arity in handlers.items() if name in JOINED_LIST_HANDLERS
+    }
+    branches = _generate_dispatch_branches(list_handlers, "\t")
+    return (
+        f"\n\non {JOINED_HANDLER}(theName, theArgs)\n"
+        "\t(* call handler theName with theArgs and return its list result joined into text *)\n"
+        f"{branches}"
+        "\tset oldDelimiters to AppleScript's text item delimiters\n"
+        f"\tset AppleScript's text item delimiters to character id {ord(LIST_SEPARATOR)}\n"
+        "\ttry\n"
+        "\t\tset theText to theResult as text\n"
+        "\ton error errMsg number errNum\n"
+        "\t\tset AppleScript's text item delimiters to oldDelimiters\n"
+        "\t\terror errMsg number errNum\n"
+        "\tend try\n"
+        "\tset AppleScript's text item delimiters to oldDelimiters\n"
+        "\treturn theText\n"
+        f"end {JOINED_HANDLER}\n"
+    )
+
+
+def split_joined_list(text: str) -> list[str]:
+    """Split a list joined by JOINED_HANDLER"""
+    return text.split(LIST_SEPARATOR) if text else []
+
+
+def _generate_dispatch_branches(handlers: dict[str, int], indent: str) -> str:
+    """Generate the if/else if chain calling handler theName with theArgs, setting theResult"""
+    branches = []
+    for name, arity in handlers.items():
+        args = ", ".join(f"item {i} of theArgs" for i in range(1, arity + 1))
+        keyword = "if" if not branches else "else if"
+        branches.append(
+            f'{indent}{keyword} theName is "{name}" then\n'
+            f"{indent}\tset theResult to {name}({args})\n"
         )
-        # Run 'killall Photos' and capture output
-        result = subprocess.run(
-            ["killall", "Photos"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=False,
+    if branches:
+        branches.append(
+            f'{indent}else\n{indent}\terror "Unknown handler " & theName number -1708\n'
+            f"{indent}end if\n"
         )
+    else:
+        branches.append(f'{indent}error "Unknown handler " & theName number -1708\n')
+    return "".join(branches)
 
-        # Exit code 0 means success (process found and killed)
-        if result.returncode == 0:
-            logger.warning("✅  Photos app was terminated successfully.")
-            return None
-        # Exit code 1 usually means "no matching process"
-        if "No matching processes" in result.stderr:
-            logger.warning("ℹ️  Photos app was not running.")
-            return None
 
-        # Unknown issue/error
-        logger.warning("⚠️  Unknown issue:\n %s", result.stderr)
-        return None
+# on-disk cache of compiled scripts used by load_applescript()
+SCRIPT_CACHE = CompiledScriptCache()
 
-    # Command killall not found
-    except FileNotFoundError:
-        logger.warning("❌  'killall' command not found. Are you running on macOS?")
-        return None
 
+def split_handlers(script: str) -> tuple[str, dict[str, str]]:
+    """Split script into the text before its first handler and the source of each handler
 
-SCRIPT_PATH = pathlib.Path(__file__).parent
+    Returns:
+        tuple of (header, dict of handler name: handler source); comments are removed
+    """
+    script = _COMMENT_RE.sub("", script)
+    handlers = {}
+    for match in _HANDLER_BLOCK_RE.finditer(script):
+        handlers.setdefault(match[1], match[0])
+    first = _HANDLER_RE.search(script)
+    header = script[: first.start()] if first else script
+    return header, handlers
+
+
+def handler_module(name: str, modules: dict[str, tuple[str, ...]] = SCRIPT_MODULES):
+    """Return name of the module in modules that handler name is in"""
+    for module, prefixes in modules.items():
+        if name.startswith(prefixes):
+            return module
+    return DEFAULT_SCRIPT_MODULE
+
+
+def generate_module_source(header: str, handlers: dict[str, str], names) -> str:
+    """Generate AppleScript source for a module containing handlers names
+
+    Args:
+        header: text before the first handler in the script, e.g. properties
+        handlers: dict of handler name: source as returned by split_handlers()
+        names: names of the handlers in the module
+
+    Returns:
+        AppleScript source with the handlers in names, every handler they call, and
+        dispatchers (see load_applescript) for the handlers in names
+    """
+    included = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in included:
+            continue
+        included.add(name)
+        pending.extend(
+            called
+            for called in _CALL_RE.findall(handlers[name])
+            if called in handlers and called not in included
+        )
+    source = header + "\n\n".join(
+        handler for name, handler in handlers.items() if name in included
+    )
+    module_handlers = {
+        name: arity for name, arity in parse_handlers(source).items() if name in names
+    }
+    return (
+        source
+        + generate_batch_dispatcher(module_handlers)
+        + generate_session_dispatcher(module_handlers)
+        + generate_joined_dispatcher(module_handlers)
+    )
 
 
-def load_applescript(script_name):
-    """Load an AppleScript from the scripts directory."""
+def load_applescript(script_name, cache=True):
+    """Load an AppleScript from the scripts directory.
+
+    Dispatcher handlers (BATCH_HANDLER, SESSION_HANDLER and JOINED_HANDLER) are appended to
+    the script so that any of its handlers can be called via run_script_batch() or in a
+    ScriptSession and its list handlers can return their results as a single string.
+
+    If cache is True, the compiled script is loaded from SCRIPT_CACHE if it was compiled
+    before and is stored there otherwise.
+    """
     script_path = pathlib.Path(SCRIPT_PATH) / f"{script_name}.applescript"
     if not script_path.is_file():
         raise ValueError(f"{script_path} is not a valid script")
     script_file = open(script_path, "r")
     script = script_file.read()
     script_file.close()
-    return AppleScript(script)
+    handlers = parse_handlers(script)
+    source = (
+        script
+        + generate_batch_dispatcher(handlers)
+        + generate_session_dispatcher(handlers)
+        + generate_joined_dispatcher(handlers)
+    )
+    if cache:
+        return SCRIPT_CACHE.load(script_path.stem, source)
+    from applescript import AppleScript
+
+    return AppleScript(source)
+
+
+# operations run on a folder by the folder handlers in photoscript.applescript that do nothing
+# but call _folderRunScript; FolderSnippetScript runs these with snippets compiled once
+FOLDER_SNIPPET_OPERATIONS = {
+    "folderExists": "return true",
+    "folderUUID": "return id of theFolder as text",
+    "folderName": "return name of theFolder",
+    "folderAlbums": "return id of albums of theFolder",
+    "folderCount": "return (count of albums in theFolder) + (count of folders in theFolder)",
+}
+
+# compiled folder snippets used by FolderSnippetScript
+FOLDER_SNIPPETS = SnippetCache()
+
+
+class FolderSnippetScript:
+    """Compiled photoscript.applescript that runs the folder handlers in FOLDER_SNIPPET_OPERATIONS
+    with compiled snippets from a SnippetCache
+
+    _folderRunScript in photoscript.applescript compiles a new script on every call which
+    makes reading folder properties slow; a snippet from the cache is only compiled the first
+    time an operation is run on a folder.
+    """
+
+    def __init__(self, script, snippets: SnippetCache | None = None):
+        """
+        Args:
+            script: compiled photoscript.applescript as returned by load_applescript()
+            snippets: SnippetCache to use; default is FOLDER_SNIPPETS
+        """
+        self.script = script
+        self.snippets = snippets if snippets is not None else FOLDER_SNIPPETS
+
+    def call(self, name, *args):
+        # handlers called in a ScriptSession don't wait for Photos
+        wait = name != SESSION_HANDLER
+        handler_name, handler_args = (args[0], args[1]) if not wait else (name, args)
+        if handler_name in FOLDER_SNIPPET_OPERATIONS:
+            return self._run_snippet(handler_name, handler_args[0], wait)
+        result = self.script.call(name, *args)
+        if handler_name == "photosLibraryDeleteFolder":
+            self.snippets.invalidate(handler_args[0])
+        return result
+
+    def _run_snippet(self, name, folder_idstring, wait):
+        if wait:
+            self.script.call("photosLibraryWaitForPhotos", WAIT_FOR_PHOTOS)
+        operation = FOLDER_SNIPPET_OPERATIONS[name]
+        try:
+            return self.snippets.get(folder_idstring, operation).run()
+        except Exception:
+            if name == "folderExists":
+                return False
+            raise
+
+
+class ScriptModules:
+    """Script split into SCRIPT_MODULES, each compiled the first time one of its handlers is called
+
+    Calls are routed to the module containing the handler using registry, a dict of
+    handler name: module name.  A batch (see run_script_batch) with calls to handlers
+    in more than one module is run as one batch per module.
+    """
 
+    def __init__(
+        self,
+        script_name: str = "photoscript",
+        modules: dict[str, tuple[str, ...]] = SCRIPT_MODULES,
+        loader=None,
+    ):
+        """
+        Args:
+            script_name: name of the script in the scripts directory to split into modules
+            modules: dict of module name: handler name prefixes, like SCRIPT_MODULES
+            loader: callable taking (module name, source) that returns the compiled module;
+                default compiles with SCRIPT_CACHE
+        """
+        script_path = pathlib.Path(SCRIPT_PATH) / f"{script_name}.applescript"
+        if not script_path.is_file():
+            raise ValueError(f"{script_path} is not a valid script")
+        self.script_name = script_path.stem
+        self._header, self._handlers = split_handlers(script_path.read_text())
+        self.registry = {name: handler_module(name, modules) for name in self._handlers}
+        self._loader = loader or (
+            lambda module, source: SCRIPT_CACHE.load(
+                f"{self.script_name}-{module}", source
+            )
+        )
+        self._scripts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> list[str]:
+        """Names of the modules that have been compiled"""
+        return list(self._scripts)
+
+    def module_source(self, module: str) -> str:
+        """Return AppleScript source of module"""
+        names = [name for name, owner in self.registry.items() if owner == module]
+        if not names:
+            raise ValueError(f"No handlers in module {module}")
+        return generate_module_source(self._header, self._handlers, names)
+
+    def module(self, module: str):
+        """Return module compiled, compiling it if it hasn't been already"""
+        script = self._scripts.get(module)
+        if script is None:
+            with self._lock:
+                script = self._scripts.get(module)
+                if script is None:
+                    script = self._loader(module, self.module_source(module))
+                    self._scripts[module] = script
+        return script
+
+    def call(self, name, *args):
+        if name == BATCH_HANDLER:
+            return self._call_batch(args[0], session=False)
+        if name == SESSION_HANDLER:
+            handler_name, handler_args = args
+            if handler_name == BATCH_HANDLER:
+                return self._call_batch(handler_args[0], session=True)
+            if handler_name == JOINED_HANDLER:
+                handler_name = handler_args[0]
+            return self._script_for(handler_name).call(name, *args)
+        if name == JOINED_HANDLER:
+            return self._script_for(args[0]).call(name, *args)
+        return self._script_for(name).call(name, *args)
+
+    def _script_for(self, name):
+        module = self.registry.get(name)
+        if module is None:
+            raise RunScriptError(f"Unknown handler {name}")
+        return self.module(module)
+
+    def _call_batch(self, calls, session):
+        """Run calls as one batch per module; returns results in the same order as calls"""
+        results = [None] * len(calls)
+        module_calls = {}
+        for i, (name, args) in enumerate(calls):
+            module = self.registry.get(name)
+            if module is None:
+                results[i] = [False, f"Unknown handler {name}", -1708]
+            else:
+                module_calls.setdefault(module, []).append(i)
+        for module, indexes in module_calls.items():
+            batch = [calls[i] for i in indexes]
+            script = self.module(module)
+            if session:
+                module_results = script.call(SESSION_HANDLER, BATCH_HANDLER, [batch])
+            else:
+                module_results = script.call(BATCH_HANDLER, batch)
+            for i, result in zip(indexes, module_results):
+                results[i] = result
+        return results
+
+
+# photoscript.applescript split into modules, or any object with call(name, *args) that stands
+# in for it; None until first used as compiling the script makes importing photoscript slow
+SCRIPT_OBJ = None
+
+_script_lock = threading.Lock()
+
+
+def get_script():
+    """Return SCRIPT_OBJ, creating it the first time it's needed
+
+    Modules of photoscript.applescript are compiled when their handlers are first called.
+    """
+    global SCRIPT_OBJ
+    if SCRIPT_OBJ is None:
+        with _script_lock:
+            if SCRIPT_OBJ is None:
+                SCRIPT_OBJ = FolderSnippetScript(ScriptModules("photoscript"))
+    return SCRIPT_OBJ
+
+
+# the ScriptSession active in the current thread or context, if any
+_session = contextvars.ContextVar("session", default=None)
 
-SCRIPT_OBJ = load_applescript("photoscript")
+# held while the script is called; NSAppleScript isn't thread-safe so threads calling
+# run_script (e.g. the prefetch thread of PhotosLibrary.photos) take turns
+SCRIPT_LOCK = threading.RLock()
 
 
 def _run_script_once(name, *args):
     try:
-        return SCRIPT_OBJ.call(name, *args)
+        if RUNSCRIPT_CONFIG.get("bulk_strings") and name in JOINED_LIST_HANDLERS:
+            result = split_joined_list(_call_script(JOINED_HANDLER, name, list(args)))
+        else:
+            result = _call_script(name, *args)
     except Exception as e:
         raise AppleScriptError(f"run_script '{name}' failed: {e}") from e
+    # Photos is responding so later timeouts start recovery from the first step again
+    RECOVERY.record_success()
+    return result
 
 
-def _retry_run_script():
-    """Build a Tenacity-wrapped version of _run_script_once with current config."""
+def _call_script(name, *args):
+    session = _session.get()
+    with SCRIPT_LOCK:
+        if session is not None:
+            return session.call(name, args)
+        return get_script().call(name, *args)
 
-    @retry(
-        stop=stop_after_attempt(RUNSCRIPT_CONFIG["retries"]),
-        wait=wait_fixed(RUNSCRIPT_CONFIG["wait_seconds"]),
-        retry=retry_if_exception(is_applescript_timed_out),
-        before_sleep=kill_photos_app,
-        reraise=True,
+
+class RetryPolicy:
+    """How run_script retries a handler call that timed out
+
+    Before each retry RECOVERY is run (see recover_photos_app) then run_script waits
+    wait_seconds * backoff ** (attempt - 1) seconds, at most max_wait_seconds, plus a random
+    jitter of up to jitter seconds so that clients that timed out together don't all retry
+    at once.
+
+    A policy can be set globally with configure_run_script(policy=...), for a PhotosLibrary
+    instance with PhotosLibrary(retry_policy=...) or for a handler with set_handler_retry_policy().
+    A handler's policy takes precedence over the instance's which takes precedence over the
+    global policy.  Policies are immutable; use replace() to get a modified copy.
+    """
+
+    __slots__ = (
+        "enabled",
+        "retries",
+        "wait_seconds",
+        "max_wait_seconds",
+        "backoff",
+        "jitter",
+        "_retry_call",
     )
-    def wrapped(name, *args):
-        return _run_script_once(name, *args)
 
-    return wrapped
+    def __init__(
+        self,
+        retries=2,
+        wait_seconds=5,
+        max_wait_seconds=60,
+        backoff=2,
+        jitter=1,
+        enabled=True,
+    ):
+        """
+        Args:
+            retries: maximum number of attempts per handler call
+            wait_seconds: seconds to wait before the first retry
+            max_wait_seconds: maximum seconds to wait between attempts
+            backoff: the wait is multiplied by backoff after each attempt
+            jitter: maximum random seconds added to each wait
+            enabled: if False, handlers that time out are not retried
+        """
+        for name, value in (
+            ("enabled", enabled),
+            ("retries", retries),
+            ("wait_seconds", wait_seconds),
+            ("max_wait_seconds", max_wait_seconds),
+            ("backoff", backoff),
+            ("jitter", jitter),
+            ("_retry_call", None),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RetryPolicy is immutable; use replace()")
+
+    def replace(self, **changes) -> "RetryPolicy":
+        """Return a copy of the policy with the given attributes changed"""
+        values = {
+            name: getattr(self, name) for name in self.__slots__ if name[0] != "_"
+        }
+        values.update(changes)
+        return RetryPolicy(**values)
+
+    def call(self, func, *args):
+        """Return func(*args), retrying per the policy if it raises a timed out error"""
+        if not self.enabled:
+            return func(*args)
+        if self._retry_call is None:
+            # the Tenacity wrapper is built once per policy instead of once per call
+            object.__setattr__(self, "_retry_call", self._build_retry_call())
+        return self._retry_call(func, *args)
+
+    def _build_retry_call(self):
+        @retry(
+            stop=stop_after_attempt(self.retries),
+            wait=wait_exponential(
+                multiplier=self.wait_seconds,
+                max=self.max_wait_seconds,
+                exp_base=self.backoff,
+            )
+            + wait_random(0, self.jitter),
+            retry=retry_if_exception(is_applescript_timed_out),
+            # looked up on each retry so recover_photos_app can be replaced, e.g. in tests
+            before_sleep=lambda retry_state: recover_photos_app(retry_state),
+            reraise=True,
+        )
+        def retry_call(func, *args):
+            return func(*args)
+
+        return retry_call
+
+    def __eq__(self, other):
+        if not isinstance(other, RetryPolicy):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__
+            if name[0] != "_"
+        )
+        return f"RetryPolicy({values})"
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__ if name[0] != "_")
+
+
+# retry policies set with set_handler_retry_policy()
+_handler_retry_policies: dict[str, RetryPolicy] = {}
+
+# retry policy of the PhotosLibrary instance making the current call, see use_retry_policy()
+_instance_retry_policy = contextvars.ContextVar("retry_policy", default=None)
+
+# global retry policy built from RUNSCRIPT_CONFIG and the config it was built from
+_global_retry_policy = None
+_global_retry_config = None
+
+
+def set_handler_retry_policy(name: str, policy: RetryPolicy | None):
+    """Set the retry policy for handler name; if policy is None, the handler's policy is removed"""
+    if policy is None:
+        _handler_retry_policies.pop(name, None)
+    else:
+        _handler_retry_policies[name] = policy
+
+
+@contextlib.contextmanager
+def use_retry_policy(policy: RetryPolicy | None):
+    """Context manager in which run_script uses policy for handlers without their own policy"""
+    token = _instance_retry_policy.set(policy)
+    try:
+        yield policy
+    finally:
+        _instance_retry_policy.reset(token)
+
+
+def get_retry_policy(name: str | None = None) -> RetryPolicy:
+    """Return the retry policy run_script uses for handler name"""
+    global _global_retry_policy, _global_retry_config
+    policy = _handler_retry_policies.get(name) or _instance_retry_policy.get()
+    if policy is not None:
+        return policy
+    config = tuple(RUNSCRIPT_CONFIG.values())
+    if config != _global_retry_config:
+        # only rebuilt when the configuration changes
+        _global_retry_policy = RetryPolicy(
+            retries=RUNSCRIPT_CONFIG["retries"],
+            wait_seconds=RUNSCRIPT_CONFIG["wait_seconds"],
+            max_wait_seconds=RUNSCRIPT_CONFIG["max_wait_seconds"],
+            backoff=RUNSCRIPT_CONFIG["backoff"],
+            jitter=RUNSCRIPT_CONFIG["jitter"],
+            enabled=RUNSCRIPT_CONFIG["retry_enabled"],
+        )
+        _global_retry_config = config
+    return _global_retry_policy
+
+
+# statistics of handler calls, see photoscript.stats()
+STATS = ScriptStats()
 
 
 def run_script(name, *args):
     """Public API for running AppleScript with optional retries."""
-    if RUNSCRIPT_CONFIG["retry_enabled"]:
-        return _retry_run_script()(name, *args)
-    return _run_script_once(name, *args)
+    if not STATS.enabled:
+        return get_retry_policy(name).call(_run_script_once, name, *args)
+    return _run_script_recorded(name, args)
+
+
+def _run_script_recorded(name, args):
+    """run_script() recording the call in STATS"""
+    attempts = 0
+
+    def attempt(*args):
+        nonlocal attempts
+        attempts += 1
+        return _run_script_once(*args)
+
+    error = False
+    start = time.perf_counter()
+    try:
+        return get_retry_policy(name).call(attempt, name, *args)
+    except Exception:
+        error = True
+        raise
+    finally:
+        STATS.record(name, time.perf_counter() - start, error, max(attempts - 1, 0))
+
+
+def run_script_batch(calls):
+    """Run many AppleScript handler calls in a single Apple Event round-trip.
+
+    Args:
+        calls: iterable of (handler name, sequence of args) tuples
+
+    Returns:
+        list of results in the same order as calls; if an individual call failed,
+        its entry is an AppleScriptError instead of a result (the error is not raised)
+
+    Raises:
+        AppleScriptError if the batch itself could not be run
+    """
+    calls = [(name, list(args)) for name, args in calls]
+    if not calls:
+        return []
+    results = run_script(BATCH_HANDLER, [[name, args] for name, args in calls])
+    batch_results = []
+    for (name, _), result in zip(calls, results):
+        if result[0]:
+            batch_results.append(result[1])
+        else:
+            batch_results.append(
+                AppleScriptError(
+                    f"run_script '{name}' failed: {result[1]} ({result[2]})"
+                )
+            )
+    return batch_results
+
+
+class BatchResult:
+    """Deferred result of a handler call queued in a ScriptBatch"""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self._done = False
+        self._value = None
+        self._error = None
+
+    @property
+    def done(self):
+        """True if the batch containing this call has been run"""
+        return self._done
+
+    def result(self):
+        """Return result of the call
+
+        Raises:
+            RunScriptError if the batch has not been flushed yet
+            AppleScriptError if the call failed
+        """
+        if not self._done:
+            raise RunScriptError(
+                f"'{self.name}' has not been run; flush the batch first"
+            )
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _set(self, value):
+        self._done = True
+        if isinstance(value, AppleScriptError):
+            self._error = value
+        else:
+            self._value = value
+
+
+class ScriptBatch:
+    """Queue AppleScript handler calls and run them with run_script_batch()
+
+    Can be used as a context manager; queued calls are flushed on exit unless
+    an exception was raised inside the with block, in which case they are discarded.
+
+    Example:
+        with ScriptBatch() as batch:
+            names = [batch.call("photoName", photo_id) for photo_id in photo_ids]
+        print([name.result() for name in names])
+    """
+
+    def __init__(self, max_size=None):
+        """
+        Args:
+            max_size: if set, the queue is flushed automatically when it reaches max_size calls
+        """
+        self.max_size = max_size
+        self._queue = []
+
+    def call(self, name, *args):
+        """Queue a call to handler name with args and return a BatchResult for it"""
+        pending = BatchResult(name, args)
+        self._queue.append(pending)
+        if self.max_size and len(self._queue) >= self.max_size:
+            self.flush()
+        return pending
+
+    def flush(self):
+        """Run all queued calls in one round-trip; returns list of their BatchResults"""
+        queue, self._queue = self._queue, []
+        results = run_script_batch((pending.name, pending.args) for pending in queue)
+        for pending, result in zip(queue, results):
+            pending._set(result)
+        return queue
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._queue = []
+        return False
+
+
+class ScriptSession:
+    """Run AppleScript handlers without each one first checking that Photos is ready
+
+    Most handlers start by calling photosLibraryWaitForPhotos which costs an extra
+    check of Photos on every call.  While a session is active, run_script() checks that
+    Photos is ready once then calls handlers without the wait.  Photos is checked again
+    after a call fails or the session has been idle for more than idle_timeout seconds.
+
+    Use as a context manager; a session entered while another is active has no effect.
+    A session only applies to the thread (or contextvars context) it is entered in.
+
+    Example:
+        with ScriptSession():
+            names = [photo.name for photo in photos]
+    """
+
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT):
+        """
+        Args:
+            idle_timeout: seconds the session can be idle before checking Photos again
+        """
+        self.idle_timeout = idle_timeout
+        self._last_call = None
+        self._token = None
+
+    def call(self, name, args):
+        """Call handler name with args, checking Photos is ready first if needed"""
+        if self._last_call is None or (
+            time.monotonic() - self._last_call > self.idle_timeout
+        ):
+            get_script().call("photosLibraryWaitForPhotos", WAIT_FOR_PHOTOS)
+        try:
+            result = get_script().call(SESSION_HANDLER, name, list(args))
+        except Exception:
+            # Photos may have quit or hung so check again on the next call
+            self._last_call = None
+            raise
+        self._last_call = time.monotonic()
+        return result
+
+    def __enter__(self):
+        if _session.get() is None:
+            self._token = _session.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._token is not None:
+            _session.reset(self._token)
+            self._token = None
+        return False
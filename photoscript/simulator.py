@@ -0,0 +1,992 @@
+"""In-memory simulation of Photos for load testing code that uses photoscript without Photos
+
+SimulatedPhotos implements the AppleScript handlers in photoscript.applescript, including the
+batch, session and joined dispatchers, over an in-memory library of photos, albums and
+folders.  Like transport.ReplayTransport it stands in for script_loader.SCRIPT_OBJ so
+PhotosLibrary, Album, Folder and Photo run unchanged, e.g. on Linux or CI:
+
+    with photoscript.simulator.simulate(photo_count=1_000_000, latency=0.005) as photos:
+        photos.add_album("Export", photos.photo_ids(0, 10_000))
+        run_pipeline(photoscript.PhotosLibrary())
+    print(photos.calls, photos.handler_calls.most_common(5))
+
+Photos created with the library are generated on demand from their index so a library of
+millions of photos needs memory only for the photos that are changed, imported or duplicated.
+Each call to the simulator (one Apple Event round trip) takes latency seconds and calls can be
+made to time out, either at random with timeout_rate or deterministically with inject_timeout().
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import datetime
+import os
+import pathlib
+import random
+import re
+import threading
+import time
+
+import photoscript
+import photoscript.script_loader
+from photoscript.script_loader import (
+    BATCH_HANDLER,
+    JOINED_HANDLER,
+    LIST_SEPARATOR,
+    SESSION_HANDLER,
+    kMissingValue,
+)
+
+# date of the first photo in a simulated library; each following photo is a minute later
+PHOTO_DATE = datetime.datetime(2020, 1, 1, 12, 0, 0)
+
+# width and height in pixels of the photos in a simulated library
+PHOTO_WIDTH = 4032
+PHOTO_HEIGHT = 3024
+
+# version of Photos reported by a simulated library
+PHOTOS_VERSION = "10.0"
+
+# first group of the uuids of simulated photos, albums and folders
+_UUID_KIND_PHOTO = 1
+_UUID_KIND_ALBUM = 2
+_UUID_KIND_FOLDER = 3
+
+_PHOTO_ID_RE = re.compile(
+    r"^00000001-5151-4000-8000-([0-9A-F]{12})(?:"
+    + re.escape(photoscript.UUID_SUFFIX_PHOTO)
+    + ")?$"
+)
+_FOLDER_ID_RE = re.compile(r'folder id\("([^"]+)"\)')
+
+# handlers that return or set a property of a photo and the property
+_PHOTO_GETTERS = {
+    "photoName": "name",
+    "photoDescription": "description",
+    "photoKeywords": "keywords",
+    "photoFavorite": "favorite",
+    "photoDate": "date",
+    "photoHeight": "height",
+    "photoWidth": "width",
+    "photoAltitude": "altitude",
+    "photoLocation": "location",
+    "photoFilename": "filename",
+}
+_PHOTO_SETTERS = {
+    "photoSetName": "name",
+    "photoSetDescription": "description",
+    "photoSetKeywords": "keywords",
+    "photoSetFavorite": "favorite",
+    "photoSetDate": "date",
+    "photoSetLocation": "location",
+}
+
+# handler name: method of SimulatedPhotos implementing it; filled in by @_handler
+_HANDLERS = {}
+
+
+def _handler(name):
+    """Register the decorated method as the implementation of AppleScript handler name"""
+
+    def decorator(func):
+        _HANDLERS[name] = func
+        return func
+
+    return decorator
+
+
+class SimulatedScriptError(Exception):
+    """Error raised by a simulated handler, like applescript.ScriptError raised by Photos"""
+
+    def __init__(self, message, number=-2700):
+        super().__init__(message, number)
+        self.message = message
+        self.number = number
+
+    def __str__(self):
+        return f"{self.message} ({self.number})"
+
+
+class _Folder:
+    __slots__ = ("id", "name", "parent")
+
+    def __init__(self, id_, name, parent):
+        self.id, self.name, self.parent = id_, name, parent
+
+
+class _Album:
+    __slots__ = ("id", "name", "parent", "photos", "members")
+
+    def __init__(self, id_, name, parent, photos=()):
+        self.id, self.name, self.parent = id_, name, parent
+        self.photos = []
+        self.members = set()
+        self.add(photos)
+
+    def add(self, photo_ids):
+        for photo_id in photo_ids:
+            if photo_id not in self.members:
+                self.members.add(photo_id)
+                self.photos.append(photo_id)
+
+
+class SimulatedPhotos:
+    """In-memory Photos library that can be used in place of script_loader.SCRIPT_OBJ
+
+    Attributes:
+        calls: number of calls made to the simulator; a batch or session call counts once
+        handler_calls: collections.Counter of calls to each handler, including handlers
+            called in a batch or session
+        selection: list of ids of the photos returned as the selection in Photos
+    """
+
+    def __init__(
+        self,
+        photo_count: int = 0,
+        latency: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 0.0,
+        seed: int | None = None,
+        version: str = PHOTOS_VERSION,
+    ):
+        """
+        Args:
+            photo_count: number of photos in the library; these are generated on demand
+            latency: seconds each call takes, as if it were an Apple Event sent to Photos
+            timeout_rate: probability that a call times out like an Apple Event to Photos does
+            timeout_seconds: seconds a call that times out takes before raising the error
+            seed: seed for the random number generator used for timeout_rate
+            version: version of Photos reported by photosLibraryVersion
+        """
+        self.latency = latency
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.version = version
+        self.calls = 0
+        self.handler_calls = collections.Counter()
+        self.selection = []
+        self._photo_count = photo_count
+        # records of photos that were changed, imported or duplicated, by index
+        self._photo_records = {}
+        self._folders = {}
+        self._albums = {}
+        # folder id (None for top level): ids of the folders and albums in it, in order
+        self._folder_children = collections.defaultdict(list)
+        self._album_children = collections.defaultdict(list)
+        self._next_index = {_UUID_KIND_ALBUM: 2, _UUID_KIND_FOLDER: 0}
+        self._favorites_id = _uuid(_UUID_KIND_ALBUM, 0) + photoscript.UUID_SUFFIX_ALBUM
+        self._recently_deleted_id = (
+            _uuid(_UUID_KIND_ALBUM, 1) + photoscript.UUID_SUFFIX_ALBUM
+        )
+        self._timeouts = []
+        self._random = random.Random(seed)
+        self._running = True
+        self._hidden = False
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._photo_count
+
+    # ----- setting up the library -----
+
+    def photo_id(self, index: int) -> str:
+        """Return id of the photo at index (0-based) in the library"""
+        return _uuid(_UUID_KIND_PHOTO, index) + photoscript.UUID_SUFFIX_PHOTO
+
+    def photo_ids(self, start: int = 0, stop: int | None = None) -> list[str]:
+        """Return ids of the photos with index in range(start, stop)"""
+        stop = self._photo_count if stop is None else min(stop, self._photo_count)
+        return [self.photo_id(index) for index in range(start, stop)]
+
+    def add_photos(self, count: int) -> list[str]:
+        """Add count generated photos to the library and return their ids"""
+        with self._lock:
+            start = self._photo_count
+            self._photo_count += count
+            return self.photo_ids(start)
+
+    def add_folder(self, name: str, parent: str | None = None) -> str:
+        """Add folder named name in folder with id parent (None for top level); returns its id"""
+        with self._lock:
+            if parent is not None and parent not in self._folders:
+                raise ValueError(f"Folder id {parent} does not exist")
+            folder_id = self._new_id(_UUID_KIND_FOLDER, photoscript.UUID_SUFFIX_FOLDER)
+            self._folders[folder_id] = _Folder(folder_id, name, parent)
+            self._folder_children[parent].append(folder_id)
+            return folder_id
+
+    def add_album(self, name: str, photo_ids=(), folder: str | None = None) -> str:
+        """Add album named name containing photo_ids in folder with id folder; returns its id"""
+        with self._lock:
+            if folder is not None and folder not in self._folders:
+                raise ValueError(f"Folder id {folder} does not exist")
+            for photo_id in photo_ids:
+                self._photo_index(photo_id)
+            album_id = self._new_id(_UUID_KIND_ALBUM, photoscript.UUID_SUFFIX_ALBUM)
+            self._albums[album_id] = _Album(album_id, name, folder, photo_ids)
+            self._album_children[folder].append(album_id)
+            return album_id
+
+    def inject_timeout(self, count: int = 1, handler: str | None = None):
+        """Make the next count calls to handler (or to any handler if None) time out"""
+        with self._lock:
+            self._timeouts.append([handler, count])
+
+    # ----- script_loader.SCRIPT_OBJ interface -----
+
+    def call(self, name, *args):
+        """Call AppleScript handler name with args"""
+        with self._lock:
+            self.calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+            self._check_timeout(
+                args[0] if name in (SESSION_HANDLER, JOINED_HANDLER) else name
+            )
+            if name == SESSION_HANDLER:
+                session_name, session_args = args
+                return _result(self._dispatch(session_name, session_args))
+            return self._dispatch(name, args)
+
+    def _dispatch(self, name, args):
+        self.handler_calls[name] += 1
+        if name == BATCH_HANDLER:
+            return self._batch(*args)
+        if name == JOINED_HANDLER:
+            list_name, list_args = args
+            return LIST_SEPARATOR.join(self._dispatch(list_name, list_args))
+        if name in _PHOTO_GETTERS:
+            (photo_id,) = args
+            return self._get_photo_property(photo_id, _PHOTO_GETTERS[name])
+        if name in _PHOTO_SETTERS:
+            photo_id, value = args
+            return self._set_photo_property(photo_id, _PHOTO_SETTERS[name], value)
+        handler = _HANDLERS.get(name)
+        if handler is None:
+            raise SimulatedScriptError(f"Unknown handler {name}", -1708)
+        return handler(self, *args)
+
+    def _batch(self, calls):
+        results = []
+        for name, args in calls:
+            try:
+                results.append([True, _result(self._dispatch(name, args))])
+            except SimulatedScriptError as e:
+                results.append([False, e.message, e.number])
+        return results
+
+    def _check_timeout(self, name):
+        for timeout in self._timeouts:
+            handler, count = timeout
+            if handler is None or handler == name:
+                timeout[1] -= 1
+                if timeout[1] <= 0:
+                    self._timeouts.remove(timeout)
+                break
+        else:
+            if not self.timeout_rate or self._random.random() >= self.timeout_rate:
+                return
+        if self.timeout_seconds:
+            time.sleep(self.timeout_seconds)
+        raise SimulatedScriptError("Photos got an error: AppleEvent timed out.", -1712)
+
+    # ----- library model -----
+
+    def _new_id(self, kind, suffix):
+        index = self._next_index[kind]
+        self._next_index[kind] += 1
+        return _uuid(kind, index) + suffix
+
+    def _photo_index(self, photo_id):
+        """Return index of photo with photo_id, raising an error if there is no such photo"""
+        match = _PHOTO_ID_RE.match(str(photo_id))
+        if match:
+            index = int(match[1], 16)
+            if index < self._photo_count:
+                return index
+        raise SimulatedScriptError(
+            f'Photos got an error: Can’t get media item id "{photo_id}".', -1728
+        )
+
+    def _photo(self, index):
+        """Return the record of the photo at index"""
+        record = self._photo_records.get(index)
+        return record if record is not None else self._generate_photo(index)
+
+    def _generate_photo(self, index):
+        """Return a new record for the generated photo at index"""
+        return {
+            "name": kMissingValue,
+            "description": kMissingValue,
+            "keywords": kMissingValue,
+            "favorite": False,
+            "date": PHOTO_DATE + datetime.timedelta(minutes=index),
+            "width": PHOTO_WIDTH,
+            "height": PHOTO_HEIGHT,
+            "altitude": kMissingValue,
+            "location": [kMissingValue, kMissingValue],
+            "filename": f"IMG_{index + 1:07d}.jpeg",
+        }
+
+    def _writable_photo(self, index):
+        record = self._photo_records.get(index)
+        if record is None:
+            record = self._photo_records[index] = self._photo(index)
+        return record
+
+    def _new_photo(self, record):
+        index = self._photo_count
+        self._photo_count += 1
+        self._photo_records[index] = record
+        return self.photo_id(index)
+
+    def _get_photo_property(self, photo_id, field):
+        # lists are returned as copies as they would be by AppleScript
+        return _copy(self._photo(self._photo_index(photo_id))[field])
+
+    def _set_photo_property(self, photo_id, field, value):
+        record = self._writable_photo(self._photo_index(photo_id))
+        record[field] = list(value) if isinstance(value, (list, tuple)) else value
+        return value
+
+    def _album(self, album_id, special=True):
+        """Return album with album_id; the Favorites and Recently Deleted albums are
+        only returned if special is True"""
+        album = self._albums.get(album_id)
+        if album is not None:
+            return album
+        if special and album_id == self._favorites_id:
+            favorites = [
+                self.photo_id(index)
+                for index, record in sorted(self._photo_records.items())
+                if record["favorite"]
+            ]
+            return _Album(album_id, "Favorites", None, favorites)
+        if special and album_id == self._recently_deleted_id:
+            return _Album(album_id, "Recently Deleted", None)
+        raise SimulatedScriptError(
+            f'Photos got an error: Can’t get album id "{album_id}".', -1728
+        )
+
+    def _folder_idstring(self, folder_id):
+        parts = []
+        while folder_id is not None:
+            parts.append(f'folder id("{folder_id}")')
+            folder_id = self._folders[folder_id].parent
+        return " of ".join(parts)
+
+    def _folder(self, folder_idstring):
+        """Return folder for folder_idstring, raising an error if there is no such folder"""
+        folder_ids = _FOLDER_ID_RE.findall(str(folder_idstring))
+        folders = [self._folders.get(folder_id) for folder_id in folder_ids]
+        if (
+            folders
+            and all(folders)
+            and all(
+                folder.parent == parent
+                for folder, parent in zip(folders, [*folder_ids[1:], None])
+            )
+        ):
+            return folders[0]
+        raise SimulatedScriptError(
+            f"Photos got an error: Can’t get {folder_idstring}.", -1728
+        )
+
+    def _walk_folders(self, parent=None):
+        """Yield folders in parent and their subfolders, depth first"""
+        for folder_id in self._folder_children[parent]:
+            yield self._folders[folder_id]
+            yield from self._walk_folders(folder_id)
+
+    def _all_folders(self):
+        """Return all folders, each listed before its subfolders"""
+        folders = []
+        parents = [None]
+        while parents:
+            parent = parents.pop(0)
+            for folder_id in self._folder_children[parent]:
+                folders.append(self._folders[folder_id])
+                parents.append(folder_id)
+        return folders
+
+    def _all_albums(self):
+        """Return all albums, top level albums first"""
+        albums = [self._albums[album_id] for album_id in self._album_children[None]]
+        for folder in self._all_folders():
+            albums.extend(
+                self._albums[album_id] for album_id in self._album_children[folder.id]
+            )
+        return albums
+
+    def _top_level_folder(self, name):
+        for folder_id in self._folder_children[None]:
+            if self._folders[folder_id].name == name:
+                return self._folders[folder_id]
+        return None
+
+    def _folder_by_path(self, folder_path):
+        folder = None
+        for name in folder_path:
+            folder = next(
+                (
+                    self._folders[folder_id]
+                    for folder_id in self._folder_children[
+                        folder.id if folder is not None else None
+                    ]
+                    if self._folders[folder_id].name == name
+                ),
+                None,
+            )
+            if folder is None:
+                return None
+        return folder
+
+    def _create_album(self, name, folder_idstring=kMissingValue):
+        folder = None if _missing(folder_idstring) else self._folder(folder_idstring)
+        return self.add_album(name, folder=folder.id if folder is not None else None)
+
+    def _delete_album(self, album_id):
+        album = self._album(album_id, special=False)
+        del self._albums[album_id]
+        self._album_children[album.parent].remove(album_id)
+
+    def _delete_folder(self, folder_id):
+        for subfolder_id in list(self._folder_children[folder_id]):
+            self._delete_folder(subfolder_id)
+        for album_id in self._album_children.pop(folder_id, []):
+            del self._albums[album_id]
+        del self._folder_children[folder_id]
+        folder = self._folders.pop(folder_id)
+        self._folder_children[folder.parent].remove(folder_id)
+
+    def _import(self, filenames, album_id=None):
+        album = self._album(album_id, special=False) if album_id is not None else None
+        photo_ids = []
+        for filename in filenames:
+            record = self._generate_photo(self._photo_count)
+            record.update(
+                filename=pathlib.Path(filename).name,
+                date=datetime.datetime.now().replace(microsecond=0),
+            )
+            photo_ids.append(self._new_photo(record))
+        if album is not None:
+            album.add(photo_ids)
+        return photo_ids
+
+    def _export(self, photo_ids, path, original, edited):
+        for photo_id in photo_ids:
+            filename = self._photo(self._photo_index(photo_id))["filename"]
+            names = []
+            if original:
+                names.append(filename)
+            if edited:
+                names.append(f"{pathlib.Path(filename).stem}.jpeg")
+            for name in names:
+                with open(os.path.join(path, name), "wb") as fd:
+                    fd.write(f"simulated export of {photo_id}".encode("utf-8"))
+
+    # ----- PhotosLibrary handlers -----
+
+    @_handler("photosLibraryWaitForPhotos")
+    def _wait_for_photos(self, timeout):
+        self._running = True
+        return True
+
+    @_handler("photosLibraryIsRunning")
+    def _is_running(self):
+        return self._running
+
+    @_handler("photosLibraryHide")
+    def _hide(self):
+        self._hidden = True
+
+    @_handler("photosLibraryIsHidden")
+    def _is_hidden(self):
+        return self._hidden or not self._running
+
+    @_handler("photosLibraryActivate")
+    def _activate(self):
+        self._running = True
+        self._hidden = False
+
+    @_handler("photosLibraryQuit")
+    def _quit(self):
+        self._running = False
+
+    @_handler("photosLibraryName")
+    def _name(self):
+        return "Photos"
+
+    @_handler("photosLibraryVersion")
+    def _version(self):
+        return self.version
+
+    @_handler("photosLibraryIsFrontMost")
+    def _is_frontmost(self):
+        return self._running and not self._hidden
+
+    @_handler("photosLibraryGetAllPhotos")
+    def _get_all_photos(self):
+        return self.photo_ids()
+
+    @_handler("photosLibraryGetPhotoByNumber")
+    def _get_photo_by_number(self, number):
+        if not 1 <= number <= self._photo_count:
+            raise SimulatedScriptError(
+                f"Photos got an error: Can’t get media item {number}.", -1719
+            )
+        return self.photo_id(number - 1)
+
+    @_handler("photosLibraryGetPhotoByRange")
+    def _get_photo_by_range(self, start, stop):
+        if not 1 <= start <= stop <= self._photo_count:
+            raise SimulatedScriptError(
+                f"Photos got an error: Can’t get media items {start} thru {stop}.",
+                -1719,
+            )
+        return self.photo_ids(start - 1, stop)
+
+    @_handler("photosLibraryGetMetadata")
+    def _get_metadata(self, photo_ids, fields):
+        for field in fields:
+            if field not in photoscript.METADATA_FIELDS:
+                raise SimulatedScriptError(f"Unknown metadata field {field}")
+        records = [self._photo(self._photo_index(photo_id)) for photo_id in photo_ids]
+        return [[_copy(record[field]) for record in records] for field in fields]
+
+    @_handler("photosLibraryExport")
+    def _library_export(self, photo_ids, path, original, edited, timeout):
+        self._export(photo_ids, path, original, edited)
+        return len(photo_ids)
+
+    @_handler("photosLibrarySearchPhotos")
+    def _search_photos(self, search):
+        # generated photos have no name, description or keywords to match
+        search = search.lower()
+        photo_ids = []
+        for index, record in sorted(self._photo_records.items()):
+            text = [record["name"], record["description"]]
+            if record["keywords"] != kMissingValue:
+                text.extend(record["keywords"])
+            if any(search in value.lower() for value in text if isinstance(value, str)):
+                photo_ids.append(self.photo_id(index))
+        return photo_ids
+
+    @_handler("photosLibraryCount")
+    def _count(self):
+        return self._photo_count
+
+    @_handler("photosLibraryImport")
+    def _library_import(self, filenames, skip_duplicate_check):
+        return self._import(filenames)
+
+    @_handler("photosLibraryImportToAlbum")
+    def _library_import_to_album(self, filenames, album_id, skip_duplicate_check):
+        return self._import(filenames, album_id)
+
+    @_handler("photosLibraryAlbumNames")
+    def _album_names(self, top_level):
+        return [album.name for album in self._albums_at_level(top_level)]
+
+    @_handler("photosLibraryFolderNames")
+    def _folder_names(self, top_level):
+        return [folder.name for folder in self._folders_at_level(top_level)]
+
+    def _albums_at_level(self, top_level):
+        if top_level:
+            return [self._albums[album_id] for album_id in self._album_children[None]]
+        return self._all_albums()
+
+    def _folders_at_level(self, top_level):
+        if top_level:
+            return [
+                self._folders[folder_id] for folder_id in self._folder_children[None]
+            ]
+        return self._all_folders()
+
+    @_handler("photosLibraryGetFolderIDStringForID")
+    def _get_folder_idstring_for_id(self, folder_id, top_level):
+        folder = self._folders.get(folder_id)
+        if folder is None or (top_level and folder.parent is not None):
+            return kMissingValue
+        return self._folder_idstring(folder_id)
+
+    @_handler("photosLibraryGetFolderIDs")
+    def _get_folder_ids(self, recurse):
+        folders = (
+            self._walk_folders() if recurse else self._folders_at_level(top_level=True)
+        )
+        return [
+            {"folderName": folder.name, "folderId": folder.id} for folder in folders
+        ]
+
+    @_handler("photosLibraryGetAlbumIDs")
+    def _get_album_ids(self, recurse):
+        albums = [self._albums[album_id] for album_id in self._album_children[None]]
+        if recurse:
+            for folder in self._walk_folders():
+                albums.extend(
+                    self._albums[album_id]
+                    for album_id in self._album_children[folder.id]
+                )
+        return [{"albumName": album.name, "albumID": album.id} for album in albums]
+
+    @_handler("photosLibraryGetFolderIDStringForName")
+    def _get_folder_idstring_for_name(self, name, top_level):
+        folder = self._top_level_folder(name)
+        if folder is None and not top_level:
+            folder = next(
+                (
+                    subfolder
+                    for folder_id in self._folder_children[None]
+                    for subfolder in self._walk_folders(folder_id)
+                    if subfolder.name == name
+                ),
+                None,
+            )
+        return self._folder_idstring(folder.id) if folder is not None else kMissingValue
+
+    @_handler("photosLibraryAlbumIDs")
+    def _album_ids(self, top_level):
+        return [album.id for album in self._albums_at_level(top_level)]
+
+    @_handler("photosLibraryAlbumMembership")
+    def _album_membership(self):
+        albums = self._all_albums()
+        return [
+            [album.id for album in albums],
+            [list(album.photos) for album in albums],
+        ]
+
+    @_handler("photosLibraryTree")
+    def _tree(self):
+        folders = [
+            [folder.id, folder.name, _or_missing(folder.parent)]
+            for folder in self._all_folders()
+        ]
+        albums = [
+            [album.id, album.name, _or_missing(album.parent), len(album.photos)]
+            for album in self._all_albums()
+        ]
+        return [folders, albums]
+
+    @_handler("photosLibraryFolderIDs")
+    def _folder_ids(self, top_level):
+        return [record["folderId"] for record in self._get_folder_ids(not top_level)]
+
+    @_handler("photosLibraryFolderIDStrings")
+    def _folder_idstrings(self, top_level):
+        return [
+            self._folder_idstring(folder_id)
+            for folder_id in self._folder_ids(top_level)
+        ]
+
+    @_handler("photosLibraryCreateAlbum")
+    def _library_create_album(self, name):
+        return self._create_album(name)
+
+    @_handler("photosLibraryCreateAlbumAtFolder")
+    def _library_create_album_at_folder(self, name, folder_idstring):
+        return self._create_album(name, folder_idstring)
+
+    @_handler("photosLibraryGetSelection")
+    def _get_selection(self):
+        return list(self.selection)
+
+    @_handler("photosLibraryFavorites")
+    def _favorites(self):
+        return self._favorites_id
+
+    @_handler("photosLibraryRecentlyDeleted")
+    def _recently_deleted(self):
+        return self._recently_deleted_id
+
+    @_handler("photosLibraryDeleteAlbum")
+    def _library_delete_album(self, album_id):
+        self._delete_album(album_id)
+
+    @_handler("photosLibraryCreateFolder")
+    def _library_create_folder(self, name):
+        return self._folder_idstring(self.add_folder(name))
+
+    @_handler("photosLibraryCreateFolderAtFolder")
+    def _library_create_folder_at_folder(self, name, folder_idstring):
+        folder = self._folder(folder_idstring)
+        folder_id = self.add_folder(name, folder.id)
+        return f'folder id("{folder_id}") of {folder_idstring}'
+
+    @_handler("photosLibraryDeleteFolder")
+    def _library_delete_folder(self, folder_idstring):
+        self._delete_folder(self._folder(folder_idstring).id)
+
+    # ----- Album handlers -----
+
+    @_handler("albumByPath")
+    def _album_by_path(self, album_path):
+        *folder_path, name = album_path
+        if folder_path:
+            folder = self._folder_by_path(folder_path)
+            if folder is None:
+                return kMissingValue
+            parent = folder.id
+        else:
+            parent = None
+        for album_id in self._album_children[parent]:
+            if self._albums[album_id].name == name:
+                return album_id
+        return kMissingValue
+
+    @_handler("albumName")
+    def _album_name(self, album_id):
+        return self._album(album_id).name
+
+    @_handler("albumByName")
+    def _album_by_name(self, name, top_level):
+        for album in self._albums_at_level(top_level):
+            if album.name == name:
+                return album.id
+        return 0
+
+    @_handler("albumExists")
+    def _album_exists(self, album_id):
+        try:
+            self._album(album_id)
+        except SimulatedScriptError:
+            return False
+        return True
+
+    @_handler("albumParent")
+    def _album_parent(self, album_id):
+        parent = self._album(album_id).parent
+        return parent if parent is not None else 0
+
+    @_handler("albumPhotes")
+    def _album_photos(self, album_id):
+        return list(self._album(album_id).photos)
+
+    @_handler("albumCount")
+    def _album_count(self, album_id):
+        return len(self._album(album_id).photos)
+
+    @_handler("albumAdd")
+    def _album_add(self, album_id, photo_ids, expected_count):
+        album = self._album(album_id, special=False)
+        for photo_id in photo_ids:
+            self._photo_index(photo_id)
+        album.add(photo_ids)
+        return len(album.photos)
+
+    @_handler("albumRebuild")
+    def _album_rebuild(self, album_id, photo_ids, folder_idstring):
+        album = self._album(album_id, special=False)
+        photo_ids = list(album.photos) if _missing(photo_ids) else photo_ids
+        for photo_id in photo_ids:
+            self._photo_index(photo_id)
+        new_album_id = self._create_album("photoscript_rebuild", folder_idstring)
+        new_album = self._albums[new_album_id]
+        new_album.add(photo_ids)
+        self._delete_album(album_id)
+        new_album.name = album.name
+        return new_album_id
+
+    @_handler("albumSetName")
+    def _album_set_name(self, album_id, name):
+        self._album(album_id, special=False).name = name
+        return name
+
+    @_handler("albumGetPath")
+    def _album_get_path(self, album_id, delimiter):
+        album = self._album(album_id)
+        names = [album.name]
+        folder_id = album.parent
+        while folder_id is not None:
+            names.insert(0, self._folders[folder_id].name)
+            folder_id = self._folders[folder_id].parent
+        return delimiter.join(names)
+
+    @_handler("albumSpotlight")
+    def _album_spotlight(self, album_id):
+        self._album(album_id)
+        self._activate()
+
+    # ----- Folder handlers -----
+
+    @_handler("folderGetIDStringFromPath")
+    def _folder_get_idstring_from_path(self, folder_path):
+        folder = self._folder_by_path(folder_path)
+        return self._folder_idstring(folder.id) if folder is not None else kMissingValue
+
+    @_handler("folderExists")
+    def _folder_exists(self, folder_idstring):
+        try:
+            self._folder(folder_idstring)
+        except SimulatedScriptError:
+            return False
+        return True
+
+    @_handler("folderUUID")
+    def _folder_uuid(self, folder_idstring):
+        return self._folder(folder_idstring).id
+
+    @_handler("folderName")
+    def _folder_name(self, folder_idstring):
+        return self._folder(folder_idstring).name
+
+    @_handler("folderSetName")
+    def _folder_set_name(self, folder_idstring, name):
+        self._folder(folder_idstring).name = name
+        return True
+
+    @_handler("folderParent")
+    def _folder_parent(self, folder_idstring):
+        # like the AppleScript handler, this only parses folder_idstring
+        _, *parents = folder_idstring.split(" of ")
+        return " of ".join(parents) if parents else kMissingValue
+
+    @_handler("folderAlbums")
+    def _folder_albums(self, folder_idstring):
+        return list(self._album_children[self._folder(folder_idstring).id])
+
+    @_handler("folderFolders")
+    def _folder_folders(self, folder_idstring):
+        folder = self._folder(folder_idstring)
+        return [
+            f'folder id("{folder_id}") of {folder_idstring}'
+            for folder_id in self._folder_children[folder.id]
+        ]
+
+    @_handler("folderCount")
+    def _folder_count(self, folder_idstring):
+        folder = self._folder(folder_idstring)
+        return len(self._album_children[folder.id]) + len(
+            self._folder_children[folder.id]
+        )
+
+    @_handler("folderIDByPath")
+    def _folder_id_by_path(self, folder_path):
+        folder = self._folder_by_path(folder_path)
+        return folder.id if folder is not None else kMissingValue
+
+    @_handler("folderGetPath")
+    def _folder_get_path(self, folder_idstring, delimiter):
+        folder = self._folder(folder_idstring)
+        names = [folder.name]
+        while folder.parent is not None:
+            folder = self._folders[folder.parent]
+            names.insert(0, folder.name)
+        return delimiter.join(names)
+
+    @_handler("folderGetPathFolderIDScript")
+    def _folder_get_path_folder_id_script(self, folder_idstring):
+        parents = []
+        parent = self._folder_parent(folder_idstring)
+        while parent != kMissingValue:
+            parents.insert(0, parent)
+            parent = self._folder_parent(parent)
+        return parents
+
+    @_handler("folderSpotlight")
+    def _folder_spotlight(self, folder_idstring):
+        self._folder(folder_idstring)
+        self._activate()
+
+    # ----- Photo handlers -----
+
+    @_handler("photoExists")
+    def _photo_exists(self, photo_id):
+        try:
+            self._photo_index(photo_id)
+        except SimulatedScriptError:
+            return False
+        return True
+
+    @_handler("photoAlbums")
+    def _photo_albums(self, photo_id):
+        return [album.id for album in self._all_albums() if photo_id in album.members]
+
+    @_handler("photoExport")
+    def _photo_export(self, photo_id, path, original, edited, timeout):
+        self._export([photo_id], path, original, edited)
+        return self._get_photo_property(photo_id, "filename")
+
+    @_handler("photoDuplicate")
+    def _photo_duplicate(self, photo_id):
+        record = {
+            field: _copy(value)
+            for field, value in self._photo(self._photo_index(photo_id)).items()
+        }
+        return self._new_photo(record)
+
+    @_handler("photoSpotlight")
+    def _photo_spotlight(self, photo_id):
+        self._photo_index(photo_id)
+        self._activate()
+
+    # ----- Utilities -----
+
+    @_handler("revealInFinder")
+    def _reveal_in_finder(self, paths):
+        pass
+
+
+# names of the AppleScript handlers implemented by SimulatedPhotos
+HANDLERS = frozenset(
+    [
+        *_HANDLERS,
+        *_PHOTO_GETTERS,
+        *_PHOTO_SETTERS,
+        BATCH_HANDLER,
+        SESSION_HANDLER,
+        JOINED_HANDLER,
+    ]
+)
+
+
+@contextlib.contextmanager
+def simulate(simulator: SimulatedPhotos | None = None, **kwargs):
+    """Context manager that runs all handler calls made by run_script against a simulated library
+
+    Args:
+        simulator: SimulatedPhotos to use; if None, one is created with kwargs
+        **kwargs: arguments for SimulatedPhotos, e.g. photo_count=1_000_000
+
+    Yields:
+        the SimulatedPhotos object
+    """
+    if simulator is None:
+        simulator = SimulatedPhotos(**kwargs)
+    script = photoscript.script_loader.SCRIPT_OBJ
+    # an album membership index built for another library doesn't apply to this one
+    photoscript._album_membership_index = None
+    photoscript.script_loader.SCRIPT_OBJ = simulator
+    try:
+        yield simulator
+    finally:
+        photoscript.script_loader.SCRIPT_OBJ = script
+        photoscript._album_membership_index = None
+
+
+def _uuid(kind, index):
+    return f"{kind:08X}-5151-4000-8000-{index:012X}"
+
+
+def _missing(value):
+    """Return True if value is missing value; None is an error as it is in AppleScript"""
+    if value is None:
+        # py-applescript sends None as a null descriptor which isn't missing value
+        raise SimulatedScriptError("Can’t make null into type missing value.", -1700)
+    return value == kMissingValue
+
+
+def _or_missing(value):
+    return kMissingValue if value is None else value
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+def _result(value):
+    """Return value as returned by the batch and session dispatchers"""
+    return kMissingValue if value is None else value
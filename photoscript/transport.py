@@ -0,0 +1,226 @@
+"""Record the AppleScript calls made by photoscript and replay them without Photos
+
+run_script calls handlers through script_loader.SCRIPT_OBJ.  RecordingTransport wraps the
+script, writing each call (handler, args), its result or error and its latency to a trace
+file.  ReplayTransport serves the responses from a trace so code using photoscript can be
+benchmarked or tested without Photos, e.g. to check the number of round trips a pipeline
+makes or to compare photoscript versions against the same workload.
+
+    with photoscript.transport.record("trace.jsonl.gz"):
+        export_everything(photoscript.PhotosLibrary())
+
+    with photoscript.transport.replay("trace.jsonl.gz") as transport:
+        export_everything(photoscript.PhotosLibrary())
+    print(transport.calls)
+
+A trace is a gzipped JSON lines file: a header line followed by one line per call of
+[handler, args, ok, result or error message, seconds].  Responses are matched to calls by
+handler and args; calls with the same handler and args are served their responses in the
+order they were recorded.
+"""
+
+from __future__ import annotations
+
+import base64
+import collections
+import contextlib
+import dataclasses
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+
+import photoscript.script_loader
+from photoscript.script_loader import kMissingValue
+
+try:
+    from applescript import AEEnum, AEType
+except ImportError:
+    # py-applescript only installs on macOS; a trace recorded there is replayed elsewhere with
+    # stand-ins that keep the four-character code of each value
+
+    @dataclasses.dataclass(frozen=True)
+    class AEType:
+        code: bytes
+
+    class AEEnum(AEType):
+        pass
+
+
+# version of the trace file format
+TRACE_VERSION = 1
+
+
+class RecordedScriptError(Exception):
+    """Error raised by a handler when the trace was recorded, raised again on replay"""
+
+
+class ReplayError(Exception):
+    """Raised on replay for a call that has no recorded response"""
+
+
+class RecordingTransport:
+    """Call handlers on script and record each call to a trace file"""
+
+    def __init__(self, script, path: str | os.PathLike):
+        """
+        Args:
+            script: object with call(name, *args) to record, e.g. script_loader.get_script()
+            path: path of the trace file to write
+        """
+        self.script = script
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._file.write(json.dumps({"photoscript_trace": TRACE_VERSION}) + "\n")
+        self._lock = threading.Lock()
+
+    def call(self, name, *args):
+        start = time.perf_counter()
+        try:
+            result = self.script.call(name, *args)
+        except Exception as e:
+            self._write(name, args, False, str(e), time.perf_counter() - start)
+            raise
+        self._write(name, args, True, _encode(result), time.perf_counter() - start)
+        return result
+
+    def _write(self, name, args, ok, response, seconds):
+        line = json.dumps(
+            [name, _encode(args), ok, response, round(seconds, 6)],
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        """Close the trace file"""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayTransport:
+    """Serve handler calls from a trace file written by RecordingTransport"""
+
+    def __init__(self, path: str | os.PathLike, latency: bool = False):
+        """
+        Args:
+            path: path of the trace file to replay
+            latency: if True, each call takes as long as it did when recorded
+
+        Raises:
+            ValueError if path is not a trace file
+        """
+        self.latency = latency
+        self.calls = 0
+        self._responses = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as fd:
+            try:
+                header = json.loads(fd.readline())
+            except (OSError, ValueError) as e:
+                raise ValueError(f"{path} is not a photoscript trace: {e}") from e
+            if header.get("photoscript_trace") != TRACE_VERSION:
+                raise ValueError(f"{path} is not a version {TRACE_VERSION} trace")
+            for line in fd:
+                name, args, ok, response, seconds = json.loads(line)
+                self._responses[_key(name, args)].append((ok, response, seconds))
+
+    def call(self, name, *args):
+        key = _key(name, _encode(args))
+        with self._lock:
+            self.calls += 1
+            responses = self._responses.get(key)
+            if not responses:
+                raise ReplayError(f"no recorded response for {name}{args!r}")
+            # the last response is kept to serve any further identical calls
+            ok, response, seconds = (
+                responses.popleft() if len(responses) > 1 else responses[0]
+            )
+        if self.latency:
+            time.sleep(seconds)
+        if not ok:
+            raise RecordedScriptError(response)
+        return _decode(response)
+
+
+@contextlib.contextmanager
+def record(path: str | os.PathLike):
+    """Context manager that records all handler calls made by run_script to trace file path"""
+    script = photoscript.script_loader.get_script()
+    with RecordingTransport(script, path) as transport:
+        photoscript.script_loader.SCRIPT_OBJ = transport
+        try:
+            yield transport
+        finally:
+            photoscript.script_loader.SCRIPT_OBJ = script
+
+
+@contextlib.contextmanager
+def replay(path: str | os.PathLike, latency: bool = False):
+    """Context manager that serves all handler calls made by run_script from trace file path
+
+    Args:
+        path: path of the trace file to replay
+        latency: if True, each call takes as long as it did when recorded
+    """
+    script = photoscript.script_loader.SCRIPT_OBJ
+    transport = ReplayTransport(path, latency=latency)
+    photoscript.script_loader.SCRIPT_OBJ = transport
+    try:
+        yield transport
+    finally:
+        photoscript.script_loader.SCRIPT_OBJ = script
+
+
+def _key(name, encoded_args):
+    return json.dumps([name, encoded_args], sort_keys=True, separators=(",", ":"))
+
+
+def _encode(value):
+    """Encode value returned by or passed to AppleScript as JSON-compatible data"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {"$dict": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, datetime.datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    if value is kMissingValue:
+        # kMissingValue is a plain sentinel if py-applescript isn't installed
+        return {"$AEType": "msng"}
+    if isinstance(getattr(value, "code", None), bytes):
+        # applescript.AEType and AEEnum, e.g. kMissingValue
+        return {f"${type(value).__name__}": value.code.decode("latin-1")}
+    return {"$repr": repr(value)}
+
+
+def _decode(value):
+    """Decode value encoded by _encode()"""
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    (tag, data), *_ = value.items()
+    if tag == "$dict":
+        return {_decode(k): _decode(v) for k, v in data}
+    if tag == "$datetime":
+        return datetime.datetime.fromisoformat(data)
+    if tag == "$bytes":
+        return base64.b64decode(data)
+    if tag == "$AEType":
+        # decoded to photoscript's kMissingValue so it compares equal with or without applescript
+        return kMissingValue if data == "msng" else AEType(data.encode("latin-1"))
+    if tag == "$AEEnum":
+        return AEEnum(data.encode("latin-1"))
+    return data
@@ -0,0 +1,315 @@
+"""Snapshot of the folder and album hierarchy of a Photos library
+
+LibraryTree is created by PhotosLibrary.tree() from a single traversal of the library and
+holds every folder and album with its name, parent, and count.  Lookups by name or path,
+path_str(), and parent resolution are done in memory without sending any Apple Events.
+The snapshot is not updated when the library changes; call PhotosLibrary.tree() again to
+get a new snapshot.  Methods that change the library (e.g. setting a name or adding photos
+to an album) and Album.photos() still go through Photos via AppleScript.
+"""
+
+from __future__ import annotations
+
+from photoscript import (
+    UUID_SUFFIX_ALBUM,
+    UUID_SUFFIX_FOLDER,
+    Album,
+    Folder,
+    kMissingValue,
+    uuid_to_id,
+)
+
+
+class LibraryTree:
+    """Folders and albums of a Photos library with name and path indexes"""
+
+    def __init__(self, folders: list[list], albums: list[list]):
+        """Create a LibraryTree from the values returned by the photosLibraryTree handler
+
+        Args:
+            folders: list of [folder id, name, parent folder id or missing value]
+            albums: list of [album id, name, parent folder id or missing value, count]
+        """
+        self._folders_by_id: dict[str, TreeFolder] = {}
+        self._albums_by_id: dict[str, TreeAlbum] = {}
+        self._children: dict[str | None, list[TreeFolder]] = {}
+        self._albums_in: dict[str | None, list[TreeAlbum]] = {}
+
+        # folders are listed before their subfolders so a folder's parent is always known
+        for folder_id, name, parent_id in folders:
+            parent_id = None if parent_id == kMissingValue else parent_id
+            folder = TreeFolder(self, folder_id, name, parent_id)
+            self._folders_by_id[folder.id] = folder
+            self._children.setdefault(parent_id, []).append(folder)
+        for album_id, name, parent_id, count in albums:
+            parent_id = None if parent_id == kMissingValue else parent_id
+            album = TreeAlbum(self, album_id, name, parent_id, count)
+            self._albums_by_id[album.id] = album
+            self._albums_in.setdefault(parent_id, []).append(album)
+
+        self._folders_by_name: dict[str, list[TreeFolder]] = {}
+        self._folders_by_path: dict[tuple[str, ...], TreeFolder] = {}
+        for folder in self._folders_by_id.values():
+            self._folders_by_name.setdefault(folder.name, []).append(folder)
+            self._folders_by_path.setdefault(tuple(folder._path_names()), folder)
+        self._albums_by_name: dict[str, list[TreeAlbum]] = {}
+        self._albums_by_path: dict[tuple[str, ...], TreeAlbum] = {}
+        for album in self._albums_by_id.values():
+            self._albums_by_name.setdefault(album.name, []).append(album)
+            self._albums_by_path.setdefault(tuple(album._path_names()), album)
+
+    @property
+    def folders(self) -> list[TreeFolder]:
+        """list of every folder in the library"""
+        return list(self._folders_by_id.values())
+
+    @property
+    def albums(self) -> list[TreeAlbum]:
+        """list of every album in the library"""
+        return list(self._albums_by_id.values())
+
+    def folder_names(self, top_level=False) -> list[str]:
+        """List of folder names in the library
+
+        Args:
+            top_level: if True, returns only top-level folders otherwise returns all folders
+        """
+        folders = self._children.get(None, []) if top_level else self.folders
+        return [folder.name for folder in folders]
+
+    def album_names(self, top_level=False) -> list[str]:
+        """List of album names in the library
+
+        Args:
+            top_level: if True, returns only top-level albums otherwise returns all albums
+        """
+        albums = self._albums_in.get(None, []) if top_level else self.albums
+        return [album.name for album in albums]
+
+    def folder(
+        self, name: str = None, path: list[str] = None, uuid: str = None, top_level=True
+    ) -> TreeFolder | None:
+        """TreeFolder by name, path, or uuid
+
+        Args:
+            name: name of folder, e.g. "My Folder"
+            path: path of folder as list of strings, e.g. ["My Folder", "Subfolder"]
+            uuid: id of folder, e.g. "F1234567-1234-1234-1234-1234567890AB"
+            top_level: if True, only searches top level folders by name; default is True
+
+        Returns:
+            TreeFolder object or None if folder could not be found
+
+        Raises:
+            ValueError not one of name, path, or uuid is passed
+
+        Notes:
+            Must pass one of path, name, or uuid but not more than one
+            If more than one folder with same name, returns first one found.
+        """
+        if sum(bool(x) for x in [name, path, uuid]) != 1:
+            raise ValueError(
+                "Must pass one of name, path, or uuid but not more than one"
+            )
+
+        if path:
+            return self._folders_by_path.get(tuple(path))
+
+        if name:
+            folders = self._folders_by_name.get(name, [])
+            if top_level:
+                folders = [folder for folder in folders if folder._parent_id is None]
+            return folders[0] if folders else None
+
+        folder = self._folders_by_id.get(uuid_to_id(uuid, UUID_SUFFIX_FOLDER)[1])
+        if folder is not None and top_level and folder._parent_id is not None:
+            return None
+        return folder
+
+    def album(
+        self,
+        name: str = None,
+        path: list[str] = None,
+        uuid: str = None,
+        top_level=False,
+    ) -> TreeAlbum | None:
+        """TreeAlbum by name, path, or uuid
+
+        Args:
+            name: name of album
+            path: path of album as list of strings, e.g. ["My Folder", "My Album"]
+            uuid: id of album
+            top_level: if True, only searches top level albums by name; default is False
+
+        Returns:
+            TreeAlbum object or None if album could not be found
+
+        Raises:
+            ValueError not one of name, path, or uuid is passed
+
+        Notes:
+            Must pass one of path, name, or uuid but not more than one
+            If more than one album with same name, returns first one found.
+        """
+        if sum(bool(x) for x in [name, path, uuid]) != 1:
+            raise ValueError(
+                "Must pass one of name, path, or uuid but not more than one"
+            )
+
+        if path:
+            return self._albums_by_path.get(tuple(path))
+
+        if name:
+            albums = self._albums_by_name.get(name, [])
+            if top_level:
+                albums = [album for album in albums if album._parent_id is None]
+            return albums[0] if albums else None
+
+        album = self._albums_by_id.get(uuid_to_id(uuid, UUID_SUFFIX_ALBUM)[1])
+        if album is not None and top_level and album._parent_id is not None:
+            return None
+        return album
+
+    def __len__(self):
+        return len(self._folders_by_id) + len(self._albums_by_id)
+
+
+class TreeAlbum(Album):
+    """Album whose name, parent, and count are read from a LibraryTree snapshot"""
+
+    def __init__(
+        self, tree: LibraryTree, id_: str, name: str, parent_id: str | None, count: int
+    ):
+        self._tree = tree
+        self._uuid, self.id = uuid_to_id(id_, UUID_SUFFIX_ALBUM)
+        self._name = name
+        self._parent_id = parent_id
+        self._count = count
+
+    @Album.name.getter
+    def name(self):
+        """name of album"""
+        return self._name if self._name != kMissingValue else ""
+
+    @Album.title.getter
+    def title(self):
+        """title of album (alias for Album.name)"""
+        return self.name
+
+    @Album.parent_id.getter
+    def parent_id(self):
+        """parent container id or 0 if album is at the top level"""
+        return self._parent_id if self._parent_id is not None else 0
+
+    @Album.parent.getter
+    def parent(self):
+        """Return parent TreeFolder object"""
+        if self._parent_id is None:
+            return None
+        return self._tree._folders_by_id[self._parent_id]
+
+    def _path_names(self):
+        parent = self.parent
+        return (parent._path_names() if parent is not None else []) + [self.name]
+
+    def path_str(self, delim="/"):
+        """Return internal library path to album as string.
+            e.g. "Folder/SubFolder/AlbumName"
+
+        Raises:
+            ValueError if delim is not a single character
+        """
+        if len(delim) > 1:
+            raise ValueError("delim must be single character")
+        return delim.join(self._path_names())
+
+    def __len__(self):
+        return self._count
+
+
+class TreeFolder(Folder):
+    """Folder whose name, parent, and contents are read from a LibraryTree snapshot"""
+
+    def __init__(self, tree: LibraryTree, id_: str, name: str, parent_id: str | None):
+        self._tree = tree
+        self._path = None
+        self._uuid, self._id = uuid_to_id(id_, UUID_SUFFIX_FOLDER)
+        self._name = name
+        self._parent_id = parent_id
+        parent = self.parent
+        self._idstring = f'folder id("{self._id}")' + (
+            f" of {parent.idstring}" if parent is not None else ""
+        )
+
+    @Folder.name.getter
+    def name(self):
+        """name of folder"""
+        return self._name if self._name != kMissingValue else ""
+
+    @Folder.title.getter
+    def title(self):
+        """title of folder (alias for Folder.name)"""
+        return self.name
+
+    @Folder.parent_id.getter
+    def parent_id(self):
+        """parent container id string or None if folder is at the top level"""
+        parent = self.parent
+        return parent.idstring if parent is not None else None
+
+    @Folder.parent.getter
+    def parent(self):
+        """Return parent TreeFolder object"""
+        if self._parent_id is None:
+            return None
+        return self._tree._folders_by_id[self._parent_id]
+
+    def _path_names(self):
+        return [folder.name for folder in self.path()] + [self.name]
+
+    def path_str(self, delim="/"):
+        """Return internal library path to folder as string.
+            e.g. "Folder/SubFolder"
+
+        Raises:
+            ValueError if delim is not a single character
+        """
+        if len(delim) > 1:
+            raise ValueError("delim must be single character")
+        return delim.join(self._path_names())
+
+    def path(self):
+        """Return list of TreeFolder objects this folder is contained in.
+        path()[0] is the top-level folder this folder is contained in and
+        path()[-1] is the immediate parent of this folder.  Returns empty
+        list if folder is not contained in another folders.
+        """
+        folders = []
+        parent = self.parent
+        while parent is not None:
+            folders.insert(0, parent)
+            parent = parent.parent
+        return folders
+
+    @Folder.albums.getter
+    def albums(self):
+        """list of TreeAlbum objects for albums contained in folder"""
+        return list(self._tree._albums_in.get(self._id, []))
+
+    def album(self, name):
+        """Return TreeAlbum object contained in this folder for album named name
+        or None if no matching album
+        """
+        return next((album for album in self.albums if album.name == name), None)
+
+    @Folder.subfolders.getter
+    def subfolders(self):
+        """list of TreeFolder objects for immediate sub-folders contained in folder"""
+        return list(self._tree._children.get(self._id, []))
+
+    def folder(self, name):
+        """TreeFolder object for first subfolder named name or None if not found"""
+        return next((folder for folder in self.subfolders if folder.name == name), None)
+
+    def __len__(self):
+        return len(self.albums) + len(self.subfolders)
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import fnmatch
 import os
+import pathlib
 import platform
 import re
 import subprocess
@@ -62,3 +63,46 @@ def get_os_version() -> tuple[int, int, int]:
             )
         )
     return int(ver), int(major), int(minor)
+
+
+def user_cache_dir() -> pathlib.Path:
+    """Return path to the photoscript cache directory, creating it if needed.
+
+    Uses $PHOTOSCRIPT_CACHE_DIR if set, otherwise ~/Library/Caches/photoscript on macOS
+    and $XDG_CACHE_HOME/photoscript (default ~/.cache/photoscript) elsewhere.
+    """
+    if "PHOTOSCRIPT_CACHE_DIR" in os.environ:
+        cache_dir = pathlib.Path(os.environ["PHOTOSCRIPT_CACHE_DIR"])
+    elif platform.system() == "Darwin":
+        cache_dir = pathlib.Path("~/Library/Caches/photoscript")
+    else:
+        cache_dir = pathlib.Path(os.environ.get("XDG_CACHE_HOME", "~/.cache"))
+        cache_dir = cache_dir / "photoscript"
+    cache_dir = cache_dir.expanduser()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def photos_library_path() -> pathlib.Path | None:
+    """Return path to the library open in Photos or None if it can't be determined, e.g. if
+    Photos isn't running
+
+    Photos' AppleScript interface doesn't expose the library so it is found from the
+    library database Photos has open, as listed by lsof.
+    """
+    try:
+        result = subprocess.run(
+            ["lsof", "-c", "/^Photos$/", "-Fn"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            timeout=30,
+            check=False,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    for line in result.stdout.splitlines():
+        # file names are output as "n<path>"
+        if line.startswith("n") and line.endswith("/database/Photos.sqlite"):
+            return pathlib.Path(line[1:]).parent.parent
+    return None
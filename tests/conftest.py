@@ -1,17 +1,38 @@
 import os
 import pathlib
 import shutil
+import sys
 
 import pytest
-from applescript import AppleScript
 
 import photoscript
 from photoscript.utils import ditto, get_os_version
 
+# test modules that don't use Photos; these also run on platforms other than macOS
+NO_PHOTOS_TESTS = [
+    "test_9_photosdb.py",
+    "test_11_filetransfer.py",
+    "test_12_export.py",
+    "test_13_metrics.py",
+    "test_14_transport.py",
+    "test_15_simulator.py",
+    "test_16_script_cache.py",
+    "test_17_script_modules.py",
+    "test_18_recovery.py",
+    "test_19_run_script.py",
+]
+
 # Tests can currently run only on macOS Catalina (tested on 10.15.7) or Ventura (tested on 13.0.1)
 # as those are the two test machines I have access to
-OS_VER = get_os_version()
-if OS_VER[0] == 10 and OS_VER[1] == 15:
+OS_VER = get_os_version() if sys.platform == "darwin" else None
+if OS_VER is None:
+    TEST_LIBRARY = None
+    collect_ignore = [
+        path.name
+        for path in pathlib.Path(__file__).parent.glob("test_*.py")
+        if path.name not in NO_PHOTOS_TESTS
+    ]
+elif OS_VER[0] == 10 and OS_VER[1] == 15:
     # catalina
     from tests.photoscript_config_catalina import TEST_LIBRARY
 elif OS_VER[0] == 13:
@@ -30,6 +51,7 @@ else:
 
 def copy_photos_library(photos_library=TEST_LIBRARY, delay=0, open=True):
     """copy the test library and open Photos, returns path to copied library"""
+    from applescript import AppleScript
 
     # quit Photos if it's running
     photoslib = photoscript.PhotosLibrary()
@@ -70,7 +92,9 @@ def copy_photos_library(photos_library=TEST_LIBRARY, delay=0, open=True):
 
 
 @pytest.fixture(scope="module", autouse=True)
-def setup_photos():
+def setup_photos(request):
+    if pathlib.Path(request.module.__file__).name in NO_PHOTOS_TESTS:
+        return
     copy_photos_library(delay=10)
 
 
@@ -1,5 +1,7 @@
 """Test configuration data for the test suite; returns data specific to the macOS version under test."""
 
+import sys
+
 import pytest
 
 from photoscript.utils import get_os_version
@@ -7,7 +9,8 @@ from photoscript.utils import get_os_version
 # These imports could be handled in a less verbose way using importlib but
 # I want to be able to see values of the constants in the editor
 # so importing them explicitly is easier makes this easier
-OS_VER = get_os_version()
+# tests that read the fixture library without Photos use the Sequoia library off macOS
+OS_VER = get_os_version() if sys.platform == "darwin" else (15, 0, 0)
 if OS_VER[0] == 10 and OS_VER[1] == 15:
     from tests.photoscript_config_catalina import (
         ALBUM_1_NAME,
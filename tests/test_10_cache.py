@@ -0,0 +1,184 @@
+"""Test cache.py"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+import photoscript
+import photoscript.cache
+from photoscript.simulator import simulate
+from tests.conftest import photoslib
+from tests.photoscript_config_data import ALBUM_1_NAME, PHOTOS_DICT
+
+
+@pytest.fixture
+def metadata_cache(tmp_path):
+    cache = photoscript.enable_cache(tmp_path / "metadata_cache.db")
+    yield cache
+    photoscript.disable_cache()
+
+
+@pytest.fixture
+def script_calls(monkeypatch):
+    """Record the names of handlers called through photoscript.run_script"""
+    calls = []
+    run_script = photoscript.run_script
+
+    def counting_run_script(name, *args):
+        calls.append(name)
+        return run_script(name, *args)
+
+    monkeypatch.setattr(photoscript, "run_script", counting_run_script)
+    return calls
+
+
+def test_cache_photo(
+    photoslib: photoscript.PhotosLibrary, metadata_cache, script_calls
+):
+    for photo in PHOTOS_DICT:
+        photo_obj = photoscript.Photo(photo["uuid"])
+        assert photo_obj.name == photo["title"]
+        assert photo_obj.description == photo["description"]
+        assert sorted(photo_obj.keywords) == sorted(photo["keywords"])
+
+    script_calls.clear()
+    for photo in PHOTOS_DICT:
+        photo_obj = photoscript.Photo(photo["uuid"], validate=False)
+        assert photo_obj.name == photo["title"]
+        assert photo_obj.description == photo["description"]
+        assert sorted(photo_obj.keywords) == sorted(photo["keywords"])
+    assert script_calls == []
+
+
+def test_cache_persistent(photoslib: photoscript.PhotosLibrary, tmp_path, script_calls):
+    photo = PHOTOS_DICT[0]
+    photoscript.enable_cache(tmp_path / "metadata_cache.db")
+    assert photoscript.Photo(photo["uuid"], validate=False).name == photo["title"]
+    photoscript.disable_cache()
+
+    cache = photoscript.enable_cache(tmp_path / "metadata_cache.db")
+    script_calls.clear()
+    assert photoscript.Photo(photo["uuid"], validate=False).name == photo["title"]
+    assert script_calls == []
+    assert len(cache) == 1
+    photoscript.disable_cache()
+
+
+def test_cache_setter_invalidates(photoslib: photoscript.PhotosLibrary, metadata_cache):
+    photo = photoscript.Photo(PHOTOS_DICT[0]["uuid"])
+    assert photo.name == PHOTOS_DICT[0]["title"]
+    photo.name = "New Title"
+    assert photo.name == "New Title"
+
+    album = photoslib.album(ALBUM_1_NAME)
+    assert album.name == ALBUM_1_NAME
+    album.title = "New Album Name"
+    assert album.name == "New Album Name"
+
+
+def test_cache_library_change(photoslib: photoscript.PhotosLibrary, metadata_cache):
+    photo = photoscript.Photo(PHOTOS_DICT[0]["uuid"])
+    assert photo.name == PHOTOS_DICT[0]["title"]
+    assert len(metadata_cache) == 1
+
+    # simulate a change to the library made outside photoscript
+    metadata_cache.check_interval = 0
+    metadata_cache._conn.execute(
+        "UPDATE about SET value = 'CHANGED' WHERE key = 'library_token'"
+    )
+    assert photo.name == PHOTOS_DICT[0]["title"]
+    assert len(metadata_cache) == 1
+    last_id = photoscript.run_script("photosLibraryGetPhotoByNumber", len(photoslib))
+    assert (
+        metadata_cache._conn.execute(
+            "SELECT value FROM about WHERE key = 'library_token'"
+        ).fetchone()[0]
+        == f"{len(photoslib)}:{last_id}"
+    )
+
+
+def test_cache_disabled(photoslib: photoscript.PhotosLibrary, script_calls):
+    assert photoscript.cache._cache is None
+    photo = photoscript.Photo(PHOTOS_DICT[0]["uuid"], validate=False)
+    assert photo.name == photo.name
+    assert script_calls == ["photoName", "photoName"]
+
+
+def test_cache_json(tmp_path):
+    with simulate(photo_count=3):
+        cache = photoscript.cache.MetadataCache(tmp_path / "metadata_cache.db")
+        assert cache.get("ID", "Photo.keywords") is photoscript.cache.MISSING
+        values = {
+            "Photo.keywords": ["a", "b"],
+            "Photo.location": (51.5, None),
+            "Photo.date": datetime.datetime(2020, 1, 1, 12, 0, 0),
+            "Photo.altitude": None,
+            "Photo.favorite": True,
+        }
+        for field, value in values.items():
+            cache.set("ID", field, value)
+        for field, value in values.items():
+            assert cache.get("ID", field) == value
+            assert type(cache.get("ID", field)) is type(value)
+        assert (
+            cache._conn.execute(
+                "SELECT value FROM metadata WHERE field = 'Photo.location'"
+            ).fetchone()[0]
+            == '{"$tuple": [51.5, null]}'
+        )
+
+        # values that can't be stored as JSON aren't cached
+        cache.set("ID", "Photo.name", object())
+        assert cache.get("ID", "Photo.name") is photoscript.cache.MISSING
+        cache.close()
+
+
+def test_cache_pickled_values_cleared(tmp_path):
+    cache_path = tmp_path / "metadata_cache.db"
+    conn = sqlite3.connect(cache_path)
+    conn.execute(
+        "CREATE TABLE metadata (id TEXT, field TEXT, value BLOB, PRIMARY KEY (id, field))"
+    )
+    conn.execute(
+        "INSERT INTO metadata VALUES (?, ?, ?)", ("ID", "Photo.name", pickle.dumps("x"))
+    )
+    conn.commit()
+    conn.close()
+
+    cache = photoscript.cache.MetadataCache(cache_path)
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_cache_library_token(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(photoscript.cache, "photos_library_path", lambda: None)
+    with simulate(photo_count=3) as simulator:
+        cache = photoscript.cache.MetadataCache(tmp_path / "metadata_cache.db")
+        token = cache._library_token()
+        assert token == f"3:{simulator.photo_id(2)}"
+        photoscript.PhotosLibrary().import_photos(["/tmp/IMG_NEW.jpeg"])
+        assert cache._library_token() == f"4:{simulator.photo_id(3)}"
+        cache.close()
+    # the library couldn't be found so changes made in Photos aren't detected
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == "WARNING"
+
+
+def test_cache_library_token_open_library(tmp_path, monkeypatch, caplog):
+    library_path = tmp_path / "Test.photoslibrary"
+    db_path = library_path / "database" / "Photos.sqlite"
+    db_path.parent.mkdir(parents=True)
+    db_path.touch()
+    monkeypatch.setattr(photoscript.cache, "photos_library_path", lambda: library_path)
+    with simulate(photo_count=3):
+        cache = photoscript.cache.MetadataCache(tmp_path / "metadata_cache.db")
+        token = cache._library_token()
+        assert str(library_path) in token
+        # editing in Photos changes the library's database
+        os.utime(db_path, ns=(0, 0))
+        assert cache._library_token() != token
+        cache.close()
+    assert not caplog.records
@@ -0,0 +1,76 @@
+"""Test filetransfer.py"""
+
+import errno
+import os
+import pathlib
+
+import pytest
+
+import photoscript.filetransfer
+from photoscript.filetransfer import (
+    FILE_TRANSFERS,
+    copy_file,
+    get_file_transfer,
+    move_file,
+)
+
+TEST_IMAGE = pathlib.Path(os.getcwd()) / "tests/test_images/IMG_2608.JPG"
+
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path / "src" / TEST_IMAGE.name
+    src.parent.mkdir()
+    src.write_bytes(TEST_IMAGE.read_bytes())
+    return src
+
+
+def test_copy_file(src, tmp_path):
+    dest = tmp_path / "dest.jpg"
+    copy_file(str(src), str(dest))
+    assert src.is_file()
+    assert dest.read_bytes() == TEST_IMAGE.read_bytes()
+    assert int(dest.stat().st_mtime) == int(src.stat().st_mtime)
+
+
+def test_copy_file_replaces_dest(src, tmp_path):
+    dest = tmp_path / "dest.jpg"
+    dest.write_bytes(b"x" * (TEST_IMAGE.stat().st_size * 2))
+    copy_file(str(src), str(dest))
+    assert dest.read_bytes() == TEST_IMAGE.read_bytes()
+
+
+def test_copy_file_no_clone(src, tmp_path, monkeypatch):
+    """Copy works when the filesystem doesn't support clones"""
+    monkeypatch.setattr(photoscript.filetransfer, "_clonefile", None)
+    dest = tmp_path / "dest.jpg"
+    copy_file(str(src), str(dest))
+    assert dest.read_bytes() == TEST_IMAGE.read_bytes()
+
+
+def test_move_file(src, tmp_path):
+    dest = tmp_path / "dest.jpg"
+    move_file(str(src), str(dest))
+    assert not src.exists()
+    assert dest.read_bytes() == TEST_IMAGE.read_bytes()
+
+
+def test_move_file_cross_device(src, tmp_path, monkeypatch):
+    """Move falls back to copy and delete if src and dest are on different filesystems"""
+
+    def replace(src, dest):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(photoscript.filetransfer.os, "replace", replace)
+    dest = tmp_path / "dest.jpg"
+    move_file(str(src), str(dest))
+    assert not src.exists()
+    assert dest.read_bytes() == TEST_IMAGE.read_bytes()
+
+
+def test_get_file_transfer():
+    for name, transfer in FILE_TRANSFERS.items():
+        assert get_file_transfer(name) is transfer
+    assert get_file_transfer(print) is print
+    with pytest.raises(ValueError):
+        get_file_transfer("BAD_TRANSFER")
@@ -0,0 +1,218 @@
+"""Test export.py"""
+
+import os
+import pathlib
+import tempfile
+
+import pytest
+
+from photoscript.exceptions import ExportError
+from photoscript.export import (
+    ExportManifest,
+    ExportPipeline,
+    ExportSession,
+    metadata_fingerprint,
+)
+
+
+@pytest.fixture
+def exported_files(tmp_path):
+    """Files as exported by Photos for a live photo"""
+    src = tmp_path / "src"
+    src.mkdir()
+    files = [src / "IMG_0001.jpeg", src / "IMG_0001.mov"]
+    for path in files:
+        path.write_text(path.name)
+    return [str(path) for path in files]
+
+
+@pytest.fixture
+def dest(tmp_path):
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    return dest
+
+
+def test_export_session_bad_path():
+    with pytest.raises(ValueError):
+        ExportSession("BAD_PATH")
+
+
+def test_export_session_place_files(exported_files, dest):
+    session = ExportSession(dest)
+    placed = session.place_files(exported_files)
+    assert [os.path.basename(path) for path in placed] == [
+        "IMG_0001.jpeg",
+        "IMG_0001.mov",
+    ]
+    assert sorted(os.listdir(dest)) == ["IMG_0001.jpeg", "IMG_0001.mov"]
+    assert not any(os.path.exists(path) for path in exported_files)
+
+
+def test_export_session_collision(exported_files, dest):
+    (dest / "img_0001.JPG").write_text("existing")
+    (dest / "IMG_0001 (1).png").write_text("existing")
+    session = ExportSession(dest, transfer="copy")
+    placed = session.place_files(exported_files)
+    assert [os.path.basename(path) for path in placed] == [
+        "IMG_0001 (2).jpeg",
+        "IMG_0001 (2).mov",
+    ]
+    placed = session.place_files(exported_files)
+    assert [os.path.basename(path) for path in placed] == [
+        "IMG_0001 (3).jpeg",
+        "IMG_0001 (3).mov",
+    ]
+    assert (dest / "img_0001.JPG").read_text() == "existing"
+
+
+def test_export_session_concurrent_writer(exported_files, dest):
+    """Files created after the session scanned dest are not overwritten"""
+    session = ExportSession(dest)
+    (dest / "IMG_0001.mov").write_text("other writer")
+    placed = session.place_files(exported_files)
+    assert [os.path.basename(path) for path in placed] == [
+        "IMG_0001 (1).jpeg",
+        "IMG_0001 (1).mov",
+    ]
+    assert (dest / "IMG_0001.mov").read_text() == "other writer"
+    assert not (dest / "IMG_0001.jpeg").exists()
+
+
+def test_export_session_overwrite(exported_files, dest):
+    (dest / "IMG_0001.jpeg").write_text("existing")
+    session = ExportSession(dest, overwrite=True)
+    placed = session.place_files(exported_files)
+    assert [os.path.basename(path) for path in placed] == [
+        "IMG_0001.jpeg",
+        "IMG_0001.mov",
+    ]
+    assert (dest / "IMG_0001.jpeg").read_text() == "IMG_0001.jpeg"
+
+
+def test_export_session_verify(exported_files, dest):
+    def corrupt(src, dest):
+        with open(dest, "w") as fd:
+            fd.write("corrupt")
+
+    session = ExportSession(dest, transfer=corrupt, verify=True)
+    with pytest.raises(ExportError):
+        session.place_files(exported_files)
+    assert os.listdir(dest) == []
+
+
+def test_export_session_replace(exported_files, dest):
+    (dest / "IMG_0001.jpeg").write_text("other photo")
+    previous = [str(dest / "IMG_0001 (1).jpeg"), str(dest / "IMG_0001 (1).mov")]
+    for path in previous:
+        pathlib.Path(path).write_text("previous export")
+
+    def fail(src, dest):
+        raise OSError("transfer failed")
+
+    # the previous export is kept if the new files can't be put in place
+    with pytest.raises(OSError):
+        ExportSession(dest, transfer=fail).place_files(exported_files, previous)
+    assert sorted(os.listdir(dest)) == [
+        "IMG_0001 (1).jpeg",
+        "IMG_0001 (1).mov",
+        "IMG_0001.jpeg",
+    ]
+    assert (dest / "IMG_0001 (1).mov").read_text() == "previous export"
+
+    placed = ExportSession(dest).place_files(exported_files, previous)
+    assert placed == previous
+    assert (dest / "IMG_0001 (1).jpeg").read_text() == "IMG_0001.jpeg"
+    assert (dest / "IMG_0001.jpeg").read_text() == "other photo"
+    assert len(os.listdir(dest)) == 3
+
+
+def test_export_pipeline_completed(dest):
+    with ExportPipeline(ExportSession(dest), workers=0) as pipeline:
+        pipeline.submit(*_exported_chunk(3))
+        assert pipeline.pop_completed() == ["0", "1", "2"]
+        assert pipeline.pop_completed() == []
+
+
+def _exported_chunk(count, start=0):
+    """Create a temporary directory with count exported files as Photos would;
+    files in different chunks have the same names"""
+    tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_test_")
+    placements = []
+    for i in range(start, start + count):
+        path = os.path.join(tmpdir.name, f"IMG_{i % 3:04d}.jpeg")
+        with open(path, "w") as fd:
+            fd.write(str(i))
+        placements.append((str(i), [path]))
+    return tmpdir, placements
+
+
+@pytest.mark.parametrize("workers", [0, 1, 4])
+def test_export_pipeline(dest, workers):
+    tmpdirs = []
+    with ExportPipeline(ExportSession(dest), workers=workers) as pipeline:
+        for start in range(0, 30, 3):
+            tmpdir, placements = _exported_chunk(3, start)
+            tmpdirs.append(tmpdir.name)
+            pipeline.submit(tmpdir, placements)
+    assert len(pipeline.results) == 30
+    for key, paths in pipeline.results.items():
+        with open(paths[0]) as fd:
+            assert fd.read() == key
+    assert len(os.listdir(dest)) == 30
+    assert not any(os.path.exists(tmpdir) for tmpdir in tmpdirs)
+
+
+def test_export_pipeline_error(dest):
+    def fail(src, dest):
+        raise OSError("transfer failed")
+
+    with pytest.raises(OSError):
+        with ExportPipeline(ExportSession(dest, transfer=fail), workers=2) as pipeline:
+            for start in range(0, 30, 3):
+                pipeline.submit(*_exported_chunk(3, start))
+    assert os.listdir(dest) == []
+
+
+def test_metadata_fingerprint():
+    metadata = {"name": "title", "keywords": ["a", "b"], "favorite": False}
+    assert metadata_fingerprint(metadata) == metadata_fingerprint(
+        dict(reversed(metadata.items()))
+    )
+    assert metadata_fingerprint(metadata) != metadata_fingerprint(
+        {**metadata, "favorite": True}
+    )
+
+
+def test_export_manifest(exported_files, dest):
+    placed = ExportSession(dest).place_files(exported_files)
+    with ExportManifest(dest) as manifest:
+        assert manifest.current_paths("UUID", "edited", "fp") is None
+        manifest.record("UUID", "edited", placed, "fp")
+
+    with ExportManifest(dest) as manifest:
+        assert manifest.current_paths("UUID", "edited", "fp") == placed
+        assert manifest.current_paths("UUID", "original", "fp") is None
+        assert manifest.current_paths("UUID", "edited", "changed") is None
+        assert manifest.exported_paths("UUID", "edited") == placed
+
+        # a photo recorded with no files isn't current
+        manifest.record("EMPTY", "edited", [], "fp")
+        assert manifest.current_paths("EMPTY", "edited", "fp") is None
+
+
+def test_export_manifest_changed_files(exported_files, dest):
+    placed = ExportSession(dest).place_files(exported_files)
+    with ExportManifest(dest) as manifest:
+        manifest.record("UUID", "edited", placed, "fp")
+        with open(placed[0], "a") as fd:
+            fd.write("changed")
+        assert manifest.current_paths("UUID", "edited", "fp") is None
+        os.unlink(placed[1])
+        assert manifest.current_paths("UUID", "edited", "fp") is None
+        assert manifest.exported_paths("UUID", "edited") == placed
+
+
+def test_export_manifest_bad_path():
+    with pytest.raises(ValueError):
+        ExportManifest("BAD_PATH")
@@ -0,0 +1,117 @@
+"""Test metrics.py and run_script instrumentation"""
+
+import pytest
+
+import photoscript
+import photoscript.script_loader
+from photoscript.metrics import LATENCY_BUCKET_FACTOR, HandlerStats, ScriptStats
+
+
+class DummyScript:
+    """Stand-in for SCRIPT_OBJ; BAD_HANDLER fails and TIMEOUT_HANDLER times out once"""
+
+    def __init__(self):
+        self.timed_out = False
+
+    def call(self, name, *args):
+        if name == "BAD_HANDLER":
+            raise RuntimeError("Unknown handler")
+        if name == "TIMEOUT_HANDLER" and not self.timed_out:
+            self.timed_out = True
+            raise RuntimeError("AppleEvent timed out. (-1712)")
+        return name
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    """Enabled ScriptStats used by run_script with a dummy script"""
+    stats = ScriptStats()
+    monkeypatch.setattr(photoscript.script_loader, "STATS", stats)
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", DummyScript())
+    monkeypatch.setattr(photoscript.script_loader, "recover_photos_app", lambda _: None)
+    monkeypatch.setattr(
+        photoscript.script_loader,
+        "RUNSCRIPT_CONFIG",
+        {
+            **photoscript.script_loader.RUNSCRIPT_CONFIG,
+            "retry_enabled": True,
+            "retries": 2,
+            "wait_seconds": 0,
+            "jitter": 0,
+        },
+    )
+    stats.enable()
+    return stats
+
+
+def test_stats():
+    assert isinstance(photoscript.stats(), ScriptStats)
+    assert not photoscript.stats().enabled
+
+
+def test_stats_run_script(stats):
+    for _ in range(3):
+        photoscript.script_loader.run_script("GOOD_HANDLER")
+    with pytest.raises(photoscript.AppleScriptError):
+        photoscript.script_loader.run_script("BAD_HANDLER")
+    photoscript.script_loader.run_script("TIMEOUT_HANDLER")
+
+    snapshot = stats.snapshot()
+    assert list(snapshot) == ["BAD_HANDLER", "GOOD_HANDLER", "TIMEOUT_HANDLER"]
+    assert snapshot["GOOD_HANDLER"]["calls"] == 3
+    assert snapshot["GOOD_HANDLER"]["errors"] == 0
+    assert snapshot["BAD_HANDLER"]["errors"] == 1
+    assert snapshot["TIMEOUT_HANDLER"]["retries"] == 1
+    assert snapshot["GOOD_HANDLER"]["total"] >= snapshot["GOOD_HANDLER"]["p99"] > 0
+
+    assert stats.snapshot(reset=True) == snapshot
+    assert stats.snapshot() == {}
+
+
+def test_stats_disabled(stats):
+    stats.disable()
+    photoscript.script_loader.run_script("GOOD_HANDLER")
+    assert stats.snapshot() == {}
+
+
+def test_stats_hook(stats):
+    calls = []
+
+    def hook(name, seconds, error, retries):
+        calls.append((name, error, retries))
+        raise ValueError("hook errors are logged, not raised")
+
+    stats.enable(hook=hook)
+    photoscript.script_loader.run_script("TIMEOUT_HANDLER")
+    with pytest.raises(photoscript.AppleScriptError):
+        photoscript.script_loader.run_script("BAD_HANDLER")
+    assert calls == [("TIMEOUT_HANDLER", False, 1), ("BAD_HANDLER", True, 0)]
+
+
+def test_handler_stats_percentiles():
+    handler_stats = HandlerStats()
+    for ms in range(1, 101):
+        handler_stats.record(ms / 1000, False, 0)
+    snapshot = handler_stats.snapshot()
+    assert snapshot["calls"] == 100
+    assert snapshot["mean"] == pytest.approx(0.0505)
+    for percent in (50, 95, 99):
+        expected = percent / 1000
+        assert expected <= snapshot[f"p{percent}"] <= expected * LATENCY_BUCKET_FACTOR
+    assert HandlerStats().percentile(50) == 0.0
+
+
+def test_stats_openmetrics():
+    stats = ScriptStats()
+    stats.record("photoName", 0.01, False, 0)
+    stats.record("photoName", 0.02, True, 1)
+    text = stats.openmetrics()
+    assert 'photoscript_handler_calls_total{handler="photoName"} 2' in text
+    assert 'photoscript_handler_errors_total{handler="photoName"} 1' in text
+    assert 'photoscript_handler_retries_total{handler="photoName"} 1' in text
+    assert 'photoscript_handler_latency_seconds_count{handler="photoName"} 2' in text
+    assert (
+        'photoscript_handler_latency_seconds{handler="photoName",quantile="0.5"}'
+        in text
+    )
+    assert text.endswith("# EOF\n")
@@ -0,0 +1,118 @@
+"""Test transport.py"""
+
+import datetime
+import time
+
+import pytest
+
+import photoscript
+import photoscript.script_loader
+from photoscript.script_loader import kMissingValue
+from photoscript.transport import (
+    AEEnum,
+    RecordedScriptError,
+    ReplayError,
+    ReplayTransport,
+    _decode,
+    _encode,
+    record,
+    replay,
+)
+
+RESPONSES = {
+    "photoName": "Photo Title",
+    "photoKeywords": ["foo", "bar"],
+    "photoDate": datetime.datetime(2020, 1, 2, 3, 4, 5),
+    "photoDescription": kMissingValue,
+    "photosLibraryTree": {"folders": [], "albums": [["A/L0/040", "Album", None, 2]]},
+}
+
+
+class DummyScript:
+    """Stand-in for SCRIPT_OBJ with a canned response for each handler"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, name, *args):
+        self.calls += 1
+        time.sleep(0.01)
+        if name == "photoSetName":
+            return None
+        if name not in RESPONSES:
+            raise RuntimeError(f"Unknown handler {name}")
+        return RESPONSES[name]
+
+
+@pytest.fixture
+def script(monkeypatch):
+    script = DummyScript()
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    monkeypatch.setitem(photoscript.script_loader.RUNSCRIPT_CONFIG, "retries", 1)
+    return script
+
+
+@pytest.fixture
+def trace(tmp_path, script):
+    """Record calls to the dummy script and return path to the trace"""
+    path = tmp_path / "trace.jsonl.gz"
+    with record(path):
+        for name in RESPONSES:
+            photoscript.script_loader.run_script(name, "ID/L0/001")
+        photoscript.script_loader.run_script("photoSetName", "ID/L0/001", "Title")
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("BAD_HANDLER", [1, None])
+    assert photoscript.script_loader.SCRIPT_OBJ is script
+    return path
+
+
+def test_replay(trace, script):
+    calls = script.calls
+    with replay(trace) as transport:
+        for name, response in RESPONSES.items():
+            assert photoscript.script_loader.run_script(name, "ID/L0/001") == response
+        with pytest.raises(photoscript.AppleScriptError, match="Unknown handler"):
+            photoscript.script_loader.run_script("BAD_HANDLER", [1, None])
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("photoName", "OTHER_ID/L0/001")
+    assert transport.calls == len(RESPONSES) + 2
+    assert script.calls == calls
+    assert photoscript.script_loader.SCRIPT_OBJ is script
+
+
+def test_replay_transport(trace):
+    transport = ReplayTransport(trace)
+    with pytest.raises(ReplayError):
+        transport.call("photoSetName", "ID/L0/001", "Other Title")
+    with pytest.raises(RecordedScriptError):
+        transport.call("BAD_HANDLER", [1, None])
+    assert transport.call("photoSetName", "ID/L0/001", "Title") is None
+
+
+def test_replay_latency(trace):
+    transport = ReplayTransport(trace)
+    start = time.perf_counter()
+    transport.call("photoName", "ID/L0/001")
+    assert time.perf_counter() - start < 0.01
+
+    transport = ReplayTransport(trace, latency=True)
+    start = time.perf_counter()
+    transport.call("photoName", "ID/L0/001")
+    assert time.perf_counter() - start >= 0.01
+
+
+def test_replay_bad_trace(tmp_path):
+    path = tmp_path / "trace.jsonl.gz"
+    path.write_text("not a trace")
+    with pytest.raises(ValueError):
+        ReplayTransport(path)
+
+
+def test_replay_apple_event_values():
+    assert _decode(_encode(kMissingValue)) is kMissingValue
+    assert _decode({"$AEType": "msng"}) is kMissingValue
+    # e.g. an enumerated value such as "yes " recorded on macOS
+    value = _decode({"$AEEnum": "yes "})
+    assert isinstance(value, AEEnum)
+    assert value.code == b"yes "
+    assert _encode(value) == {"$AEEnum": "yes "}
@@ -0,0 +1,447 @@
+"""Test simulator.py"""
+
+import datetime
+import os
+import threading
+import time
+
+import pytest
+
+import photoscript
+import photoscript.script_loader
+from photoscript.script_loader import JOINED_HANDLER, SESSION_HANDLER, parse_handlers
+from photoscript.simulator import (
+    HANDLERS,
+    PHOTO_DATE,
+    SimulatedPhotos,
+    SimulatedScriptError,
+    simulate,
+)
+
+
+@pytest.fixture
+def simulator():
+    with simulate(photo_count=100) as simulator:
+        yield simulator
+
+
+def test_simulator_implements_handlers():
+    script = (
+        photoscript.script_loader.SCRIPT_PATH / "photoscript.applescript"
+    ).read_text()
+    handlers = {name for name in parse_handlers(script) if not name.startswith("_")}
+    assert handlers <= HANDLERS
+
+
+def test_simulate(simulator):
+    photoslib = photoscript.PhotosLibrary()
+    assert photoslib.version == "10.0"
+    assert photoscript.script_loader.SCRIPT_OBJ is simulator
+    assert len(photoslib) == 100
+    photos = list(photoslib.photos(chunk_size=30))
+    assert [photo.id for photo in photos] == simulator.photo_ids()
+    assert photos[1].date == PHOTO_DATE + datetime.timedelta(minutes=1)
+    assert photos[0].keywords == []
+    assert photos[0].location == (None, None)
+
+
+def test_simulate_restores_script():
+    script = photoscript.script_loader.SCRIPT_OBJ
+    with simulate() as simulator:
+        assert photoscript.script_loader.SCRIPT_OBJ is simulator
+    assert photoscript.script_loader.SCRIPT_OBJ is script
+
+
+def test_simulator_photo(simulator):
+    photo = photoscript.Photo(simulator.photo_id(5))
+    photo.name = "Title"
+    photo.keywords = ["foo", "bar"]
+    photo.favorite = True
+    photo.location = (10.0, None)
+    assert photo.name == "Title"
+    assert photo.keywords == ["foo", "bar"]
+    assert photo.location == (10.0, None)
+    assert [p.id for p in photoscript.PhotosLibrary().photos(search="FOO")] == [
+        photo.id
+    ]
+    assert photoscript.PhotosLibrary().favorites.photos()[0].id == photo.id
+
+    duplicate = photo.duplicate()
+    assert duplicate.name == "Title"
+    assert len(simulator) == 101
+
+    with pytest.raises(ValueError):
+        photoscript.Photo(simulator.photo_id(200))
+
+
+def test_simulator_albums_folders(simulator):
+    photoslib = photoscript.PhotosLibrary()
+    folder = photoslib.make_folders(["Folder", "SubFolder"])
+    assert folder.path_str() == "Folder/SubFolder"
+    assert folder.parent.name == "Folder"
+    album = photoslib.make_album_folders("Album", ["Folder", "SubFolder"])
+    assert album.path_str() == "Folder/SubFolder/Album"
+    assert [a.id for a in folder.albums] == [album.id]
+
+    photos = list(photoslib.photos(range_=[10]))
+    album.add(photos)
+    assert len(album) == 10
+    album.remove(photos[:2])
+    album = photoslib.album("Album", top_level=False)
+    assert [photo.id for photo in album.photos()] == [photo.id for photo in photos[2:]]
+    assert [a.id for a in photos[5].albums] == [album.id]
+
+    tree = photoslib.tree()
+    assert tree.album(path=["Folder", "SubFolder", "Album"]).id == album.id
+
+    photoslib.delete_folder(photoslib.folder("Folder"))
+    assert photoslib.folder_names() == []
+    assert photoslib.album_names() == []
+
+
+def test_simulator_folders_idstrings(simulator):
+    photoslib = photoscript.PhotosLibrary()
+    subfolder = photoslib.make_folders(["Folder", "SubFolder"])
+    photoslib.make_folders(["Other"])
+    calls = simulator.calls
+
+    # one call for the idstrings of all folders; uuid and idstring need no more calls
+    folders = photoslib.folders(top_level=False)
+    assert [folder.idstring for folder in folders] == [
+        simulator._folder_idstring(folder.id) for folder in folders
+    ]
+    assert folders[1].id == subfolder.id
+    assert folders[1].uuid == subfolder.uuid
+    assert simulator.calls == calls + 1
+
+    folder = photoslib.folder_by_path(["Folder", "SubFolder"])
+    assert (folder.id, folder.idstring) == (subfolder.id, subfolder.idstring)
+    assert simulator.calls == calls + 2
+    assert photoslib.folder_by_path(["Folder", "BAD_FOLDER"]) is None
+    assert [folder.name for folder in photoslib.folders()] == ["Folder", "Other"]
+
+
+def test_simulator_folder_child_lookup(simulator):
+    photoslib = photoscript.PhotosLibrary()
+    folder = photoslib.make_folders(["Folder"])
+    subfolder = photoslib.make_folders(["Folder", "SubFolder"])
+    albums = [folder.create_album(f"Album {i}") for i in range(10)]
+    folder = photoslib.folder_by_path(["Folder"])
+    folder.id
+    calls = simulator.calls
+
+    # one call for the library tree, not one per child
+    assert folder.album("Album 9").id == albums[9].id
+    assert simulator.calls == calls + 1
+    assert folder.folder("SubFolder").idstring == subfolder.idstring
+    assert simulator.calls == calls + 2
+    assert folder.album("BAD_ALBUM") is None
+    assert folder.folder("BAD_FOLDER") is None
+
+    tree_folder = photoslib.tree().folder("Folder")
+    calls = simulator.calls
+    assert tree_folder.album("Album 9").id == albums[9].id
+    assert tree_folder.folder("SubFolder").id == subfolder.id
+    assert simulator.calls == calls
+
+
+def test_simulator_album_membership_index(simulator, monkeypatch):
+    monkeypatch.setattr(photoscript, "_album_membership_index", None)
+    photoslib = photoscript.PhotosLibrary()
+    album = photoslib.create_album("Album")
+    photo = list(photoslib.photos(range_=[1]))[0]
+    assert photoslib.album_membership_index() == {}
+
+    # added outside of photoscript so the index doesn't see it until it is refreshed
+    simulator._albums[album.id].add([photo.id])
+    assert photo.albums == []
+    assert photoslib.album_membership_index(refresh=True) == {photo.id: [album.id]}
+
+    # or until the index expires
+    simulator._albums[album.id].photos.clear()
+    simulator._albums[album.id].members.clear()
+    assert [a.id for a in photo.albums] == [album.id]
+    monkeypatch.setattr(
+        photoscript,
+        "_album_membership_built",
+        time.monotonic() - photoscript.ALBUM_INDEX_TTL - 1,
+    )
+    assert photo.albums == []
+    assert photoslib.album_membership_index() == {}
+
+
+def test_simulator_export(simulator, tmp_path):
+    photoslib = photoscript.PhotosLibrary()
+    photos = list(photoslib.photos(range_=[3]))
+    exported = photoslib.export_photos(photos, str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [
+        "IMG_0000001.jpeg",
+        "IMG_0000002.jpeg",
+        "IMG_0000003.jpeg",
+    ]
+    assert len(exported) == 3
+    assert photos[0].export(str(tmp_path), original=True, overwrite=True)
+
+
+def test_simulator_export_duplicate_stems(simulator, tmp_path):
+    photoslib = photoscript.PhotosLibrary()
+    photos = photoslib.import_photos(
+        ["/tmp/a/DUP.jpeg", "/tmp/b/DUP.heic", "/tmp/c/dup.jpeg", "/tmp/d/DUP.jpeg"]
+    ) + list(photoslib.photos(range_=[4]))
+    # photos with the same stem go in different batches, each batch filled in order
+    batches = photoscript._export_batches(
+        [photo.id for photo in photos], [photo.filename for photo in photos], 3
+    )
+    assert [[photo_id for photo_id, _ in batch] for batch in batches] == [
+        [photos[0].id, photos[4].id, photos[5].id],
+        [photos[1].id, photos[6].id, photos[7].id],
+        [photos[2].id],
+        [photos[3].id],
+    ]
+
+    # edited exports are all .jpeg so each DUP gets its own name
+    exported = photoslib.export_photos(photos, str(tmp_path), chunk_size=3)
+    assert simulator.handler_calls["photosLibraryExport"] == 4
+    assert list(exported) == [photo.id for photo in photos]
+    assert sorted(os.listdir(tmp_path)) == [
+        "DUP (1).jpeg",
+        "DUP (3).jpeg",
+        "DUP.jpeg",
+        "IMG_0000001.jpeg",
+        "IMG_0000002.jpeg",
+        "IMG_0000003.jpeg",
+        "IMG_0000004.jpeg",
+        "dup (2).jpeg",
+    ]
+
+
+def test_simulator_batch(simulator):
+    photo_id = simulator.photo_id(0)
+    results = photoscript.run_script_batch(
+        [("photoFilename", [photo_id]), ("photoName", ["BAD_ID"])]
+    )
+    assert results[0] == "IMG_0000001.jpeg"
+    assert isinstance(results[1], photoscript.AppleScriptError)
+    assert simulator.calls == 1
+    assert simulator.handler_calls["photoFilename"] == 1
+
+
+def test_simulator_timeout(simulator, monkeypatch):
+    monkeypatch.setattr(photoscript.script_loader, "recover_photos_app", lambda _: None)
+    monkeypatch.setattr(
+        photoscript.script_loader,
+        "RUNSCRIPT_CONFIG",
+        {
+            **photoscript.script_loader.RUNSCRIPT_CONFIG,
+            "retry_enabled": True,
+            "retries": 2,
+            "wait_seconds": 0,
+            "jitter": 0,
+        },
+    )
+    simulator.inject_timeout(handler="photosLibraryCount")
+    assert photoscript.script_loader.run_script("photosLibraryCount") == 100
+    assert simulator.handler_calls["photosLibraryCount"] == 1
+    assert simulator.calls == 2
+
+    simulator.inject_timeout(count=2)
+    with pytest.raises(photoscript.AppleScriptError, match="timed out"):
+        photoscript.script_loader.run_script("photosLibraryCount")
+
+
+def test_simulator_large_library():
+    simulator = SimulatedPhotos(photo_count=5_000_000, latency=0.001)
+    photo_id = simulator.photo_id(4_999_999)
+    assert simulator.call("photoExists", photo_id)
+    assert simulator.call("photosLibraryGetPhotoByRange", 4_999_999, 5_000_000) == [
+        simulator.photo_id(4_999_998),
+        photo_id,
+    ]
+    assert simulator.call("photoSetName", photo_id, "Last") == "Last"
+    assert len(simulator._photo_records) == 1
+    with pytest.raises(SimulatedScriptError):
+        simulator.call("photoName", simulator.photo_id(5_000_000))
+
+
+def test_simulator_bulk_strings(simulator, monkeypatch):
+    photoslib = photoscript.PhotosLibrary()
+    album = photoslib.create_album("Album")
+    album.add(list(photoslib.photos(range_=[5])))
+    photo_ids = [photo.id for photo in album.photos()]
+
+    monkeypatch.setitem(
+        photoscript.script_loader.RUNSCRIPT_CONFIG, "bulk_strings", True
+    )
+    assert [photo.id for photo in album.photos()] == photo_ids
+    assert [photo.id for photo in photoslib.photos(range_=[5])] == photo_ids
+    assert [a.id for a in photoslib.albums()] == [album.id]
+    assert list(photoslib.photos(search="BAD_SEARCH")) == []
+    assert simulator.handler_calls[JOINED_HANDLER] == 4
+
+
+def test_simulator_album_move(simulator):
+    photoslib = photoscript.PhotosLibrary()
+    folder = photoslib.make_folders(["Folder"])
+    album = photoslib.create_album("Album")
+    album.add(list(photoslib.photos(range_=[3])))
+    photo_ids = [photo.id for photo in album.photos()]
+
+    album = album.move(folder)
+    assert album.path_str() == "Folder/Album"
+    album = album.move(None)
+    assert album.path_str() == "Album"
+    assert [photo.id for photo in album.photos()] == photo_ids
+    album = album.remove_by_id(photo_ids[:1])
+    assert [photo.id for photo in album.photos()] == photo_ids[1:]
+
+    # like Photos, None is not missing value
+    with pytest.raises(SimulatedScriptError):
+        simulator.call("albumRebuild", album.id, None, None)
+
+
+def test_simulator_export_incremental_failure(simulator, tmp_path, monkeypatch):
+    """Files from the last export are kept if the export fails part way"""
+    photoslib = photoscript.PhotosLibrary()
+    photos = list(photoslib.photos(range_=[4]))
+    exported = photoslib.export_photos(
+        photos, str(tmp_path), incremental=True, chunk_size=2
+    )
+    names = sorted(os.listdir(tmp_path))
+    for photo in photos:
+        photo.name = "Changed"
+
+    run_script = photoscript.PhotosLibrary._run_script
+    exports = []
+
+    def failing_run_script(self, name, *args):
+        if name == "photosLibraryExport":
+            exports.append(args)
+            if len(exports) == 2:
+                raise photoscript.AppleScriptError("export failed")
+        return run_script(self, name, *args)
+
+    monkeypatch.setattr(photoscript.PhotosLibrary, "_run_script", failing_run_script)
+    with pytest.raises(photoscript.AppleScriptError):
+        photoslib.export_photos(photos, str(tmp_path), incremental=True, chunk_size=2)
+    assert sorted(os.listdir(tmp_path)) == names
+
+    # the first chunk was recorded so only the second one is exported again
+    assert (
+        photoslib.export_photos(photos, str(tmp_path), incremental=True, chunk_size=2)
+        == exported
+    )
+    assert len(exports) == 3
+    assert exports[2][0] == [photo.id for photo in photos[2:]]
+    assert sorted(os.listdir(tmp_path)) == names
+
+
+def test_simulator_export_incremental_nothing_exported(
+    simulator, tmp_path, monkeypatch
+):
+    """A photo Photos exports no file for is reported as failed and exported again"""
+    photoslib = photoscript.PhotosLibrary()
+    photos = list(photoslib.photos(range_=[3]))
+    photoslib.export_photos(photos, str(tmp_path), incremental=True, chunk_size=3)
+    names = sorted(os.listdir(tmp_path))
+    for photo in photos:
+        photo.name = "Changed"
+
+    export = simulator._export
+
+    def failing_export(photo_ids, path, original, edited):
+        # photos[1] fails to export
+        photo_ids = [photo_id for photo_id in photo_ids if photo_id != photos[1].id]
+        export(photo_ids, path, original, edited)
+
+    monkeypatch.setattr(simulator, "_export", failing_export)
+    exported = photoslib.export_photos(
+        photos, str(tmp_path), incremental=True, chunk_size=3
+    )
+    assert exported[photos[1].id] == []
+    assert len(exported[photos[0].id]) == len(exported[photos[2].id]) == 1
+    # the last good export of the photo is kept
+    assert sorted(os.listdir(tmp_path)) == names
+    with photoscript.ExportManifest(tmp_path) as manifest:
+        assert manifest.exported_paths(photos[1].uuid, "edited") == [
+            str(tmp_path / "IMG_0000002.jpeg")
+        ]
+
+    monkeypatch.setattr(simulator, "_export", export)
+    exported = photoslib.export_photos(
+        photos, str(tmp_path), incremental=True, chunk_size=3
+    )
+    assert simulator.handler_calls["photosLibraryExport"] == 3
+    assert exported[photos[1].id] == [str(tmp_path / "IMG_0000002.jpeg")]
+    assert sorted(os.listdir(tmp_path)) == names
+
+
+def test_simulator_prefetch_context(simulator, monkeypatch):
+    """Prefetched chunks use the caller's ScriptSession and retry policy"""
+    calls = []
+    call = simulator.call
+
+    def recording_call(name, *args):
+        calls.append((name, args[0]) if name == SESSION_HANDLER else (name,))
+        return call(name, *args)
+
+    policies = []
+    get_retry_policy = photoscript.script_loader.get_retry_policy
+
+    def recording_get_retry_policy(name):
+        policy = get_retry_policy(name)
+        if name == "photosLibraryGetPhotoByRange":
+            policies.append(policy)
+        return policy
+
+    monkeypatch.setattr(simulator, "call", recording_call)
+    monkeypatch.setattr(
+        photoscript.script_loader, "get_retry_policy", recording_get_retry_policy
+    )
+    photoslib = photoscript.PhotosLibrary()
+    policy = photoscript.RetryPolicy(retries=7)
+    with photoslib.session(), photoscript.use_retry_policy(policy):
+        photo_ids = [
+            photo.id for photo in photoslib.photos(chunk_size=30, prefetch=True)
+        ]
+    assert len(photo_ids) == 100
+    assert policies == [policy] * 4
+    assert [entry for entry in calls if "photosLibraryGetPhotoByRange" in entry] == [
+        (SESSION_HANDLER, "photosLibraryGetPhotoByRange")
+    ] * 4
+
+
+def test_simulator_calls_serialized(simulator, monkeypatch):
+    """Calls to the script never overlap, e.g. with the prefetch thread"""
+
+    class OverlapCheckingScript:
+        def __init__(self, script):
+            self.script = script
+            self.active = 0
+            self.max_active = 0
+            self.lock = threading.Lock()
+
+        def call(self, name, *args):
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                time.sleep(0.001)
+                return self.script.call(name, *args)
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+    script = OverlapCheckingScript(simulator)
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    photoslib = photoscript.PhotosLibrary()
+    names = [photo.name for photo in photoslib.photos(chunk_size=10, prefetch=True)]
+    assert len(names) == 100
+    threads = [
+        threading.Thread(target=photoscript.script_loader.run_script, args=(name,))
+        for name in ["photosLibraryCount"] * 8
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert script.max_active == 1
@@ -0,0 +1,165 @@
+"""Test script_cache.py and FolderSnippetScript"""
+
+import pytest
+
+import photoscript.script_loader
+from photoscript.script_cache import CompiledScriptCache, SnippetCache, snippet_source
+from photoscript.script_loader import FolderSnippetScript
+
+
+class StubCompiler:
+    """Stand-in for ScriptCompiler that "compiles" source to a StubScript"""
+
+    def __init__(self):
+        self.compiled = []
+        self.loaded = []
+
+    def compile(self, source):
+        self.compiled.append(source)
+        return StubScript(source)
+
+    def compile_to_file(self, source, path):
+        self.compiled.append(source)
+        path.write_text(source)
+
+    def load(self, path):
+        self.loaded.append(path)
+        source = path.read_text()
+        if source == "CORRUPT":
+            raise ValueError("corrupt script")
+        return StubScript(source)
+
+
+class StubScript:
+    def __init__(self, source):
+        self.source = source
+        self.runs = 0
+
+    def run(self):
+        self.runs += 1
+        if "BAD_FOLDER" in self.source:
+            raise RuntimeError("Can't get folder")
+        return self.source
+
+
+class CountingScript:
+    """Stand-in for the compiled photoscript.applescript"""
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, name, *args):
+        self.calls.append(name)
+        return 42
+
+
+@pytest.fixture
+def compiler():
+    return StubCompiler()
+
+
+def test_compiled_script_cache(tmp_path, compiler):
+    cache = CompiledScriptCache(tmp_path, compiler=compiler, os_version="15.0")
+    script = cache.load("photoscript", "SOURCE")
+    assert script.source == "SOURCE"
+    assert compiler.compiled == ["SOURCE"]
+    assert cache.path("photoscript", "SOURCE").is_file()
+
+    # second load uses the compiled script
+    assert cache.load("photoscript", "SOURCE").source == "SOURCE"
+    assert compiler.compiled == ["SOURCE"]
+    assert len(compiler.loaded) == 2
+
+
+def test_compiled_script_cache_key(tmp_path, compiler):
+    cache = CompiledScriptCache(tmp_path, compiler=compiler, os_version="15.0")
+    other_os = CompiledScriptCache(tmp_path, compiler=compiler, os_version="26.0")
+    assert cache.key("SOURCE") == cache.key("SOURCE")
+    assert cache.key("SOURCE") != cache.key("OTHER SOURCE")
+    assert cache.key("SOURCE") != other_os.key("SOURCE")
+
+
+def test_compiled_script_cache_invalidation(tmp_path, compiler):
+    cache = CompiledScriptCache(tmp_path, compiler=compiler, os_version="15.0")
+    cache.load("photoscript", "SOURCE")
+    cache.load("other", "SOURCE")
+    cache.load("photoscript-core", "SOURCE")
+    cache.load("photoscript", "NEW SOURCE")
+    assert compiler.compiled == ["SOURCE", "SOURCE", "SOURCE", "NEW SOURCE"]
+    # compiled script for the old source is removed, other scripts are kept
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [
+            cache.path("photoscript", "NEW SOURCE").name,
+            cache.path("other", "SOURCE").name,
+            cache.path("photoscript-core", "SOURCE").name,
+        ]
+    )
+
+    # a compiled script that can't be loaded is compiled again
+    cache.path("other", "SOURCE").write_text("CORRUPT")
+    assert cache.load("other", "SOURCE").source == "SOURCE"
+    assert cache.path("other", "SOURCE").read_text() == "SOURCE"
+
+
+def test_compiled_script_cache_not_writable(tmp_path, compiler):
+    def compile_to_file(source, path):
+        raise OSError("read-only file system")
+
+    compiler.compile_to_file = compile_to_file
+    cache = CompiledScriptCache(tmp_path, compiler=compiler, os_version="15.0")
+    assert cache.load("photoscript", "SOURCE").source == "SOURCE"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_snippet_cache(compiler):
+    cache = SnippetCache(maxsize=2, compiler=compiler)
+    folder = 'folder id("A/L0/020")'
+    subfolder = f'folder id("B/L0/020") of {folder}'
+
+    snippet = cache.get(folder, "return name of theFolder")
+    assert snippet.source == snippet_source(folder, "return name of theFolder")
+    assert cache.get(folder, "return name of theFolder") is snippet
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # least recently used snippet is evicted
+    cache.get(subfolder, "return name of theFolder")
+    cache.get(folder, "return name of theFolder")
+    cache.get(folder, "return true")
+    assert len(cache) == 2
+    assert cache.get(folder, "return name of theFolder") is snippet
+    assert len(compiler.compiled) == 3
+
+    cache.get(subfolder, "return name of theFolder")
+    cache.invalidate(folder)
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        SnippetCache(maxsize=0)
+
+
+def test_folder_snippet_script(compiler):
+    script = CountingScript()
+    folder_script = FolderSnippetScript(script, SnippetCache(compiler=compiler))
+    folder = 'folder id("A/L0/020")'
+
+    assert folder_script.call("folderName", folder) == snippet_source(
+        folder, "return name of theFolder"
+    )
+    folder_script.call("folderName", folder)
+    assert len(compiler.compiled) == 1
+    assert script.calls == ["photosLibraryWaitForPhotos"] * 2
+
+    # in a session, Photos isn't waited for
+    folder_script.call(
+        photoscript.script_loader.SESSION_HANDLER, "folderUUID", [folder]
+    )
+    assert script.calls == ["photosLibraryWaitForPhotos"] * 2
+
+    assert not folder_script.call("folderExists", 'folder id("BAD_FOLDER")')
+    with pytest.raises(RuntimeError):
+        folder_script.call("folderName", 'folder id("BAD_FOLDER")')
+
+    # other handlers are called on the script
+    assert folder_script.call("photosLibraryDeleteFolder", folder) == 42
+    assert script.calls[-1] == "photosLibraryDeleteFolder"
+    assert len(folder_script.snippets) == 2
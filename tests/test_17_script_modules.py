@@ -0,0 +1,129 @@
+"""Test ScriptModules"""
+
+import pytest
+
+from photoscript.script_loader import (
+    BATCH_HANDLER,
+    JOINED_HANDLER,
+    SESSION_HANDLER,
+    RunScriptError,
+    ScriptModules,
+    parse_handlers,
+    split_handlers,
+)
+
+
+class ModuleScript:
+    """Stand-in for a compiled module that records calls and returns the handler name"""
+
+    def __init__(self, module, source):
+        self.module = module
+        self.handlers = parse_handlers(source)
+        self.calls = []
+
+    def call(self, name, *args):
+        self.calls.append((name, args))
+        if name == BATCH_HANDLER:
+            return [[True, call[0]] for call in args[0]]
+        if name == SESSION_HANDLER and args[0] == BATCH_HANDLER:
+            return [[True, call[0]] for call in args[1][0]]
+        return name
+
+
+@pytest.fixture
+def modules():
+    scripts = {}
+
+    def loader(module, source):
+        scripts[module] = ModuleScript(module, source)
+        return scripts[module]
+
+    modules = ScriptModules("photoscript", loader=loader)
+    modules.scripts = scripts
+    return modules
+
+
+def test_split_handlers():
+    header, handlers = split_handlers(
+        "property FOO : 1\n\n(* comment *)\non a(x)\n\treturn b(x)\nend a\n\n"
+        'on b(x)\n\t"end b"\n\treturn x\nend b\n'
+    )
+    assert header == "property FOO : 1\n\n\n"
+    assert list(handlers) == ["a", "b"]
+    assert handlers["b"] == 'on b(x)\n\t"end b"\n\treturn x\nend b'
+
+
+def test_registry(modules):
+    assert modules.registry["photosLibraryWaitForPhotos"] == "core"
+    assert modules.registry["photosLibraryExport"] == "export"
+    assert modules.registry["photoExport"] == "export"
+    assert modules.registry["albumName"] == "album"
+    assert modules.registry["folderParent"] == "folder"
+    assert modules.registry["_folderRunScript"] == "folder"
+    assert modules.registry["photoName"] == "photo"
+    assert set(modules.registry.values()) == {
+        "core",
+        "export",
+        "album",
+        "folder",
+        "photo",
+    }
+
+
+def test_module_source(modules):
+    handlers = parse_handlers(modules.module_source("album"))
+    assert "albumName" in handlers
+    assert "photosLibraryWaitForPhotos" in handlers
+    assert "_folderRunScript" in handlers
+    assert "photoName" not in handlers
+    assert "photosLibraryExport" not in handlers
+    with pytest.raises(ValueError):
+        modules.module_source("BAD_MODULE")
+
+
+def test_modules_loaded_lazily(modules):
+    assert modules.loaded == []
+    assert modules.call("photoName", "ID") == "photoName"
+    assert modules.call("photoKeywords", "ID") == "photoKeywords"
+    assert modules.loaded == ["photo"]
+    assert modules.scripts["photo"].calls == [
+        ("photoName", ("ID",)),
+        ("photoKeywords", ("ID",)),
+    ]
+    with pytest.raises(RunScriptError):
+        modules.call("BAD_HANDLER")
+
+
+def test_modules_batch(modules):
+    calls = [
+        ["photoName", ["ID"]],
+        ["albumName", ["ID"]],
+        ["BAD_HANDLER", []],
+        ["photoFilename", ["ID"]],
+    ]
+    results = modules.call(BATCH_HANDLER, calls)
+    assert results[:2] == [[True, "photoName"], [True, "albumName"]]
+    assert results[2] == [False, "Unknown handler BAD_HANDLER", -1708]
+    assert results[3] == [True, "photoFilename"]
+    assert modules.loaded == ["photo", "album"]
+    assert modules.scripts["photo"].calls == [(BATCH_HANDLER, ([calls[0], calls[3]],))]
+
+
+def test_modules_session(modules):
+    assert modules.call(SESSION_HANDLER, "albumName", ["ID"]) == SESSION_HANDLER
+    assert modules.scripts["album"].calls == [(SESSION_HANDLER, ("albumName", ["ID"]))]
+    calls = [["folderName", ["ID"]], ["photoName", ["ID"]]]
+    results = modules.call(SESSION_HANDLER, BATCH_HANDLER, [calls])
+    assert results == [[True, "folderName"], [True, "photoName"]]
+    assert modules.scripts["folder"].calls == [
+        (SESSION_HANDLER, (BATCH_HANDLER, [[calls[0]]]))
+    ]
+
+
+def test_modules_joined(modules):
+    assert modules.call(JOINED_HANDLER, "albumPhotes", ["ID"]) == JOINED_HANDLER
+    assert modules.loaded == ["album"]
+    source = modules.module_source("album")
+    assert 'theName is "albumPhotes"' in source[source.index(f"on {JOINED_HANDLER}(") :]
+    modules.call(SESSION_HANDLER, JOINED_HANDLER, ["photosLibraryAlbumIDs", [True]])
+    assert modules.loaded == ["album", "core"]
@@ -0,0 +1,178 @@
+"""Test recovery.py"""
+
+import pytest
+
+import photoscript
+import photoscript.script_loader
+from photoscript.recovery import (
+    BackoffStep,
+    KillStep,
+    ProbeStep,
+    QuitStep,
+    RecoveryChain,
+)
+
+
+class FakeController:
+    """Stand-in for ProcessController that records what it was asked to do"""
+
+    def __init__(self, running=True):
+        self.running = running
+        self.actions = []
+
+    def is_running(self):
+        self.actions.append("is_running")
+        return self.running
+
+    def quit(self, timeout):
+        self.actions.append("quit")
+        return True
+
+    def kill(self):
+        self.actions.append("kill")
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def chain(clock):
+    return RecoveryChain(controller=FakeController(), clock=clock, sleep=clock.sleep)
+
+
+def test_recovery_escalates(chain, clock):
+    events = []
+    chain.hooks.append(lambda *event: events.append(event))
+    assert [chain.recover() for _ in range(5)] == [
+        "probe",
+        "backoff",
+        "quit",
+        "kill",
+        # killed less than min_interval ago so quit instead
+        "quit",
+    ]
+    assert chain.controller.actions == ["is_running", "quit", "kill", "quit"]
+    assert clock.sleeps == [5]
+    assert events[0] == ("probe", 1, True)
+    assert events[-1] == ("quit", 5, True)
+
+    clock.now += 300
+    assert chain.recover() == "kill"
+
+
+def test_recovery_reset(chain, clock):
+    assert chain.recover() == "probe"
+    assert chain.recover() == "backoff"
+    clock.now += 301
+    assert chain.recover() == "probe"
+    assert chain.timeouts == 1
+
+    # Photos isn't running so nothing is hung
+    chain.reset()
+    chain.controller.running = False
+    assert chain.recover() == "probe"
+    assert chain.recover() == "probe"
+    assert chain.controller.actions.count("is_running") == 4
+    assert chain.timeouts == 0
+
+
+def test_recovery_chain():
+    assert photoscript.recovery_chain() is photoscript.script_loader.RECOVERY
+    assert [step.name for step in photoscript.recovery_chain().steps] == [
+        "probe",
+        "backoff",
+        "quit",
+        "kill",
+    ]
+
+
+def test_recovery_custom_steps(clock):
+    controller = FakeController()
+    chain = RecoveryChain(
+        [ProbeStep(), KillStep(min_timeouts=2, min_interval=60)],
+        controller=controller,
+        clock=clock,
+    )
+    assert [chain.recover() for _ in range(3)] == ["probe", "kill", "probe"]
+    assert controller.actions == ["is_running", "kill", "is_running"]
+    assert (
+        RecoveryChain([QuitStep(min_timeouts=2)], controller=controller).recover()
+        is None
+    )
+    with pytest.raises(ValueError):
+        BackoffStep(min_timeouts=0)
+
+
+def test_run_script_recovers(chain, monkeypatch):
+    class TimingOutScript:
+        def __init__(self):
+            self.calls = 0
+
+        def call(self, name, *args):
+            self.calls += 1
+            if self.calls <= 2:
+                raise RuntimeError("Photos got an error: AppleEvent timed out.")
+            return "ok"
+
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", TimingOutScript())
+    monkeypatch.setattr(photoscript.script_loader, "RECOVERY", chain)
+    policy = photoscript.RetryPolicy(retries=3, wait_seconds=0, jitter=0)
+    with photoscript.use_retry_policy(policy):
+        assert photoscript.script_loader.run_script("photosLibraryCount") == "ok"
+    assert chain.controller.actions == ["is_running"]
+    # the call succeeded so the next timeout starts from the probe again
+    assert chain.timeouts == 0
+
+
+def test_run_script_success_resets_recovery(chain, monkeypatch):
+    class FlakyScript:
+        def __init__(self):
+            self.calls = 0
+
+        def call(self, name, *args):
+            self.calls += 1
+            if self.calls % 2:
+                raise RuntimeError("Photos got an error: AppleEvent timed out.")
+            return "ok"
+
+    events = []
+    chain.hooks.append(lambda *event: events.append(event))
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", FlakyScript())
+    monkeypatch.setattr(photoscript.script_loader, "RECOVERY", chain)
+    policy = photoscript.RetryPolicy(retries=2, wait_seconds=0, jitter=0)
+    with photoscript.use_retry_policy(policy):
+        for _ in range(5):
+            assert photoscript.script_loader.run_script("photosLibraryCount") == "ok"
+    # each timeout was followed by a successful call so recovery never escalated
+    assert events == [("probe", 1, True)] * 5
+    assert chain.controller.actions == ["is_running"] * 5
+
+
+def test_recovery_sleeps_outside_lock(clock):
+    locked = []
+
+    def sleep(seconds):
+        locked.append(chain._lock.locked())
+        clock.sleep(seconds)
+
+    chain = RecoveryChain(controller=FakeController(), clock=clock, sleep=sleep)
+    assert chain.recover() == "probe"
+    assert chain.recover() == "backoff"
+    assert clock.sleeps == [5]
+    assert locked == [False]
@@ -0,0 +1,282 @@
+"""Test run_script, batches, sessions, and retries with stand-ins for the compiled script"""
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import photoscript
+from photoscript.script_loader import (
+    BATCH_HANDLER,
+    JOINED_HANDLER,
+    LIST_SEPARATOR,
+    SESSION_HANDLER,
+    RetryPolicy,
+    generate_joined_dispatcher,
+    get_retry_policy,
+    set_handler_retry_policy,
+    split_joined_list,
+    use_retry_policy,
+)
+
+
+class CountingScript:
+    """Stand-in for SCRIPT_OBJ that records the handlers called"""
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, name, *args):
+        self.calls.append(args[0] if name == SESSION_HANDLER else name)
+        if args and args[0] == "BAD_HANDLER":
+            raise RuntimeError("Unknown handler")
+        return 42
+
+
+class DispatchingScript:
+    """Stand-in for SCRIPT_OBJ that runs the batch, session and joined dispatchers"""
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, name, *args):
+        self.calls.append(name)
+        if name == SESSION_HANDLER:
+            name, args = args[0], args[1]
+        if name == BATCH_HANDLER:
+            return [
+                (
+                    [False, "Unknown handler", -1708]
+                    if handler == "BAD_HANDLER"
+                    else [True, self._handler(handler, handler_args)]
+                )
+                for handler, handler_args in args[0]
+            ]
+        if name == JOINED_HANDLER:
+            return LIST_SEPARATOR.join(self._handler(args[0], args[1]))
+        return self._handler(name, args)
+
+    def _handler(self, name, args):
+        if name == "BAD_HANDLER":
+            raise RuntimeError("Unknown handler")
+        if name == "photosLibraryAlbumIDs":
+            return ["A/L0/040", "B/L0/040"]
+        return 42
+
+
+@pytest.fixture
+def script(monkeypatch):
+    script = DispatchingScript()
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    monkeypatch.setitem(
+        photoscript.script_loader.RUNSCRIPT_CONFIG, "retry_enabled", False
+    )
+    return script
+
+
+def test_run_script_batch_dispatch(script):
+    results = photoscript.script_loader.run_script_batch(
+        [("test_applescript", []), ("BAD_HANDLER", []), ("test_applescript", [])]
+    )
+    assert results[0] == 42
+    assert isinstance(results[1], photoscript.AppleScriptError)
+    assert results[2] == 42
+    assert photoscript.script_loader.run_script_batch([]) == []
+    assert script.calls == [BATCH_HANDLER]
+
+
+def test_script_batch_dispatch(script):
+    with photoscript.script_loader.ScriptBatch() as batch:
+        good = batch.call("test_applescript")
+        bad = batch.call("BAD_HANDLER")
+        with pytest.raises(photoscript.script_loader.RunScriptError):
+            good.result()
+    assert good.result() == 42
+    with pytest.raises(photoscript.AppleScriptError):
+        bad.result()
+    assert script.calls == [BATCH_HANDLER]
+
+
+def test_script_session_dispatch(script):
+    with photoscript.script_loader.ScriptSession():
+        assert photoscript.script_loader.run_script("test_applescript") == 42
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("BAD_HANDLER")
+        assert photoscript.script_loader.run_script_batch(
+            [("test_applescript", [])]
+        ) == [42]
+    assert script.calls == [
+        "photosLibraryWaitForPhotos",
+        SESSION_HANDLER,
+        SESSION_HANDLER,
+        "photosLibraryWaitForPhotos",
+        SESSION_HANDLER,
+    ]
+
+
+def test_joined_dispatch(script, monkeypatch):
+    monkeypatch.setitem(
+        photoscript.script_loader.RUNSCRIPT_CONFIG, "bulk_strings", True
+    )
+    assert photoscript.script_loader.run_script("photosLibraryAlbumIDs", True) == [
+        "A/L0/040",
+        "B/L0/040",
+    ]
+    # handlers that don't return a list of ids are called directly
+    assert photoscript.script_loader.run_script("test_applescript") == 42
+    assert script.calls == [JOINED_HANDLER, "test_applescript"]
+
+
+def test_script_session_checks_photos(monkeypatch):
+    script = CountingScript()
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    monkeypatch.setitem(
+        photoscript.script_loader.RUNSCRIPT_CONFIG, "retry_enabled", False
+    )
+    with photoscript.script_loader.ScriptSession() as session:
+        with photoscript.script_loader.ScriptSession():
+            # nested session is the same session
+            assert photoscript.script_loader._session.get() is session
+        for _ in range(3):
+            photoscript.script_loader.run_script("test_applescript")
+        # Photos is checked again after an error
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("BAD_HANDLER")
+        photoscript.script_loader.run_script("test_applescript")
+        # and after the session has been idle
+        session.idle_timeout = 0
+        photoscript.script_loader.run_script("test_applescript")
+    assert photoscript.script_loader._session.get() is None
+    photoscript.script_loader.run_script("test_applescript")
+    assert script.calls == [
+        "photosLibraryWaitForPhotos",
+        "test_applescript",
+        "test_applescript",
+        "test_applescript",
+        "BAD_HANDLER",
+        "photosLibraryWaitForPhotos",
+        "test_applescript",
+        "photosLibraryWaitForPhotos",
+        "test_applescript",
+        "test_applescript",
+    ]
+
+
+def test_script_session_is_per_thread(monkeypatch):
+    script = CountingScript()
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    with photoscript.script_loader.ScriptSession():
+        thread = threading.Thread(
+            target=photoscript.script_loader.run_script, args=("test_applescript",)
+        )
+        thread.start()
+        thread.join()
+        photoscript.script_loader.run_script("test_applescript")
+    # only the call made in the session's thread went through the session
+    assert script.calls == [
+        "test_applescript",
+        "photosLibraryWaitForPhotos",
+        "test_applescript",
+    ]
+
+
+class TimingOutScript:
+    """Stand-in for SCRIPT_OBJ that times out a number of times before succeeding"""
+
+    def __init__(self, timeouts):
+        self.timeouts = timeouts
+        self.calls = 0
+
+    def call(self, name, *args):
+        self.calls += 1
+        if self.calls <= self.timeouts:
+            raise RuntimeError("AppleEvent timed out. (-1712)")
+        return name
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the waits between retries instead of sleeping and don't kill Photos"""
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    monkeypatch.setattr(photoscript.script_loader, "recover_photos_app", lambda _: None)
+    return sleeps
+
+
+def test_retry_policy_backoff(monkeypatch, sleeps):
+    script = TimingOutScript(3)
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    policy = RetryPolicy(retries=4, wait_seconds=1, max_wait_seconds=3, jitter=0)
+    with use_retry_policy(policy):
+        assert photoscript.script_loader.run_script("test_applescript") == (
+            "test_applescript"
+        )
+    assert sleeps == [1, 2, 3]
+
+    script = TimingOutScript(2)
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", script)
+    with use_retry_policy(policy.replace(retries=2)):
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("test_applescript")
+    assert script.calls == 2
+
+    with pytest.raises(AttributeError):
+        policy.retries = 1
+
+
+def test_retry_policy_precedence(monkeypatch):
+    monkeypatch.setattr(photoscript.script_loader, "RUNSCRIPT_CONFIG", {})
+    photoscript.script_loader.configure_run_script(policy=RetryPolicy())
+    global_policy = get_retry_policy("test_applescript")
+    assert global_policy == RetryPolicy()
+    # global policy is only rebuilt when the configuration changes
+    assert get_retry_policy("test_applescript") is global_policy
+    photoscript.script_loader.configure_run_script(retries=3)
+    assert get_retry_policy("test_applescript") == RetryPolicy(retries=3)
+
+    instance_policy = RetryPolicy(retries=4)
+    handler_policy = RetryPolicy(retries=5)
+    set_handler_retry_policy("test_applescript", handler_policy)
+    try:
+        with use_retry_policy(instance_policy):
+            assert get_retry_policy("test_applescript") is handler_policy
+            assert get_retry_policy("other_handler") is instance_policy
+    finally:
+        set_handler_retry_policy("test_applescript", None)
+    assert get_retry_policy("test_applescript") == RetryPolicy(retries=3)
+
+
+def test_import_is_lazy():
+    """Importing photoscript doesn't compile the AppleScript or detect the OS version"""
+    script = (
+        "import photoscript; "
+        "assert photoscript.script_loader.SCRIPT_OBJ is None; "
+        "assert photoscript._macos_version.cache_info().currsize == 0"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_get_script(monkeypatch):
+    calls = []
+    monkeypatch.setattr(photoscript.script_loader, "SCRIPT_OBJ", None)
+    monkeypatch.setattr(
+        photoscript.script_loader,
+        "ScriptModules",
+        lambda name: calls.append(name) or CountingScript(),
+    )
+    script = photoscript.script_loader.get_script()
+    assert isinstance(script, photoscript.script_loader.FolderSnippetScript)
+    assert isinstance(script.script, CountingScript)
+    assert photoscript.script_loader.get_script() is script
+    assert calls == ["photoscript"]
+
+
+def test_joined_dispatcher():
+    source = generate_joined_dispatcher({"albumPhotes": 1, "albumName": 1})
+    assert f"on {JOINED_HANDLER}(theName, theArgs)" in source
+    assert "albumPhotes(item 1 of theArgs)" in source
+    assert "albumName" not in source
+    assert split_joined_list(f"a{LIST_SEPARATOR}b") == ["a", "b"]
+    assert split_joined_list("") == []
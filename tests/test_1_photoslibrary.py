@@ -13,9 +13,16 @@ import photoscript
 from tests.photoscript_config_catalina import PHOTO_EXPORT_FILENAME_ORIGINAL
 from tests.photoscript_config_data import (
     ALBUM_1_NAME,
+    ALBUM_1_PATH_STR,
+    ALBUM_1_PHOTO_EXPORT_FILENAMES,
+    ALBUM_1_PHOTO_UUIDS,
     ALBUM_1_UUID,
     ALBUM_NAMES_ALL,
     ALBUM_NAMES_TOP,
+    FOLDER_1_IDSTRING,
+    FOLDER_1_LEN,
+    FOLDER_1_NAME,
+    FOLDER_1_SUBFOLDERS,
     FOLDER_NAME,
     FOLDER_NAMES_ALL,
     FOLDER_NAMES_TOP,
@@ -29,6 +36,7 @@ from tests.photoscript_config_data import (
     PHOTO_EXPORT_UUID,
     PHOTO_FAVORITES_SET_UUID,
     PHOTO_FAVORITES_UNSET_UUID,
+    PHOTOS_DICT,
     PHOTOS_FAVORITES,
     PHOTOS_FAVORITES_SET,
     PHOTOS_FILENAMES,
@@ -163,6 +171,101 @@ def test_photoslibrary_photos_no_args(photoslib: photoscript.PhotosLibrary):
     assert sorted(filenames) == sorted(PHOTOS_FILENAMES)
 
 
+def test_photoslibrary_photos_chunked(photoslib: photoscript.PhotosLibrary):
+    photos = photoslib.photos(chunk_size=2)
+    filenames = [photo.filename for photo in photos]
+    assert sorted(filenames) == sorted(PHOTOS_FILENAMES)
+
+
+def test_photoslibrary_photos_prefetch(photoslib: photoscript.PhotosLibrary):
+    photos = photoslib.photos(chunk_size=2, prefetch=True)
+    filenames = [photo.filename for photo in photos]
+    assert sorted(filenames) == sorted(PHOTOS_FILENAMES)
+
+
+def test_photoslibrary_photos_chunk_size_exception(
+    photoslib: photoscript.PhotosLibrary,
+):
+    with pytest.raises(ValueError):
+        photoslib.photos(chunk_size=0)
+
+
+def test_photoslibrary_fetch_metadata(photoslib: photoscript.PhotosLibrary):
+    uuids = [photo["uuid"] for photo in PHOTOS_DICT]
+    fields = ["name", "description", "keywords", "favorite", "filename", "width"]
+    columns = photoslib.fetch_metadata(uuids, fields=fields, chunk_size=2)
+    assert columns["uuid"] == [photo["uuid_osxphotos"] for photo in PHOTOS_DICT]
+    assert columns["name"] == [photo["title"] for photo in PHOTOS_DICT]
+    assert columns["description"] == [photo["description"] for photo in PHOTOS_DICT]
+    assert columns["keywords"] == [photo["keywords"] for photo in PHOTOS_DICT]
+    assert columns["favorite"] == [photo["favorite"] for photo in PHOTOS_DICT]
+    assert columns["filename"] == [photo["filename"] for photo in PHOTOS_DICT]
+    assert columns["width"] == [photo["width"] for photo in PHOTOS_DICT]
+
+
+def test_photoslibrary_fetch_metadata_bad_field(photoslib: photoscript.PhotosLibrary):
+    with pytest.raises(ValueError):
+        photoslib.fetch_metadata(PHOTOS_UUID, fields=["BAD_FIELD"])
+
+
+def test_photoslibrary_album_membership_index(
+    photoslib: photoscript.PhotosLibrary, monkeypatch
+):
+    monkeypatch.setattr(photoscript, "_album_membership_index", None)
+    index = photoslib.album_membership_index()
+    for photo in PHOTOS_DICT:
+        album_ids = index.get(photo["uuid"], [])
+        assert sorted(photoscript.Album(id_).name for id_ in album_ids) == sorted(
+            photo["albums"]
+        )
+
+    # Photo.albums uses the index instead of searching every album
+    calls = []
+    run_script = photoscript.run_script
+
+    def counting_run_script(name, *args):
+        calls.append(name)
+        return run_script(name, *args)
+
+    monkeypatch.setattr(photoscript, "run_script", counting_run_script)
+    for photo in PHOTOS_DICT:
+        photo_obj = photoscript.Photo(photo["uuid"], validate=False)
+        assert sorted(album.id for album in photo_obj.albums) == sorted(
+            index.get(photo["uuid"], [])
+        )
+    assert "photoAlbums" not in calls
+
+    # changes made through photoscript are reflected in the index
+    album = photoslib.create_album("Membership Index Album")
+    album.add([photoscript.Photo(PHOTOS_DICT[0]["uuid"])])
+    assert album.id in index[PHOTOS_DICT[0]["uuid"]]
+    photoslib.delete_album(album)
+    assert album.id not in index[PHOTOS_DICT[0]["uuid"]]
+
+
+def test_photoslibrary_tree(photoslib: photoscript.PhotosLibrary):
+    tree = photoslib.tree()
+    assert sorted(tree.folder_names()) == sorted(FOLDER_NAMES_ALL)
+    assert sorted(tree.folder_names(top_level=True)) == sorted(FOLDER_NAMES_TOP)
+    assert sorted(tree.album_names()) == sorted(ALBUM_NAMES_ALL)
+    assert sorted(tree.album_names(top_level=True)) == sorted(ALBUM_NAMES_TOP)
+
+    album = tree.album(ALBUM_1_NAME)
+    assert album.id == ALBUM_1_UUID
+    assert album.path_str() == ALBUM_1_PATH_STR
+    assert len(album) == len(ALBUM_1_PHOTO_UUIDS)
+    assert tree.album(path=ALBUM_1_PATH_STR.split("/")).id == ALBUM_1_UUID
+
+    folder = tree.folder(FOLDER_1_NAME)
+    assert folder.idstring == FOLDER_1_IDSTRING
+    assert len(folder) == FOLDER_1_LEN
+    assert [subfolder.name for subfolder in folder.subfolders] == FOLDER_1_SUBFOLDERS
+    subfolder_path = [FOLDER_1_NAME, FOLDER_1_SUBFOLDERS[0]]
+    subfolder = tree.folder(path=subfolder_path)
+    assert subfolder.parent.idstring == FOLDER_1_IDSTRING
+    assert subfolder.idstring == photoslib.folder(path=subfolder_path).idstring
+
+
 def test_photoslibrary_photos_search(photoslib: photoscript.PhotosLibrary):
     photos = photoslib.photos(search="plants")
     filenames = [photo.filename for photo in photos]
@@ -746,6 +849,54 @@ def test_export_photo_duplicate_overwrite(photoslib: photoscript.PhotosLibrary):
     assert files == PHOTO_EXPORT_FILENAME
 
 
+def test_export_photos(photoslib: photoscript.PhotosLibrary):
+    tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_test_")
+
+    album = photoslib.album(ALBUM_1_NAME)
+    photos = album.photos()
+    exported = photoslib.export_photos(photos, tmpdir.name, chunk_size=1)
+    assert list(exported) == [photo.id for photo in photos]
+    for photo in photos:
+        assert stemset(exported[photo.id]) == stemset([photo.filename])
+    filenames = [pathlib.Path(f).name for paths in exported.values() for f in paths]
+    assert sorted(filenames) == sorted(ALBUM_1_PHOTO_EXPORT_FILENAMES)
+    assert sorted(os.listdir(tmpdir.name)) == sorted(ALBUM_1_PHOTO_EXPORT_FILENAMES)
+
+
+def test_export_photos_duplicate(photoslib: photoscript.PhotosLibrary):
+    tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_test_")
+
+    photo = photoscript.Photo(PHOTO_EXPORT_UUID)
+    photoslib.export_photos([photo], tmpdir.name)
+    exported = photoslib.export_photos([photo], tmpdir.name)
+    assert [pathlib.Path(f).name for f in exported[photo.id]] == [
+        PHOTO_EXPORT_2_FILENAMES[1]
+    ]
+
+
+def test_export_photos_incremental(photoslib: photoscript.PhotosLibrary):
+    tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_test_")
+
+    photo = photoscript.Photo(PHOTO_EXPORT_UUID)
+    exported = photoslib.export_photos([photo], tmpdir.name, incremental=True)
+    files = sorted(os.listdir(tmpdir.name))
+
+    # nothing changed so photo isn't exported again
+    assert photoslib.export_photos([photo], tmpdir.name, incremental=True) == exported
+    assert sorted(os.listdir(tmpdir.name)) == files
+
+    # missing file is exported again with the same name
+    os.unlink(exported[photo.id][0])
+    assert photoslib.export_photos([photo], tmpdir.name, incremental=True) == exported
+    assert sorted(os.listdir(tmpdir.name)) == files
+
+
+def test_export_photos_bad_path(photoslib: photoscript.PhotosLibrary):
+    photo = photoscript.Photo(PHOTO_EXPORT_UUID)
+    with pytest.raises(ValueError):
+        photoslib.export_photos([photo], photoslib._temp_name())
+
+
 def test_export_photo_original_basic(photoslib: photoscript.PhotosLibrary):
 
     tmpdir = tempfile.TemporaryDirectory(prefix="photoscript_test_")
@@ -71,6 +71,30 @@ def test_album_init_bad_uuid():
         assert photoscript.Album("BAD_UUID")
 
 
+def test_album_init_no_validate():
+    """Album(validate=False) does not check that the album exists"""
+
+    album = photoscript.Album("BAD_UUID", validate=False)
+    assert album.uuid == "BAD_UUID"
+
+
+def test_album_photos_trusted(photoslib: photoscript.PhotosLibrary, monkeypatch):
+    """Album.photos() should not validate ids returned by Photos"""
+
+    album = photoslib.album(ALBUM_1_NAME)
+    calls = []
+    run_script = photoscript.run_script
+
+    def counting_run_script(name, *args):
+        calls.append(name)
+        return run_script(name, *args)
+
+    monkeypatch.setattr(photoscript, "run_script", counting_run_script)
+    photos = album.photos()
+    assert len(photos) == len(ALBUM_1_PHOTO_UUIDS)
+    assert calls == ["albumPhotes"]
+
+
 def test_album_id():
 
     album = photoscript.Album(ALBUM_1_UUID)
@@ -177,6 +201,32 @@ def test_album_photos_add_none(photoslib: photoscript.PhotosLibrary):
     assert len(album) == album_length
 
 
+def test_album_photos_add_existing(photoslib: photoscript.PhotosLibrary, monkeypatch):
+    """Test add with photos already in the album doesn't send them to Photos"""
+
+    album = photoslib.album(ALBUM_1_NAME)
+    album_length = len(album)
+    photos = album.photos()
+    calls = []
+    run_script = photoscript.run_script
+
+    def counting_run_script(name, *args):
+        calls.append(name)
+        return run_script(name, *args)
+
+    monkeypatch.setattr(photoscript, "run_script", counting_run_script)
+    added = album.add(photos, chunk_size=1)
+    assert [photo.id for photo in added] == [photo.id for photo in photos]
+    assert calls == ["albumPhotes"]
+    assert len(album) == album_length
+
+
+def test_album_photos_add_bad_chunk_size(photoslib: photoscript.PhotosLibrary):
+    album = photoslib.album(ALBUM_1_NAME)
+    with pytest.raises(ValueError):
+        album.add(album.photos(), chunk_size=0)
+
+
 def test_album_import_photos(photoslib: photoscript.PhotosLibrary):
     """Test import photo"""
 
@@ -261,3 +311,24 @@ def test_album_remove(photoslib: photoscript.PhotosLibrary):
     assert sorted(uuids) == sorted(ALBUM_1_POST_REMOVE_UUIDS)
     assert new_album.title == ALBUM_1_NAME
     assert new_album.id == album.id
+
+
+def test_album_remove_single_rebuild(photoslib: photoscript.PhotosLibrary, monkeypatch):
+    """Album.remove_by_id() rebuilds the album with a single call to Photos"""
+
+    album = photoslib.album(ALBUM_1_NAME)
+    parent = album.parent
+    calls = []
+    run_script = photoscript.run_script
+
+    def counting_run_script(name, *args):
+        calls.append(name)
+        return run_script(name, *args)
+
+    monkeypatch.setattr(photoscript, "run_script", counting_run_script)
+    new_album = album.remove_by_id(ALBUM_1_REMOVE_UUIDS)
+    assert calls.count("albumRebuild") == 1
+    assert "albumAdd" not in calls and "photoExists" not in calls
+    uuids = [photo.id for photo in new_album.photos()]
+    assert sorted(uuids) == sorted(ALBUM_1_POST_REMOVE_UUIDS)
+    assert new_album.parent.id == parent.id
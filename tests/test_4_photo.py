@@ -42,6 +42,12 @@ def test_photo_init_bad_uuid(photoslib: photoscript.PhotosLibrary):
         photoscript.Photo("BAD_UUID")
 
 
+def test_photo_init_no_validate(photoslib: photoscript.PhotosLibrary):
+    """Photo(validate=False) does not check that the photo exists"""
+    photo = photoscript.Photo("BAD_UUID", validate=False)
+    assert photo.uuid == "BAD_UUID"
+
+
 def test_photo_name(photoslib: photoscript.PhotosLibrary):
     for photo in PHOTOS_DICT:
         photo_obj = photoscript.Photo(photo["uuid"])
@@ -41,3 +41,69 @@ def test_run_script():
     assert photoscript.script_loader.run_script("test_applescript") == 42
     photoscript.script_loader.SCRIPT_OBJ = old_script_obj
 
+
+
+def test_run_script_batch():
+    import os
+
+    import photoscript
+
+    cwd = os.getcwd()
+
+    script = photoscript.script_loader.load_applescript(
+        os.path.join(cwd, "tests/applescript_test")
+    )
+    old_script_obj = photoscript.script_loader.SCRIPT_OBJ
+    photoscript.script_loader.SCRIPT_OBJ = script
+    results = photoscript.script_loader.run_script_batch(
+        [("test_applescript", []), ("BAD_HANDLER", []), ("test_applescript", [])]
+    )
+    photoscript.script_loader.SCRIPT_OBJ = old_script_obj
+    assert results[0] == 42
+    assert isinstance(results[1], photoscript.AppleScriptError)
+    assert results[2] == 42
+
+
+def test_script_batch():
+    import os
+
+    import photoscript
+
+    cwd = os.getcwd()
+
+    script = photoscript.script_loader.load_applescript(
+        os.path.join(cwd, "tests/applescript_test")
+    )
+    old_script_obj = photoscript.script_loader.SCRIPT_OBJ
+    photoscript.script_loader.SCRIPT_OBJ = script
+    with photoscript.script_loader.ScriptBatch() as batch:
+        good = batch.call("test_applescript")
+        bad = batch.call("BAD_HANDLER")
+        with pytest.raises(photoscript.script_loader.RunScriptError):
+            good.result()
+    photoscript.script_loader.SCRIPT_OBJ = old_script_obj
+    assert good.result() == 42
+    with pytest.raises(photoscript.AppleScriptError):
+        bad.result()
+
+
+def test_script_session():
+    import os
+
+    import photoscript
+
+    cwd = os.getcwd()
+
+    script = photoscript.script_loader.load_applescript(
+        os.path.join(cwd, "tests/applescript_test")
+    )
+    old_script_obj = photoscript.script_loader.SCRIPT_OBJ
+    photoscript.script_loader.SCRIPT_OBJ = script
+    with photoscript.script_loader.ScriptSession():
+        assert photoscript.script_loader.run_script("test_applescript") == 42
+        with pytest.raises(photoscript.AppleScriptError):
+            photoscript.script_loader.run_script("BAD_HANDLER")
+        assert photoscript.script_loader.run_script_batch(
+            [("test_applescript", [])]
+        ) == [42]
+    photoscript.script_loader.SCRIPT_OBJ = old_script_obj
@@ -28,12 +28,12 @@ def test_run_script_retries_on_applescript_timed_out(monkeypatch):
 
     monkeypatch.setattr(script_loader, "SCRIPT_OBJ", DummyScriptObj())
 
-    # Capture into called list that kill_photos_app was invoked by Tenacity before retrying
+    # Capture into called list that recover_photos_app was invoked by Tenacity before retrying
     called = []
     def fake_kill_photos(retry_state):
         photoscript.script_loader.logger.warning("✅  (fake)Photos app was terminated successfully.")
         called.append(retry_state)
-    monkeypatch.setattr(script_loader, "kill_photos_app", fake_kill_photos)
+    monkeypatch.setattr(script_loader, "recover_photos_app", fake_kill_photos)
 
     result = script_loader.run_script("dummy_AppleScript_function")
     assert result == "ok-result"
@@ -0,0 +1,128 @@
+"""Test photosdb.py"""
+
+import datetime
+import os
+import pathlib
+
+import pytest
+
+from photoscript.photosdb import DBAlbum, DBFolder, DBPhoto, PhotosDB
+from tests.photoscript_config_data import (
+    ALBUM_1_NAME,
+    ALBUM_1_PATH_STR,
+    ALBUM_1_PHOTO_UUIDS,
+    ALBUM_1_UUID,
+    ALBUM_NAMES_ALL,
+    ALBUM_NAMES_TOP,
+    FOLDER_1_IDSTRING,
+    FOLDER_1_LEN,
+    FOLDER_1_NAME,
+    FOLDER_1_SUBFOLDERS,
+    FOLDER_NAMES_ALL,
+    FOLDER_NAMES_TOP,
+    NUM_PHOTOS,
+    PHOTOS_DICT,
+    PHOTOS_FILENAMES,
+    TEST_LIBRARY,
+)
+
+from .datetime_utils import datetime_remove_tz, get_local_tz
+
+
+@pytest.fixture
+def photosdb():
+    library = pathlib.Path(os.getcwd()) / "tests" / "test_libraries" / TEST_LIBRARY
+    # read from a snapshot so the fixture library is never touched
+    with PhotosDB(library, snapshot=True) as db:
+        yield db
+
+
+def test_photosdb_bad_library():
+    with pytest.raises(ValueError):
+        PhotosDB("BAD_LIBRARY")
+
+
+def test_photosdb_len(photosdb):
+    assert len(photosdb) == NUM_PHOTOS
+
+
+def test_photosdb_photos(photosdb):
+    photos = photosdb.photos()
+    assert all(isinstance(photo, DBPhoto) for photo in photos)
+    assert sorted(photo.filename for photo in photos) == sorted(PHOTOS_FILENAMES)
+
+
+def test_photosdb_photo_metadata(photosdb):
+    for photo in PHOTOS_DICT:
+        photo_obj = photosdb.photos(uuid=[photo["uuid"]])[0]
+        assert photo_obj.id == photo["uuid"]
+        assert photo_obj.uuid == photo["uuid_osxphotos"]
+        assert photo_obj.name == photo["title"]
+        assert photo_obj.description == photo["description"]
+        assert sorted(photo_obj.keywords) == sorted(photo["keywords"])
+        assert photo_obj.favorite == photo["favorite"]
+        assert photo_obj.filename == photo["filename"]
+        assert photo_obj.height == photo["height"]
+        assert photo_obj.width == photo["width"]
+        assert sorted(album.name for album in photo_obj.albums) == sorted(
+            photo["albums"]
+        )
+        date = datetime.datetime.fromisoformat(photo["date"])
+        local_tz = get_local_tz(datetime_remove_tz(date))
+        assert photo_obj.date == datetime_remove_tz(date.astimezone(tz=local_tz))
+
+
+def test_photosdb_albums(photosdb):
+    assert sorted(photosdb.album_names()) == sorted(ALBUM_NAMES_ALL)
+    assert sorted(photosdb.album_names(top_level=True)) == sorted(ALBUM_NAMES_TOP)
+
+
+def test_photosdb_album(photosdb):
+    album = photosdb.album(ALBUM_1_NAME)
+    assert isinstance(album, DBAlbum)
+    assert album.id == ALBUM_1_UUID
+    assert album.path_str() == ALBUM_1_PATH_STR
+    assert len(album) == len(ALBUM_1_PHOTO_UUIDS)
+    assert sorted(photo.id for photo in album.photos()) == sorted(ALBUM_1_PHOTO_UUIDS)
+    assert photosdb.album(uuid=ALBUM_1_UUID).name == ALBUM_1_NAME
+    assert photosdb.album("BAD_ALBUM_NAME") is None
+
+
+def test_photosdb_folders(photosdb):
+    assert sorted(photosdb.folder_names()) == sorted(FOLDER_NAMES_ALL)
+    assert sorted(photosdb.folder_names(top_level=True)) == sorted(FOLDER_NAMES_TOP)
+
+
+def test_photosdb_folder(photosdb):
+    folder = photosdb.folder(FOLDER_1_NAME)
+    assert isinstance(folder, DBFolder)
+    assert folder.idstring == FOLDER_1_IDSTRING
+    assert len(folder) == FOLDER_1_LEN
+    assert [subfolder.name for subfolder in folder.subfolders] == FOLDER_1_SUBFOLDERS
+    subfolder = folder.subfolders[0]
+    assert subfolder.parent.idstring == FOLDER_1_IDSTRING
+    assert subfolder.path_str() == f"{FOLDER_1_NAME}/{subfolder.name}"
+    assert photosdb.folder(path=[FOLDER_1_NAME, subfolder.name]).uuid == subfolder.uuid
+
+
+def test_photosdb_folder_tree_index(photosdb):
+    queries = []
+    photosdb._conn.set_trace_callback(queries.append)
+    for folder in photosdb.folders(top_level=False):
+        assert photosdb.folder(path=folder.path_str().split("/")).uuid == folder.uuid
+        assert photosdb.folder(uuid=folder.uuid).uuid == folder.uuid
+        for album in folder.albums:
+            assert album.path_str().startswith(folder.path_str())
+            assert photosdb.album(album.name).name == album.name
+        for subfolder in folder.subfolders:
+            assert subfolder.parent.uuid == folder.uuid
+    # albums and folders are read from the database once
+    assert len([query for query in queries if "ZGENERICALBUM" in query]) == 1
+    assert photosdb.album(ALBUM_1_NAME, top_level=True) is None
+    assert photosdb.folder(FOLDER_1_NAME, top_level=False).name == FOLDER_1_NAME
+
+
+def test_photosdb_photo_no_date(photosdb):
+    row = dict(photosdb.photos()[0]._row)
+    row["ZDATECREATED"] = None
+    assert DBPhoto(photosdb, row).date is None